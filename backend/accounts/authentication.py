@@ -0,0 +1,95 @@
+"""
+JWT authentication without a user query per request.
+
+Access tokens carry the user's role, active flag and token version. Each
+process keeps a short-lived map of user id -> (token_version, is_active, role),
+so a request is authenticated from the token plus that map and gets a
+ClaimsUser that only queries the users table if a view reads other fields.
+
+Changing a user's role, active flag or password bumps their token_version
+(see User.save), which rejects every token issued before it. The saving process
+drops its entry at once; other processes notice within AUTH_USER_STATE_TTL.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import ClaimsUser, User
+
+
+# Claims copied from the refresh token into every access token
+ROLE_CLAIM = 'role'
+ACTIVE_CLAIM = 'active'
+VERSION_CLAIM = 'ver'
+
+# Users remembered per process; the map is cleared when it grows past this
+MAX_CACHED_USERS = 10000
+
+_user_states = {}
+_lock = threading.Lock()
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry role, active flag and token version"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        token[ACTIVE_CLAIM] = user.is_active
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+def user_state(user_id):
+    """(token_version, is_active, role) of a user, or None if they do not exist"""
+    now = time.monotonic()
+    entry = _user_states.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    state = User.objects.filter(pk=user_id).values_list('token_version', 'is_active', 'role').first()
+    with _lock:
+        if len(_user_states) >= MAX_CACHED_USERS:
+            _user_states.clear()
+        _user_states[user_id] = (now + settings.AUTH_USER_STATE_TTL, state)
+    return state
+
+
+def forget_user_state(user_id):
+    with _lock:
+        _user_states.pop(user_id, None)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that trusts token claims checked against the cached token version"""
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            # Issued before tokens carried claims
+            return super().get_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return super().get_user(validated_token)
+
+        state = user_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        token_version, is_active, role = state
+        if validated_token[VERSION_CLAIM] != token_version:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_not_valid')
+        if not is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return ClaimsUser.from_claims(user_id, role, is_active, token_version)
@@ -1,5 +1,5 @@
 # backend/accounts/models.py - EXTENDED VERSION
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from decimal import Decimal
@@ -72,6 +72,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     
     date_joined = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Bumped whenever a change must invalidate issued tokens (see TOKEN_FIELDS)
+    token_version = models.PositiveIntegerField(default=0)
     
     # Extended Profile Fields
     age = models.PositiveIntegerField(
@@ -108,6 +112,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'phone_number'
     REQUIRED_FIELDS = ['first_name', 'last_name']
     
+    # Access tokens carry these; changing one revokes every token issued before
+    TOKEN_FIELDS = ('role', 'is_active', 'password')
+    
     class Meta:
         db_table = 'users'
         verbose_name = 'User'
@@ -119,6 +126,44 @@ class User(AbstractBaseUser, PermissionsMixin):
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        fields = [
+            name for name in self.TOKEN_FIELDS
+            if name not in deferred and (update_fields is None or name in update_fields)
+        ]
+        if self.pk and fields:
+            current = User.objects.filter(pk=self.pk).values_list('token_version', *fields).first()
+            if current is not None and any(getattr(self, name) != value for name, value in zip(fields, current[1:])):
+                self.token_version = current[0] + 1
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+
+
+class ClaimsUser(User):
+    """
+    A User built from access token claims without a query
+    
+    Only id, role, is_active and token_version are set; the first access to
+    any other field loads all of them in one query.
+    """
+    
+    CLAIM_FIELDS = ['id', 'role', 'is_active', 'token_version']
+    
+    class Meta:
+        proxy = True
+    
+    @classmethod
+    def from_claims(cls, user_id, role, is_active, token_version):
+        return cls.from_db(router.db_for_read(User), cls.CLAIM_FIELDS, [user_id, role, is_active, token_version])
+    
+    def refresh_from_db(self, using=None, fields=None):
+        if fields is not None:
+            fields = list(set(fields) | self.get_deferred_fields())
+        super().refresh_from_db(using=using, fields=fields)
 
 
 class SpouseDetails(models.Model):
@@ -0,0 +1,50 @@
+"""
+Member profile ETags.
+
+A profile is the user row plus their spouse details, next of kin, children and
+beneficiaries. Its ETag is derived from the latest updated_at of each of those
+and the row counts of the lists (so deletions change it too), all read in a
+single query. A client holding the current ETag is answered with 304 before
+the profile itself is loaded.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.http import parse_etags
+
+from .models import Beneficiary, Child, User
+
+
+def _per_user(model, aggregate):
+    return Subquery(
+        model.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(
+            value=aggregate
+        ).values('value')[:1]
+    )
+
+
+def profile_etag(user_id):
+    """Weak ETag of a user's full profile, or None if the user does not exist"""
+    state = User.objects.filter(pk=user_id).annotate(
+        children_at=_per_user(Child, Max('updated_at')),
+        children_count=_per_user(Child, Count('pk')),
+        beneficiaries_at=_per_user(Beneficiary, Max('updated_at')),
+        beneficiaries_count=_per_user(Beneficiary, Count('pk')),
+    ).values_list(
+        'pk', 'updated_at', 'spouse_details__updated_at', 'next_of_kin__updated_at',
+        'children_at', 'children_count', 'beneficiaries_at', 'beneficiaries_count'
+    ).first()
+    if state is None:
+        return None
+    digest = hashlib.md5(repr(state).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match or etag is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in parse_etags(if_none_match))
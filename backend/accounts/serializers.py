@@ -94,13 +94,15 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'spouse_details', 'children', 'beneficiaries', 'next_of_kin'
         ]
         read_only_fields = ['id', 'phone_number', 'role', 'date_joined']
+        # next_of_kin is read in a SerializerMethodField, invisible to query planning
+        select_related_hints = ['next_of_kin']
     
     def get_next_of_kin(self, obj):
         try:
-            from .serializers import NextOfKinSerializer
-            return NextOfKinSerializer(obj.next_of_kin).data
-        except:
+            next_of_kin = obj.next_of_kin
+        except NextOfKin.DoesNotExist:
             return None
+        return NextOfKinSerializer(next_of_kin).data
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_user_state
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender='accounts.ClaimsUser')
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender='accounts.ClaimsUser')
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_user_state(user_id))
@@ -1,3 +1,97 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from rest_framework.test import APIClient
+
+from .authentication import ClaimsRefreshToken, forget_user_state
+from .models import Child
+
+User = get_user_model()
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number='254700000010', password='pass12345', first_name='Ann', last_name='Member'
+        )
+        self.client = APIClient()
+        self.authorize(self.user)
+
+    def tearDown(self):
+        forget_user_state(self.user.pk)
+
+    def authorize(self, user):
+        token = ClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_cached_request_needs_no_user_query(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/notifications/sms/metrics/')
+        # Authenticated from claims, then refused by IsAdmin
+        self.assertEqual(response.status_code, 403)
+
+    def test_role_change_revokes_issued_tokens(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        self.user.role = 'ADMIN'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        self.authorize(self.user)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_password_change_revokes_issued_tokens(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        self.user.set_password('new-pass-123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['password'])
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_other_profile_edits_keep_tokens_valid(self):
+        self.user.first_name = 'Anne'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertEqual(self.user.token_version, 0)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+
+class ProfileETagTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number='254700000011', password='pass12345', first_name='Ben', last_name='Member'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/auth/profile/', **headers)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.get()['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+
+        with self.assertNumQueries(1):
+            response = self.get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_related_changes_and_deletions_change_the_etag(self):
+        etag = self.get()['ETag']
+        child = Child.objects.create(user=self.user, full_name='Kid', age=4, gender='MALE')
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['children']), 1)
+
+        etag = response['ETag']
+        child.delete()
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_missing_next_of_kin_is_null(self):
+        self.assertIsNone(self.get().data['next_of_kin'])
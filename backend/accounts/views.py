@@ -2,9 +2,10 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.utils.cache import patch_cache_control, patch_vary_headers
 
+from .authentication import ClaimsRefreshToken
 from .models import NextOfKin, SpouseDetails, Child, Beneficiary
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, LoginSerializer,
@@ -12,6 +13,9 @@ from .serializers import (
     ChildSerializer, BeneficiarySerializer
 )
 from .permissions import IsAdmin, IsOwnerOrAdmin, IsMemberOwner
+from .profiles import etag_matches, profile_etag
+from sacco_project.pagination import CursorPaginationMixin
+from sacco_project.query_planning import QueryPlanMixin, build_query_plan
 
 User = get_user_model()
 
@@ -29,7 +33,7 @@ class RegisterView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -50,7 +54,7 @@ class LoginView(APIView):
         user = serializer.validated_data['user']
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -67,10 +71,31 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     parser_classes = [MultiPartParser, FormParser]
     
     def get_object(self):
-        return self.request.user
-
-
-class UserListView(generics.ListAPIView):
+        queryset = build_query_plan(UserProfileSerializer).apply(User.objects.filter(pk=self.request.user.pk))
+        return queryset.get()
+    
+    def retrieve(self, request, *args, **kwargs):
+        etag = profile_etag(request.user.pk)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().retrieve(request, *args, **kwargs)
+        return self._cache_headers(response, etag)
+    
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        return self._cache_headers(response, profile_etag(request.user.pk))
+    
+    def _cache_headers(self, response, etag):
+        if etag is not None:
+            response['ETag'] = etag
+        # Per-user data: clients revalidate every time, shared caches never store it
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class UserListView(CursorPaginationMixin, QueryPlanMixin, generics.ListAPIView):
     """List all users (admin only)"""
     
     queryset = User.objects.all()
@@ -78,7 +103,7 @@ class UserListView(generics.ListAPIView):
     permission_classes = [IsAdmin]
 
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(QueryPlanMixin, generics.RetrieveAPIView):
     """Get user details (admin only)"""
     
     queryset = User.objects.all()
@@ -100,7 +125,7 @@ class SpouseDetailsView(generics.RetrieveUpdateAPIView):
 
 
 # Children Views
-class ChildListCreateView(generics.ListCreateAPIView):
+class ChildListCreateView(QueryPlanMixin, generics.ListCreateAPIView):
     """List and create children"""
     
     serializer_class = ChildSerializer
@@ -114,7 +139,7 @@ class ChildListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class ChildDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ChildDetailView(QueryPlanMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a child"""
     
     serializer_class = ChildSerializer
@@ -126,7 +151,7 @@ class ChildDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Beneficiary Views
-class BeneficiaryListCreateView(generics.ListCreateAPIView):
+class BeneficiaryListCreateView(QueryPlanMixin, generics.ListCreateAPIView):
     """List and create beneficiaries"""
     
     serializer_class = BeneficiarySerializer
@@ -142,7 +167,7 @@ class BeneficiaryListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class BeneficiaryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BeneficiaryDetailView(QueryPlanMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a beneficiary"""
     
     serializer_class = BeneficiarySerializer
@@ -166,7 +191,7 @@ class NextOfKinCreateView(generics.CreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class NextOfKinDetailView(generics.RetrieveUpdateDestroyAPIView):
+class NextOfKinDetailView(QueryPlanMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete next of kin"""
     
     serializer_class = NextOfKinSerializer
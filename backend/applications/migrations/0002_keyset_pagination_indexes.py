@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='application',
+            name='application_user_id_b20d82_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='application',
+            name='application_status_04cde2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['user', '-submitted_at', '-id'], name='application_user_id_0dc50d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['status', '-submitted_at', '-id'], name='application_status_760aef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['-submitted_at', '-id'], name='application_submitt_d8a734_idx'),
+        ),
+    ]
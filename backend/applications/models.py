@@ -128,8 +128,10 @@ class Application(models.Model):
         verbose_name_plural = 'Applications'
         ordering = ['-submitted_at']
         indexes = [
-            models.Index(fields=['user', '-submitted_at']),
-            models.Index(fields=['status', '-submitted_at']),
+            # Trailing -id keeps keyset pagination stable when timestamps tie
+            models.Index(fields=['user', '-submitted_at', '-id']),
+            models.Index(fields=['status', '-submitted_at', '-id']),
+            models.Index(fields=['-submitted_at', '-id']),
         ]
     
     def __str__(self):
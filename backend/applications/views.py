@@ -9,13 +9,16 @@ from .serializers import (
     ApplicationReviewSerializer
 )
 from accounts.permissions import IsAdmin
+from sacco_project.pagination import CursorPaginationMixin
+from sacco_project.query_planning import QueryPlanMixin, build_query_plan
 
 
-class ApplicationListView(generics.ListAPIView):
+class ApplicationListView(CursorPaginationMixin, QueryPlanMixin, generics.ListAPIView):
     """List applications - members see only their own, admins see all"""
     
     serializer_class = ApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-submitted_at', '-id')
     
     def get_queryset(self):
         user = self.request.user
@@ -31,7 +34,7 @@ class ApplicationCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ApplicationDetailView(generics.RetrieveAPIView):
+class ApplicationDetailView(QueryPlanMixin, generics.RetrieveAPIView):
     """Get application details"""
     
     serializer_class = ApplicationSerializer
@@ -44,7 +47,7 @@ class ApplicationDetailView(generics.RetrieveAPIView):
         return Application.objects.filter(user=user)
 
 
-class PendingApplicationsView(generics.ListAPIView):
+class PendingApplicationsView(QueryPlanMixin, generics.ListAPIView):
     """List pending applications (admin only)"""
     
     serializer_class = ApplicationSerializer
@@ -59,7 +62,7 @@ class ApplicationReviewView(APIView):
     
     def post(self, request, pk):
         try:
-            application = Application.objects.get(pk=pk)
+            application = build_query_plan(ApplicationSerializer).apply(Application.objects.all()).get(pk=pk)
         except Application.DoesNotExist:
             return Response(
                 {'error': 'Application not found'}, 
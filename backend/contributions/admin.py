@@ -1,10 +1,15 @@
-from django.contrib import admin
-from .models import ContributionType, Contribution, SACCOBalance, ContributionSummary
+from django.contrib import admin, messages
+from .models import (
+    ContributionType, Contribution, SACCOBalance, ContributionSummary, ContributionLedgerEntry,
+    StatementReconciliation, ReconciliationMismatch, ContributionRollup, BalanceCheckpoint,
+    DividendRun, DividendPayout
+)
+from .services import ContributionStateError, verify_contribution, reject_contribution, reverse_contribution
 
 
 @admin.register(ContributionType)
 class ContributionTypeAdmin(admin.ModelAdmin):
-    list_display = ['name', 'is_active', 'created_at']
+    list_display = ['name', 'is_active', 'dividend_rate', 'created_at']
     list_filter = ['is_active']
     search_fields = ['name']
 
@@ -15,7 +20,53 @@ class ContributionAdmin(admin.ModelAdmin):
     list_filter = ['status', 'contribution_type', 'submitted_at']
     search_fields = ['member__first_name', 'member__last_name', 'mpesa_transaction_code']
     ordering = ['-submitted_at']
-    readonly_fields = ['submitted_at', 'updated_at']
+    # Status changes go through the actions below so the ledger and balances follow
+    readonly_fields = ['status', 'verified_by', 'verified_at', 'submitted_at', 'updated_at']
+    actions = ['verify_selected', 'reject_selected', 'reverse_selected']
+    
+    def get_readonly_fields(self, request, obj=None):
+        fields = super().get_readonly_fields(request, obj)
+        if obj is not None and obj.status != 'PENDING':
+            # The amount has been credited; correct it by reversing instead
+            fields = [*fields, 'member', 'contribution_type', 'amount']
+        return fields
+    
+    def _apply(self, request, queryset, action, done):
+        applied = 0
+        skipped = 0
+        for contribution in queryset.order_by('pk'):
+            try:
+                action(contribution)
+                applied += 1
+            except ContributionStateError:
+                skipped += 1
+        self.message_user(request, f'{applied} contribution(s) {done}')
+        if skipped:
+            self.message_user(
+                request,
+                f'{skipped} contribution(s) skipped because they were not in the required state',
+                messages.WARNING
+            )
+    
+    @admin.action(description='Verify selected pending contributions')
+    def verify_selected(self, request, queryset):
+        self._apply(request, queryset, lambda contribution: verify_contribution(contribution, request.user), 'verified')
+    
+    @admin.action(description='Reject selected pending contributions')
+    def reject_selected(self, request, queryset):
+        self._apply(
+            request, queryset,
+            lambda contribution: reject_contribution(contribution, request.user, 'Rejected by an administrator'),
+            'rejected'
+        )
+    
+    @admin.action(description='Reverse selected verified contributions')
+    def reverse_selected(self, request, queryset):
+        self._apply(
+            request, queryset,
+            lambda contribution: reverse_contribution(contribution, request.user, 'Reversed by an administrator'),
+            'reversed'
+        )
 
 
 @admin.register(SACCOBalance)
@@ -23,10 +74,76 @@ class SACCOBalanceAdmin(admin.ModelAdmin):
     list_display = ['member', 'contribution_type', 'total_balance', 'last_contribution_date']
     list_filter = ['contribution_type']
     search_fields = ['member__first_name', 'member__last_name']
+    # Maintained from the ledger by contributions.services
+    readonly_fields = ['total_balance', 'last_contribution_date', 'updated_at']
 
 
 @admin.register(ContributionSummary)
 class ContributionSummaryAdmin(admin.ModelAdmin):
     list_display = ['contribution_type', 'total_amount', 'total_contributions', 'active_members', 'last_updated']
     list_filter = ['contribution_type']
-    readonly_fields = ['last_updated']
\ No newline at end of file
+    readonly_fields = ['last_updated']
+
+
+@admin.register(ContributionLedgerEntry)
+class ContributionLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['contribution', 'member', 'contribution_type', 'entry_type', 'amount', 'created_at']
+    list_filter = ['entry_type', 'contribution_type']
+    search_fields = ['member__first_name', 'member__last_name', 'contribution__mpesa_transaction_code']
+    ordering = ['-created_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StatementReconciliation)
+class StatementReconciliationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'uploaded_by', 'status', 'rows_processed', 'verified_count', 'mismatch_count', 'created_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = [
+        'status', 'rows_processed', 'matched_count', 'verified_count', 'mismatch_count',
+        'error_message', 'created_at', 'started_at', 'completed_at'
+    ]
+
+
+@admin.register(ReconciliationMismatch)
+class ReconciliationMismatchAdmin(admin.ModelAdmin):
+    list_display = ['reconciliation', 'mismatch_type', 'row_number', 'transaction_code', 'statement_amount', 'contribution']
+    list_filter = ['mismatch_type']
+    search_fields = ['transaction_code', 'statement_phone_number']
+
+
+@admin.register(ContributionRollup)
+class ContributionRollupAdmin(admin.ModelAdmin):
+    list_display = ['period', 'period_start', 'contribution_type', 'member', 'total_amount', 'contribution_count']
+    list_filter = ['period', 'contribution_type']
+    search_fields = ['member__first_name', 'member__last_name']
+    ordering = ['-period_start']
+    readonly_fields = ['updated_at']
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['member', 'contribution_type', 'as_of', 'balance']
+    list_filter = ['contribution_type']
+    search_fields = ['member__first_name', 'member__last_name', 'member__phone_number']
+    ordering = ['-as_of']
+    readonly_fields = ['created_at']
+
+
+@admin.register(DividendRun)
+class DividendRunAdmin(admin.ModelAdmin):
+    list_display = ['period_start', 'period_end', 'member_count', 'total_amount', 'declared_by', 'created_at']
+    readonly_fields = ['member_count', 'total_amount', 'created_at']
+
+
+@admin.register(DividendPayout)
+class DividendPayoutAdmin(admin.ModelAdmin):
+    list_display = ['run', 'member', 'contribution_type', 'average_daily_balance', 'rate', 'amount']
+    list_filter = ['run', 'contribution_type']
+    search_fields = ['member__first_name', 'member__last_name', 'member__phone_number']
@@ -0,0 +1,161 @@
+"""
+Point-in-time balances from monthly checkpoints.
+
+At the start of every month a BalanceCheckpoint is written for each member and
+contribution type whose ledger moved during the previous month. A historical
+balance is then the nearest checkpoint at or before the requested instant plus
+the ledger entries since it, which is never more than a month of one member's
+activity, however long their history.
+
+Balances come from the contribution ledger, so reversals are reflected at the
+time they happened. Checkpoints must be built in order: run the
+create_balance_checkpoints command monthly (it catches up on any missed months).
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import BalanceCheckpoint, ContributionLedgerEntry
+from .rollups import month_windows, local_date
+
+
+# Ledger entries are stamped when inserted but only become visible on commit;
+# waiting before closing a month keeps slow transactions out of the wrong checkpoint
+SETTLE_PERIOD = timedelta(hours=1)
+
+
+def _latest_checkpoints(at, member_id=None, contribution_type_id=None):
+    """Each (member, type)'s most recent checkpoint at or before `at`, via the unique index"""
+    latest = BalanceCheckpoint.objects.filter(
+        member_id=OuterRef('member_id'),
+        contribution_type_id=OuterRef('contribution_type_id'),
+        as_of__lte=at
+    ).order_by('-as_of').values('as_of')[:1]
+    queryset = BalanceCheckpoint.objects.filter(as_of__lte=at, as_of=Subquery(latest))
+    if member_id is not None:
+        queryset = queryset.filter(member_id=member_id)
+    if contribution_type_id is not None:
+        queryset = queryset.filter(contribution_type_id=contribution_type_id)
+    return queryset.order_by()
+
+
+def _ledger_totals(start, end, member_id=None, contribution_type_id=None):
+    """Ledger movement per (member_id, type_id) for entries created in [start, end)"""
+    queryset = ContributionLedgerEntry.objects.filter(created_at__lt=end)
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if member_id is not None:
+        queryset = queryset.filter(member_id=member_id)
+    if contribution_type_id is not None:
+        queryset = queryset.filter(contribution_type_id=contribution_type_id)
+    rows = queryset.order_by().values('member_id', 'contribution_type_id').annotate(total=Sum('amount'))
+    return {(row['member_id'], row['contribution_type_id']): row['total'] for row in rows}
+
+
+def balances_as_of(at, member_id=None, contribution_type_id=None):
+    """
+    Balances per member and contribution type at the instant `at`
+
+    Reads the latest checkpoint of each pair plus one grouped ledger scan from
+    the last checkpointed month boundary before `at`. Pairs that moved before
+    that boundary have a checkpoint covering it, and pairs without one at the
+    boundary itself had no movement since their own latest checkpoint, so the
+    single scan completes every balance. Without a member filter this covers
+    the whole membership in one pass; pairs with no history before `at` are
+    omitted.
+
+    Returns:
+        Dict of (member_id, contribution_type_id) -> Decimal balance
+    """
+    boundary = BalanceCheckpoint.objects.filter(as_of__lte=at).aggregate(boundary=Max('as_of'))['boundary']
+
+    balances = {}
+    if boundary is not None:
+        checkpoints = _latest_checkpoints(at, member_id, contribution_type_id).values_list(
+            'member_id', 'contribution_type_id', 'balance'
+        )
+        for member, type_id, balance in checkpoints.iterator(chunk_size=5000):
+            balances[(member, type_id)] = balance
+
+    for key, delta in _ledger_totals(boundary, at, member_id, contribution_type_id).items():
+        balances[key] = balances.get(key, Decimal('0.00')) + delta
+    return balances
+
+
+def _pending_windows(now):
+    """Month windows that have closed (and settled) but have no checkpoints yet"""
+    last = BalanceCheckpoint.objects.aggregate(last=Max('as_of'))['last']
+    if last is None:
+        first = ContributionLedgerEntry.objects.aggregate(first=Min('created_at'))['first']
+        if first is None:
+            return []
+        start = local_date(first)
+    else:
+        start = local_date(last)
+
+    cutoff = now - SETTLE_PERIOD
+    return [
+        (window_start, window_end)
+        for window_start, window_end in month_windows(start, local_date(cutoff))
+        if window_end <= cutoff and (last is None or window_start >= last)
+    ]
+
+
+def create_balance_checkpoints(batch_size=1000, stdout=None):
+    """
+    Write checkpoints for every closed month not yet checkpointed, oldest first
+
+    Each month is one grouped ledger query and one bulk insert, committed on
+    its own so an interrupted run resumes from the last completed month.
+    Running balances are carried in memory between months, one entry per
+    member and contribution type.
+
+    Returns:
+        Number of checkpoints written
+    """
+    windows = _pending_windows(timezone.now())
+    if not windows:
+        return 0
+
+    # Running balances carried from one month to the next
+    balances = balances_as_of(windows[0][0])
+    written = 0
+    for window_start, window_end in windows:
+        deltas = _ledger_totals(window_start, window_end)
+        for key, delta in deltas.items():
+            balances[key] = balances.get(key, Decimal('0.00')) + delta
+        with transaction.atomic():
+            BalanceCheckpoint.objects.bulk_create(
+                [
+                    BalanceCheckpoint(
+                        member_id=member_id,
+                        contribution_type_id=type_id,
+                        as_of=window_end,
+                        balance=balances[(member_id, type_id)]
+                    )
+                    for member_id, type_id in deltas
+                ],
+                batch_size=batch_size
+            )
+        written += len(deltas)
+        if stdout is not None:
+            stdout.write(f'{window_start:%Y-%m}: {len(deltas)} checkpoints')
+    return written
+
+
+def discard_checkpoints_after(moment):
+    """
+    Drop checkpoints that no longer cover ledger entries back-dated to `moment`
+
+    Used after historical imports; the next create_balance_checkpoints run
+    rebuilds the dropped months.
+
+    Returns:
+        Number of checkpoints deleted
+    """
+    deleted, _ = BalanceCheckpoint.objects.filter(as_of__gt=moment).delete()
+    return deleted
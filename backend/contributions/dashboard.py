@@ -0,0 +1,100 @@
+"""
+Cached admin dashboard statistics.
+
+The stats are cached until a contribution is created or changes state, or a
+user registers, is deleted, or has their role or active flag changed. Each
+of those events swaps the cache generation token. On a
+miss only one worker recomputes (guarded by a cache lock); the others keep
+serving the previous value meanwhile, so a busy dashboard never stampedes
+the database.
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Contribution, ContributionSummary
+from .serializers import ContributionSummarySerializer
+from sacco_project.query_planning import build_query_plan
+
+
+DATA_KEY = 'dashboard:stats:data'
+GENERATION_KEY = 'dashboard:stats:generation'
+LOCK_KEY = 'dashboard:stats:lock'
+
+LOCK_TIMEOUT = 30
+COLD_WAIT_SECONDS = 2.0
+COLD_POLL_INTERVAL = 0.05
+
+
+def compute_dashboard_stats():
+    User = get_user_model()
+    summaries = build_query_plan(ContributionSummarySerializer).apply(ContributionSummary.objects.all())
+    return {
+        'total_members': User.objects.filter(role='MEMBER').count(),
+        'pending_contributions': Contribution.objects.filter(status='PENDING').count(),
+        'contribution_summaries': list(ContributionSummarySerializer(summaries, many=True).data)
+    }
+
+
+def _current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(GENERATION_KEY, generation, timeout=None):
+            generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def _is_fresh(entry, generation):
+    return (
+        entry is not None
+        and entry['generation'] == generation
+        and time.time() - entry['computed_at'] < settings.DASHBOARD_CACHE_TTL
+    )
+
+
+def _recompute(generation):
+    try:
+        stats = compute_dashboard_stats()
+        cache.set(
+            DATA_KEY,
+            {'generation': generation, 'computed_at': time.time(), 'stats': stats},
+            timeout=None
+        )
+        return stats
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def get_dashboard_stats():
+    """Return dashboard stats, recomputing in at most one worker at a time"""
+    generation = _current_generation()
+    entry = cache.get(DATA_KEY)
+    if _is_fresh(entry, generation):
+        return entry['stats']
+
+    if cache.add(LOCK_KEY, 1, timeout=LOCK_TIMEOUT):
+        return _recompute(generation)
+
+    if entry is not None:
+        # Someone else is recomputing: serve the previous value meanwhile
+        return entry['stats']
+
+    # Cold cache: wait briefly for the recomputing worker, then fall back to computing here
+    deadline = time.monotonic() + COLD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(COLD_POLL_INTERVAL)
+        entry = cache.get(DATA_KEY)
+        if entry is not None:
+            return entry['stats']
+    return compute_dashboard_stats()
+
+
+def invalidate_dashboard_stats():
+    """Mark the cached stats stale once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, uuid.uuid4().hex, timeout=None))
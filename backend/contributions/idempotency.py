@@ -0,0 +1,78 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class IdempotentCreateMixin:
+    """
+    Replay the original response for requests carrying a repeated Idempotency-Key header
+
+    The first successful response is cached per user and key for
+    IDEMPOTENCY_KEY_TTL seconds; retries with the same key and payload get it
+    back without touching the database. A retry that arrives while the first
+    request is still running gets 409, and reusing a key with a different
+    payload gets 422.
+    """
+    
+    idempotency_header = 'HTTP_IDEMPOTENCY_KEY'
+    idempotency_lock_timeout = 30
+    
+    def create(self, request, *args, **kwargs):
+        key = request.META.get(self.idempotency_header)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {'error': 'Idempotency-Key must be at most 255 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        cache_key = f'idempotency:{self.__class__.__name__}:{request.user.pk}:{key}'
+        fingerprint = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        
+        cached = cache.get(cache_key)
+        if cached is None and cache.add(
+            cache_key,
+            {'fingerprint': fingerprint, 'in_progress': True},
+            timeout=self.idempotency_lock_timeout
+        ):
+            return self._create_and_remember(cache_key, fingerprint, request, *args, **kwargs)
+        
+        cached = cached or cache.get(cache_key)
+        if cached is None:
+            # The lock expired between our add() and get(); treat as a fresh request
+            return self._create_and_remember(cache_key, fingerprint, request, *args, **kwargs)
+        if cached['fingerprint'] != fingerprint:
+            return Response(
+                {'error': 'Idempotency-Key has already been used with a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if cached.get('in_progress'):
+            return Response(
+                {'error': 'A request with this Idempotency-Key is still being processed'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(cached['data'], status=cached['status'], headers={'Idempotent-Replayed': 'true'})
+    
+    def _create_and_remember(self, cache_key, fingerprint, request, *args, **kwargs):
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        
+        if status.is_success(response.status_code):
+            cache.set(
+                cache_key,
+                {'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data},
+                timeout=settings.IDEMPOTENCY_KEY_TTL
+            )
+        else:
+            cache.delete(cache_key)
+        return response
@@ -0,0 +1,356 @@
+"""
+Bulk import of historical contributions from CSV (including Excel "Save as CSV").
+
+Rows are streamed and handled in batches: each batch is validated against
+in-memory lookups of members (by phone) and contribution types (by name),
+checked for duplicate transaction codes with one query, and written with COPY
+on PostgreSQL or bulk_create elsewhere. Verified rows get their ledger credits
+in the same way. Balances, summaries, rollups, checkpoints and anomaly
+statistics are brought up to date once, after the last batch.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.functions import Upper
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .checkpoints import discard_checkpoints_after
+from .dashboard import invalidate_dashboard_stats
+from .models import Contribution, ContributionLedgerEntry, ContributionType
+from .phones import normalize_phone
+from .reconciliation import parse_amount
+from .risk import rebuild_stats, rescore_pending
+from .rollups import ROLLUP_TIME_ZONE, apply_rollup_deltas, local_date, local_midnight
+from .services import apply_balance_deltas
+
+
+# Accepted header spellings, matched case-insensitively
+COLUMN_ALIASES = {
+    'phone': ['phone_number', 'Phone Number', 'Member Phone', 'Phone'],
+    'contribution_type': ['contribution_type', 'Contribution Type', 'Type'],
+    'amount': ['amount', 'Amount'],
+    'code': ['mpesa_transaction_code', 'Transaction Code', 'M-Pesa Code', 'Receipt No.'],
+    'mpesa_phone': ['mpesa_phone_number', 'M-Pesa Phone', 'Paid From'],
+    'submitted_at': ['submitted_at', 'Date', 'Transaction Date'],
+    'status': ['status', 'Status'],
+    'verified_at': ['verified_at', 'Verified At'],
+}
+
+REQUIRED_COLUMNS = ['phone', 'contribution_type', 'amount', 'code', 'submitted_at']
+
+IMPORT_STATUSES = {'PENDING', 'VERIFIED', 'REJECTED'}
+
+# Day-first formats written by Excel in Kenyan locales
+DATE_FORMATS = ['%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y', '%d-%m-%Y %H:%M', '%d-%m-%Y']
+
+MAX_AMOUNT = Decimal('99999999.99')
+
+# Keys per apply_balance_deltas / apply_rollup_deltas call at the end of an import
+BALANCE_CHUNK = 500
+
+
+class ContributionImportError(Exception):
+    """The file cannot be imported at all (as opposed to individual bad rows)"""
+
+
+def parse_timestamp(value):
+    """Parse an ISO or day-first date/datetime; naive values are Africa/Nairobi local time"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        for date_format in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, ROLLUP_TIME_ZONE)
+    return parsed
+
+
+def _copy_value(value):
+    # Unquoted empty values are read as NULL by COPY ... (FORMAT csv)
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def copy_rows(model, field_names, rows):
+    """Write rows into the model's table with PostgreSQL COPY"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(value) for value in row])
+    buffer.seek(0)
+
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+class ContributionImporter:
+    """Imports one file of historical contributions"""
+
+    def __init__(self, imported_by=None, batch_size=5000, default_status='VERIFIED', source='', max_errors=1000):
+        self.imported_by = imported_by
+        self.batch_size = batch_size
+        self.default_status = default_status
+        self.notes = f'Imported from {source}' if source else 'Imported'
+        self.max_errors = max_errors
+        self.use_copy = connection.vendor == 'postgresql'
+
+        self.rows_read = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+        self.deltas = {}
+        self.rollup_deltas = {}
+        self.earliest_credit = None
+
+        User = get_user_model()
+        self.members = {
+            normalize_phone(phone): pk
+            for pk, phone in User.objects.values_list('pk', 'phone_number').iterator(chunk_size=5000)
+        }
+        self.types = {
+            name.casefold(): pk for pk, name in ContributionType.objects.values_list('pk', 'name')
+        }
+
+    def run(self, file_obj, dry_run=False):
+        """
+        Import every valid row of a CSV file in one transaction
+
+        Invalid rows are skipped and reported in `errors`. With dry_run the
+        import runs in full and is then rolled back, so the counts are exact.
+        """
+        with transaction.atomic():
+            batch = []
+            for row_number, row in self._read(file_obj):
+                self.rows_read += 1
+                parsed = self._parse(row_number, row)
+                if parsed is not None:
+                    batch.append(parsed)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            if batch:
+                self._flush(batch)
+            self._finish()
+            if dry_run:
+                transaction.set_rollback(True)
+        return self
+
+    def _error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, message))
+
+    def _read(self, file_obj):
+        if isinstance(file_obj.read(0), bytes):
+            file_obj = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
+        reader = csv.reader(file_obj)
+        header = next(reader, None)
+        if header is None:
+            raise ContributionImportError('The file is empty')
+
+        aliases = {
+            alias.strip().lower(): key for key, names in COLUMN_ALIASES.items() for alias in names
+        }
+        self.columns = {}
+        for index, name in enumerate(header):
+            key = aliases.get(name.strip().lower())
+            if key and key not in self.columns:
+                self.columns[key] = index
+        missing = [key for key in REQUIRED_COLUMNS if key not in self.columns]
+        if missing:
+            raise ContributionImportError(f"Missing required columns: {', '.join(missing)}")
+
+        for row_number, row in enumerate(reader, start=2):
+            if any(cell.strip() for cell in row):
+                yield row_number, row
+
+    def _value(self, row, key):
+        index = self.columns.get(key)
+        if index is None or index >= len(row):
+            return ''
+        return row[index].strip()
+
+    def _parse(self, row_number, row):
+        member_id = self.members.get(normalize_phone(self._value(row, 'phone')))
+        if member_id is None:
+            return self._error(row_number, f"Unknown member phone number '{self._value(row, 'phone')}'")
+
+        type_id = self.types.get(self._value(row, 'contribution_type').casefold())
+        if type_id is None:
+            return self._error(row_number, f"Unknown contribution type '{self._value(row, 'contribution_type')}'")
+
+        amount = parse_amount(self._value(row, 'amount'))
+        if amount is None or amount <= 0 or amount > MAX_AMOUNT or amount != amount.quantize(Decimal('0.01')):
+            return self._error(row_number, f"Invalid amount '{self._value(row, 'amount')}'")
+
+        code = self._value(row, 'code').upper()
+        if not code or len(code) > 20:
+            return self._error(row_number, f"Invalid transaction code '{code}'")
+
+        submitted_at = parse_timestamp(self._value(row, 'submitted_at'))
+        if submitted_at is None:
+            return self._error(row_number, f"Invalid date '{self._value(row, 'submitted_at')}'")
+
+        status = self._value(row, 'status').upper() or self.default_status
+        if status not in IMPORT_STATUSES:
+            return self._error(row_number, f"Invalid status '{status}'")
+
+        verified_at = None
+        if status != 'PENDING':
+            verified_at = parse_timestamp(self._value(row, 'verified_at')) or submitted_at
+
+        mpesa_phone = self._value(row, 'mpesa_phone') or self._value(row, 'phone')
+        if len(mpesa_phone) > 15:
+            return self._error(row_number, f"Invalid M-Pesa phone number '{mpesa_phone}'")
+
+        return (row_number, member_id, type_id, amount, code, mpesa_phone, status, submitted_at, verified_at)
+
+    def _flush(self, batch):
+        # Parsed codes are upper-cased; codes already stored may not be
+        codes = [row[4] for row in batch]
+        existing = set(
+            Contribution.objects.annotate(code=Upper('mpesa_transaction_code')).filter(code__in=codes).values_list(
+                'code', flat=True
+            )
+        )
+
+        rows = []
+        seen = set()
+        for row in batch:
+            code = row[4]
+            if code in existing or code in seen:
+                self._error(row[0], f"Duplicate transaction code '{code}'")
+                continue
+            seen.add(code)
+            rows.append(row)
+        if not rows:
+            return
+
+        ids = self._insert_contributions(rows)
+        self._insert_credits(rows, ids)
+        self.imported += len(rows)
+
+    def _insert_contributions(self, rows):
+        """Insert contribution rows and return a dict of transaction code -> id"""
+        verified_by_id = self.imported_by.pk if self.imported_by else None
+        now = timezone.now()
+        values = [
+            (
+                member_id, type_id, amount, code, mpesa_phone, status,
+                verified_by_id if status != 'PENDING' else None,
+                verified_at, submitted_at, now, self.notes,
+                # COPY bypasses model defaults; _finish() scores pending rows
+                0, []
+            )
+            for _, member_id, type_id, amount, code, mpesa_phone, status, submitted_at, verified_at in rows
+        ]
+        field_names = [
+            'member', 'contribution_type', 'amount', 'mpesa_transaction_code', 'mpesa_phone_number',
+            'status', 'verified_by', 'verified_at', 'submitted_at', 'updated_at', 'notes',
+            'risk_score', 'risk_flags'
+        ]
+
+        if self.use_copy:
+            copy_rows(Contribution, field_names, values)
+        else:
+            created = Contribution.objects.bulk_create([
+                Contribution(**{
+                    (f'{name}_id' if name in ('member', 'contribution_type', 'verified_by') else name): value
+                    for name, value in zip(field_names, row)
+                })
+                for row in values
+            ])
+            if all(contribution.pk for contribution in created):
+                return {contribution.mpesa_transaction_code: contribution.pk for contribution in created}
+
+        return dict(
+            Contribution.objects.filter(mpesa_transaction_code__in=[row[4] for row in rows]).values_list(
+                'mpesa_transaction_code', 'pk'
+            )
+        )
+
+    def _insert_credits(self, rows, ids):
+        recorded_by_id = self.imported_by.pk if self.imported_by else None
+        credits = []
+        for _, member_id, type_id, amount, code, _, status, submitted_at, verified_at in rows:
+            if status != 'VERIFIED':
+                continue
+            credits.append((ids[code], member_id, type_id, 'CREDIT', amount, recorded_by_id, verified_at))
+
+            # Same bookkeeping as verify_contribution: balances and rollups follow the submission date
+            key = (member_id, type_id)
+            total, count, latest = self.deltas.get(key, (Decimal('0.00'), 0, None))
+            self.deltas[key] = (total + amount, count + 1, max(latest, submitted_at) if latest else submitted_at)
+            day_key = (member_id, type_id, local_date(submitted_at))
+            day_total, day_count = self.rollup_deltas.get(day_key, (Decimal('0.00'), 0))
+            self.rollup_deltas[day_key] = (day_total + amount, day_count + 1)
+            if self.earliest_credit is None or verified_at < self.earliest_credit:
+                self.earliest_credit = verified_at
+        if not credits:
+            return
+
+        field_names = ['contribution', 'member', 'contribution_type', 'entry_type', 'amount', 'recorded_by', 'created_at']
+        if self.use_copy:
+            copy_rows(ContributionLedgerEntry, field_names, credits)
+        else:
+            ContributionLedgerEntry.objects.bulk_create([
+                ContributionLedgerEntry(
+                    contribution_id=contribution_id,
+                    member_id=member_id,
+                    contribution_type_id=type_id,
+                    entry_type=entry_type,
+                    amount=amount,
+                    recorded_by_id=recorded_by_id,
+                    created_at=created_at
+                )
+                for contribution_id, member_id, type_id, entry_type, amount, recorded_by_id, created_at in credits
+            ])
+
+    def _finish(self):
+        """Bring balances, summaries, rollups, checkpoints and risk statistics up to date in one pass"""
+        if not self.imported:
+            return
+        rebuild_stats(timezone.now())
+        rescore_pending()
+        invalidate_dashboard_stats()
+        if not self.deltas:
+            return
+        keys = sorted(self.deltas)
+        for start in range(0, len(keys), BALANCE_CHUNK):
+            apply_balance_deltas({key: self.deltas[key] for key in keys[start:start + BALANCE_CHUNK]})
+        discard_checkpoints_after(self.earliest_credit)
+        days = sorted(self.rollup_deltas)
+        for start in range(0, len(days), BALANCE_CHUNK):
+            apply_rollup_deltas(
+                (member_id, type_id, local_midnight(day), *self.rollup_deltas[(member_id, type_id, day)])
+                for member_id, type_id, day in days[start:start + BALANCE_CHUNK]
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from contributions.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild daily and monthly contribution rollups from verified contributions, '
+        'streaming one month at a time. Run during a quiet period.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        written = backfill_rollups(
+            batch_size=options['batch_size'],
+            stdout=self.stdout if options['verbosity'] > 1 else None
+        )
+        self.stdout.write(self.style.SUCCESS(f'{written} rollup buckets written'))
@@ -0,0 +1,181 @@
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from contributions.dividends import day_boundaries, run_dividends
+from contributions.importer import copy_rows
+from contributions.models import Contribution, ContributionLedgerEntry, ContributionType
+from contributions.rollups import local_midnight
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Time run_dividends(dry_run=True) end to end on a throwaway ledger (default: 100k '
+        'members, 5 years of monthly contributions in 2 contribution types), including the '
+        'database reads. Seed time is reported separately; the data is deleted afterwards. '
+        'Run against a scratch PostgreSQL database: the dividend run covers every member.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100000)
+        parser.add_argument('--years', type=int, default=5)
+        parser.add_argument('--types', type=int, default=2)
+        parser.add_argument('--entries-per-year', type=int, default=12, help='Per member and type')
+        parser.add_argument('--chunk-size', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark data afterwards')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite is far slower at seeding; use small --members'))
+
+        rng = np.random.default_rng(options['seed'])
+        member_count, type_count = options['members'], options['types']
+        period_end = date(date.today().year - 1, 12, 31)
+        period_start = date(period_end.year - options['years'] + 1, 1, 1)
+        entry_count = member_count * type_count * options['entries_per_year'] * options['years']
+
+        first = local_midnight(period_start).timestamp()
+        last = local_midnight(period_end + timedelta(days=1)).timestamp()
+        positions = rng.integers(0, member_count, entry_count, dtype=np.int64)
+        type_positions = rng.integers(0, type_count, entry_count, dtype=np.int64)
+        timestamps = np.floor(rng.uniform(first, last, entry_count))
+        cents = rng.integers(100, 5000000, entry_count, dtype=np.int64)
+
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        types, members = self._seed(
+            run_id, member_count, type_count, positions, type_positions, timestamps, cents, options['chunk_size']
+        )
+        self.stdout.write(
+            f'Seeded {entry_count:,} ledger entries over {period_start} to {period_end} '
+            f'in {time.perf_counter() - started:.1f}s'
+        )
+
+        try:
+            started = time.perf_counter()
+            _, payouts = run_dividends(period_start, period_end, dry_run=True, chunk_size=options['chunk_size'])
+            elapsed = time.perf_counter() - started
+            errors = self._check(
+                payouts, types, members, day_boundaries(period_start, period_end),
+                positions, type_positions, timestamps, cents, rng
+            )
+        finally:
+            if not options['keep']:
+                self._clean_up(types, members)
+
+        if errors:
+            raise CommandError('Dividend mismatch:\n' + '\n'.join(errors))
+        bench_type_ids = {contribution_type.pk for contribution_type in types}
+        bench_total = sum(
+            (amount for _, type_id, _, _, amount in payouts if type_id in bench_type_ids),
+            Decimal('0.00')
+        )
+        self.stdout.write(
+            f'{len(payouts):,} payouts (KES {bench_total:,.2f} to benchmark members) in {elapsed:.2f}s '
+            f'({entry_count / elapsed:,.0f} entries/s)'
+        )
+        style = self.style.SUCCESS if elapsed < 60 else self.style.WARNING
+        self.stdout.write(style('Under a minute' if elapsed < 60 else 'Slower than a minute'))
+
+    def _seed(self, run_id, member_count, type_count, positions, type_positions, timestamps, cents, chunk_size):
+        """Create the members, types and ledger; each member and type share one synthetic contribution"""
+        types = [
+            ContributionType.objects.create(name=f'BENCH-{run_id}-{index}', dividend_rate=Decimal('12.50'))
+            for index in range(type_count)
+        ]
+        phone_prefix = f'+2549{random.randint(0, 999):03d}'
+        password = make_password(None)
+        members = User.objects.bulk_create(
+            [
+                User(
+                    phone_number=f'{phone_prefix}{index:07d}',
+                    first_name='Bench',
+                    last_name=f'Member {index}',
+                    password=password
+                )
+                for index in range(member_count)
+            ],
+            batch_size=5000
+        )
+        if not all(member.pk for member in members):
+            members = list(User.objects.filter(phone_number__startswith=phone_prefix).order_by('phone_number'))
+
+        Contribution.objects.bulk_create(
+            [
+                Contribution(
+                    member=member,
+                    contribution_type=contribution_type,
+                    amount=Decimal('1.00'),
+                    mpesa_transaction_code=f'D{run_id}{index:011d}',
+                    mpesa_phone_number=member.phone_number,
+                    status='VERIFIED'
+                )
+                for index, (member, contribution_type) in enumerate(
+                    (member, contribution_type) for member in members for contribution_type in types
+                )
+            ],
+            batch_size=5000
+        )
+        contribution_ids = dict(
+            ((member_id, type_id), pk)
+            for pk, member_id, type_id in Contribution.objects.filter(contribution_type__in=types).values_list(
+                'pk', 'member_id', 'contribution_type_id'
+            ).iterator(chunk_size=5000)
+        )
+
+        field_names = ['contribution', 'member', 'contribution_type', 'entry_type', 'amount', 'created_at']
+        for offset in range(0, len(positions), chunk_size):
+            window = slice(offset, offset + chunk_size)
+            rows = []
+            for position, type_position, timestamp, amount in zip(
+                positions[window].tolist(), type_positions[window].tolist(),
+                timestamps[window].tolist(), cents[window].tolist()
+            ):
+                member_id, type_id = members[position].pk, types[type_position].pk
+                rows.append((
+                    contribution_ids[(member_id, type_id)], member_id, type_id, 'CREDIT',
+                    Decimal(amount).scaleb(-2), datetime.fromtimestamp(timestamp, dt_timezone.utc)
+                ))
+            if connection.vendor == 'postgresql':
+                copy_rows(ContributionLedgerEntry, field_names, rows)
+            else:
+                ContributionLedgerEntry.objects.bulk_create(
+                    ContributionLedgerEntry(
+                        contribution_id=contribution_id, member_id=member_id, contribution_type_id=type_id,
+                        entry_type=entry_type, amount=amount, created_at=created_at
+                    )
+                    for contribution_id, member_id, type_id, entry_type, amount, created_at in rows
+                )
+        return types, members
+
+    def _check(self, payouts, types, members, boundaries, positions, type_positions, timestamps, cents, rng):
+        """Cross-check a sample of averages against a direct per-day computation from the seed arrays"""
+        averages = {(member_id, type_id): average for member_id, type_id, average, _, _ in payouts}
+        days = len(boundaries) - 1
+        errors = []
+        for position in rng.choice(len(members), size=min(5, len(members)), replace=False):
+            mask = (positions == position) & (type_positions == 0)
+            day = np.searchsorted(boundaries, timestamps[mask], side='right') - 1
+            closing = np.cumsum(np.bincount(day, weights=cents[mask], minlength=days))
+            expected = Decimal(int(np.floor(closing.sum() / days + 0.5))).scaleb(-2)
+            actual = averages.get((members[position].pk, types[0].pk), Decimal('0.00'))
+            if expected != actual:
+                errors.append(f'member {members[position].pk}: expected {expected}, got {actual}')
+        return errors
+
+    def _clean_up(self, types, members):
+        ContributionLedgerEntry.objects.filter(contribution_type__in=types).delete()
+        Contribution.objects.filter(contribution_type__in=types).delete()
+        User.objects.filter(pk__in=[member.pk for member in members]).delete()
+        ContributionType.objects.filter(pk__in=[contribution_type.pk for contribution_type in types]).delete()
@@ -0,0 +1,127 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from contributions.models import (
+    ContributionType, Contribution, SACCOBalance, ContributionSummary, ContributionLedgerEntry,
+    ContributionRollup, BalanceCheckpoint, MemberContributionStats
+)
+from contributions.services import ContributionStateError, verify_contribution, ledger_balance
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent verifications at a throwaway dataset and check that '
+        'the final balances are exact. Run against PostgreSQL; SQLite serialises writers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=10)
+        parser.add_argument('--contributions', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument(
+            '--duplicates', type=int, default=2,
+            help='How many times each contribution is verified concurrently'
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark data afterwards')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite serialises writers; results only show correctness'))
+
+        run_id = uuid.uuid4().hex[:8]
+        phone_prefix = f'+2547{random.randint(0, 999):03d}'
+        contribution_type = ContributionType.objects.create(name=f'BENCH-{run_id}')
+        admin = User.objects.create_user(
+            phone_number=f'{phone_prefix}99999',
+            first_name='Bench', last_name='Admin', role='ADMIN'
+        )
+        members = [
+            User.objects.create_user(
+                phone_number=f'{phone_prefix}{i:05d}',
+                first_name='Bench', last_name=f'Member {i}'
+            )
+            for i in range(options['members'])
+        ]
+        contributions = Contribution.objects.bulk_create([
+            Contribution(
+                member=members[i % len(members)],
+                contribution_type=contribution_type,
+                amount=Decimal(random.randint(100, 10000)),
+                mpesa_transaction_code=f'B{run_id}{i:07d}'[:20],
+                mpesa_phone_number='+254700000000'
+            )
+            for i in range(options['contributions'])
+        ])
+        contribution_ids = [c.pk for c in Contribution.objects.filter(contribution_type=contribution_type)]
+
+        def verify(contribution_id):
+            try:
+                contribution = Contribution.objects.get(pk=contribution_id)
+                verify_contribution(contribution, admin)
+                return True
+            except ContributionStateError:
+                return False
+            finally:
+                connections.close_all()
+
+        jobs = contribution_ids * options['duplicates']
+        random.shuffle(jobs)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(verify, jobs))
+        elapsed = time.perf_counter() - started
+
+        succeeded = sum(results)
+        self.stdout.write(
+            f'{len(jobs)} verification attempts, {succeeded} applied, '
+            f'{elapsed:.2f}s ({len(jobs) / elapsed:.0f} attempts/s)'
+        )
+
+        errors = []
+        if succeeded != len(contribution_ids):
+            errors.append(f'expected {len(contribution_ids)} applied verifications, got {succeeded}')
+
+        for member in members:
+            expected = sum(
+                (c.amount for c in contributions if c.member_id == member.pk),
+                Decimal('0.00')
+            )
+            balance = SACCOBalance.objects.filter(
+                member=member, contribution_type=contribution_type
+            ).values_list('total_balance', flat=True).first() or Decimal('0.00')
+            ledger = ledger_balance(member.pk, contribution_type.pk)
+            if not (balance == ledger == expected):
+                errors.append(f'member {member.pk}: balance {balance}, ledger {ledger}, expected {expected}')
+
+        summary = ContributionSummary.objects.get(contribution_type=contribution_type)
+        expected_total = sum((c.amount for c in contributions), Decimal('0.00'))
+        if summary.total_amount != expected_total or summary.total_contributions != len(contribution_ids):
+            errors.append(
+                f'summary: {summary.total_amount}/{summary.total_contributions}, '
+                f'expected {expected_total}/{len(contribution_ids)}'
+            )
+
+        if not options['keep']:
+            ContributionLedgerEntry.objects.filter(contribution_type=contribution_type).delete()
+            ContributionSummary.objects.filter(contribution_type=contribution_type).delete()
+            SACCOBalance.objects.filter(contribution_type=contribution_type).delete()
+            ContributionRollup.objects.filter(contribution_type=contribution_type).delete()
+            BalanceCheckpoint.objects.filter(contribution_type=contribution_type).delete()
+            MemberContributionStats.objects.filter(contribution_type=contribution_type).delete()
+            Contribution.objects.filter(contribution_type=contribution_type).delete()
+            User.objects.filter(pk__in=[admin.pk] + [m.pk for m in members]).delete()
+            contribution_type.delete()
+
+        if errors:
+            raise CommandError('Balance mismatch:\n' + '\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('All balances exact'))
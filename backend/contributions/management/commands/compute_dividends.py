@@ -0,0 +1,58 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from contributions.dividends import run_dividends
+from contributions.models import ContributionType, DividendRun
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute dividends on average daily balance for a calendar year (or a custom '
+        'period) using each contribution type\'s dividend rate, and record the payouts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Calendar year to pay dividends for')
+        parser.add_argument('--start', type=date.fromisoformat, help='First day of a custom period')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day of a custom period (inclusive)')
+        parser.add_argument('--dry-run', action='store_true', help='Compute and report without saving')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Ledger rows per NumPy batch')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        if options['year']:
+            period_start, period_end = date(options['year'], 1, 1), date(options['year'], 12, 31)
+        elif options['start'] and options['end']:
+            period_start, period_end = options['start'], options['end']
+        else:
+            raise CommandError('Pass --year, or both --start and --end')
+        if period_start > period_end:
+            raise CommandError('The period must start on or before its end')
+        if not options['dry_run'] and DividendRun.objects.filter(
+            period_start=period_start, period_end=period_end
+        ).exists():
+            raise CommandError(f'Dividends for {period_start} to {period_end} have already been recorded')
+
+        run, payouts = run_dividends(
+            period_start,
+            period_end,
+            dry_run=options['dry_run'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size']
+        )
+
+        totals = defaultdict(lambda: Decimal('0.00'))
+        for _, type_id, _, _, amount in payouts:
+            totals[type_id] += amount
+        type_names = dict(ContributionType.objects.values_list('pk', 'name'))
+        for type_id, total in sorted(totals.items()):
+            self.stdout.write(f'{type_names.get(type_id, type_id)}: KES {total}')
+
+        summary = f'{run.member_count} members, KES {run.total_amount} for {period_start} to {period_end}'
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{summary} (dry run, nothing saved)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{summary} (run {run.pk})'))
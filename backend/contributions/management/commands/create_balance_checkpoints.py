@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from contributions.checkpoints import create_balance_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        'Write monthly balance checkpoints for every closed month not yet checkpointed. '
+        'Schedule monthly, e.g. early on the 1st; missed months are caught up in order.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = create_balance_checkpoints(
+            batch_size=options['batch_size'],
+            stdout=self.stdout if options['verbosity'] > 1 else None
+        )
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} balance checkpoints'))
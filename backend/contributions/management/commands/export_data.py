@@ -0,0 +1,61 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from sacco_project.exports import EXPORT_DATASETS, export_filename, export_stream
+from sacco_project.streaming import STREAM_FORMATS
+
+
+class Command(BaseCommand):
+    help = (
+        'Export a full dataset (contributions, balances or SMS notifications) to a '
+        'gzip-compressed CSV or NDJSON file using a server-side cursor.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(EXPORT_DATASETS))
+        parser.add_argument('--format', dest='export_format', choices=list(STREAM_FORMATS), default='csv')
+        parser.add_argument('--output', help='Output path, "-" for stdout (default: <dataset>.<format>.gz)')
+        parser.add_argument('--since', help='Only rows on or after this ISO datetime')
+        parser.add_argument('--until', help='Only rows before this ISO datetime')
+        parser.add_argument('--no-compress', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def _parse(self, value, name):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f'--{name} must be an ISO datetime')
+        return parsed
+
+    def handle(self, *args, **options):
+        compress = not options['no_compress']
+        stream = export_stream(
+            options['dataset'],
+            options['export_format'],
+            since=self._parse(options['since'], 'since'),
+            until=self._parse(options['until'], 'until'),
+            compress=compress,
+            chunk_size=options['chunk_size']
+        )
+        output = options['output'] or export_filename(options['dataset'], options['export_format'], compress)
+
+        if output == '-':
+            target = sys.stdout.buffer
+            self._write(stream, target, compress)
+            target.flush()
+            return
+
+        with open(output, 'wb') as target:
+            written = self._write(stream, target, compress)
+        self.stderr.write(self.style.SUCCESS(f'Wrote {written} bytes to {output}'))
+
+    def _write(self, stream, target, compress):
+        written = 0
+        for chunk in stream:
+            data = chunk if compress else chunk.encode('utf-8')
+            target.write(data)
+            written += len(data)
+        return written
@@ -0,0 +1,70 @@
+import csv
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from contributions.importer import ContributionImporter, ContributionImportError
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Import historical contributions from a CSV file (Excel "Save as CSV" works). '
+        'Required columns: phone_number, contribution_type, amount, mpesa_transaction_code, '
+        'submitted_at; optional: mpesa_phone_number, status, verified_at. The whole file '
+        'is imported in one transaction; invalid rows are skipped and reported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--status', default='VERIFIED', choices=['PENDING', 'VERIFIED', 'REJECTED'],
+            help='Status for rows without a status column value'
+        )
+        parser.add_argument('--imported-by', help='Phone number of the admin recorded as verifier')
+        parser.add_argument('--errors', help='Write skipped rows and reasons to this CSV file')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and roll back')
+
+    def handle(self, *args, **options):
+        imported_by = None
+        if options['imported_by']:
+            imported_by = User.objects.filter(phone_number=options['imported_by']).first()
+            if imported_by is None:
+                raise CommandError(f"No user with phone number {options['imported_by']}")
+
+        started = time.perf_counter()
+        try:
+            importer = ContributionImporter(
+                imported_by=imported_by,
+                batch_size=options['batch_size'],
+                default_status=options['status'],
+                source=os.path.basename(options['path'])
+            )
+            with open(options['path'], 'rb') as file_obj:
+                importer.run(file_obj, dry_run=options['dry_run'])
+        except (OSError, ContributionImportError) as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for row_number, message in importer.errors[:20]:
+            self.stdout.write(f'Row {row_number}: {message}')
+        if importer.error_count > 20:
+            self.stdout.write(f'... and {importer.error_count - 20} more')
+        if options['errors'] and importer.errors:
+            with open(options['errors'], 'w', newline='') as errors_file:
+                writer = csv.writer(errors_file)
+                writer.writerow(['row', 'error'])
+                writer.writerows(importer.errors)
+
+        summary = (
+            f'{importer.imported} of {importer.rows_read} rows imported, '
+            f'{importer.error_count} skipped in {elapsed:.1f}s'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{summary} (dry run, rolled back)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
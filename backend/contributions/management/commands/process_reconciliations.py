@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from contributions.models import StatementReconciliation
+from contributions.reconciliation import run_reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Process uploaded M-Pesa statements waiting for reconciliation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('job_ids', nargs='*', type=int, help='Specific jobs to (re)run; defaults to all pending')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['job_ids']:
+            jobs = StatementReconciliation.objects.filter(pk__in=options['job_ids'])
+        else:
+            jobs = StatementReconciliation.objects.filter(status='PENDING').order_by('created_at')
+
+        for job in jobs.select_related('uploaded_by'):
+            self.stdout.write(f'Reconciling statement #{job.pk}...')
+            run_reconciliation(job, batch_size=options['batch_size'])
+            style = self.style.SUCCESS if job.status == 'COMPLETED' else self.style.ERROR
+            self.stdout.write(style(
+                f'#{job.pk} {job.status}: {job.rows_processed} rows, {job.verified_count} verified, '
+                f'{job.mismatch_count} mismatches' + (f' ({job.error_message})' if job.error_message else '')
+            ))
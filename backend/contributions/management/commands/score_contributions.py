@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from contributions.risk import rebuild_stats, rescore_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild per-member contribution statistics from history and rescore every '
+        'pending contribution. New submissions are scored as they arrive; run this '
+        'after imports or when tuning the scoring thresholds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-stats', action='store_true', help='Rescore using the stored statistics')
+        parser.add_argument('--chunk-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        if not options['skip_stats']:
+            rows = rebuild_stats(timezone.now(), chunk_size=options['chunk_size'])
+            self.stdout.write(f'Rebuilt statistics for {rows} member contribution types')
+        scored = rescore_pending(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rescored {scored} pending contributions'))
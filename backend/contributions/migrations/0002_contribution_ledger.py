@@ -0,0 +1,69 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributionLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('CREDIT', 'Verified Credit'), ('REVERSAL', 'Reversal')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Contribution Ledger Entry',
+                'verbose_name_plural': 'Contribution Ledger Entries',
+                'db_table': 'contribution_ledger_entries',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='contribution',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending Verification'), ('VERIFIED', 'Verified'), ('REJECTED', 'Rejected'), ('REVERSED', 'Reversed')], default='PENDING', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='saccobalance',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sacco_balances', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='contributionsummary',
+            constraint=models.UniqueConstraint(fields=('contribution_type',), name='unique_summary_per_contribution_type'),
+        ),
+        migrations.AddField(
+            model_name='contributionledgerentry',
+            name='contribution',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='contributions.contribution'),
+        ),
+        migrations.AddField(
+            model_name='contributionledgerentry',
+            name='contribution_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='contributions.contributiontype'),
+        ),
+        migrations.AddField(
+            model_name='contributionledgerentry',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='contributionledgerentry',
+            name='recorded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recorded_ledger_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='contributionledgerentry',
+            index=models.Index(fields=['member', 'contribution_type', 'created_at'], name='contributio_member__d9112a_idx'),
+        ),
+    ]
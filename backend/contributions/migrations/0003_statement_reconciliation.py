@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:17
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0002_contribution_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatementReconciliation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statement_file', models.FileField(upload_to='statements/%Y/%m/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['csv'])])),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('matched_count', models.PositiveIntegerField(default=0)),
+                ('verified_count', models.PositiveIntegerField(default=0)),
+                ('mismatch_count', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('uploaded_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='statement_reconciliations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Statement Reconciliation',
+                'verbose_name_plural': 'Statement Reconciliations',
+                'db_table': 'statement_reconciliations',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationMismatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mismatch_type', models.CharField(choices=[('AMOUNT', 'Amount Differs'), ('UNKNOWN_CODE', 'Unknown Transaction Code'), ('PHONE', 'Phone Number Differs')], max_length=15)),
+                ('row_number', models.PositiveIntegerField()),
+                ('transaction_code', models.CharField(max_length=20)),
+                ('statement_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('statement_phone_number', models.CharField(blank=True, max_length=20)),
+                ('contribution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_mismatches', to='contributions.contribution')),
+                ('reconciliation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mismatches', to='contributions.statementreconciliation')),
+            ],
+            options={
+                'verbose_name': 'Reconciliation Mismatch',
+                'verbose_name_plural': 'Reconciliation Mismatches',
+                'db_table': 'reconciliation_mismatches',
+                'ordering': ['row_number'],
+                'indexes': [models.Index(fields=['reconciliation', 'mismatch_type'], name='reconciliat_reconci_dcbb4f_idx')],
+            },
+        ),
+    ]
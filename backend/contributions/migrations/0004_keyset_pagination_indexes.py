@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0003_statement_reconciliation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contribution',
+            name='contributio_member__3d7f59_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='contribution',
+            name='contributio_status_197c87_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['member', '-submitted_at', '-id'], name='contributio_member__ace55d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['status', '-submitted_at', '-id'], name='contributio_status_eb46f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['-submitted_at', '-id'], name='contributio_submitt_978d40_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:23
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0004_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('DAY', 'Daily'), ('MONTH', 'Monthly')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('contribution_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contribution_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='rollups', to='contributions.contributiontype')),
+                ('member', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contribution_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Contribution Rollup',
+                'verbose_name_plural': 'Contribution Rollups',
+                'db_table': 'contribution_rollups',
+                'ordering': ['period_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contributionrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('member__isnull', False)), fields=('period', 'contribution_type', 'member', 'period_start'), name='unique_member_rollup_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='contributionrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('member__isnull', True)), fields=('period', 'contribution_type', 'period_start'), name='unique_type_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:29
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0006_balance_checkpoints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contributiontype',
+            name='dividend_rate',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Dividend (%) paid on the average daily balance over a dividend period', max_digits=5, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))]),
+        ),
+        migrations.CreateModel(
+            name='DividendRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('member_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('declared_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='declared_dividend_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Dividend Run',
+                'verbose_name_plural': 'Dividend Runs',
+                'db_table': 'dividend_runs',
+                'ordering': ['-period_end'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DividendPayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average_daily_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('contribution_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='dividend_payouts', to='contributions.contributiontype')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dividend_payouts', to=settings.AUTH_USER_MODEL)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payouts', to='contributions.dividendrun')),
+            ],
+            options={
+                'verbose_name': 'Dividend Payout',
+                'verbose_name_plural': 'Dividend Payouts',
+                'db_table': 'dividend_payouts',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dividendrun',
+            constraint=models.UniqueConstraint(fields=('period_start', 'period_end'), name='unique_dividend_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='dividendpayout',
+            constraint=models.UniqueConstraint(fields=('run', 'member', 'contribution_type'), name='unique_dividend_payout'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0008_historical_timestamps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberContributionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verified_count', models.IntegerField(default=0)),
+                ('amount_mean', models.FloatField(default=0)),
+                ('amount_m2', models.FloatField(default=0)),
+                ('submission_rate', models.FloatField(default=0)),
+                ('last_submitted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Member Contribution Stats',
+                'verbose_name_plural': 'Member Contribution Stats',
+                'db_table': 'member_contribution_stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='contribution',
+            name='risk_flags',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='contribution',
+            name='risk_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['status', '-risk_score', '-submitted_at', '-id'], name='contributio_status_1ca6b9_idx'),
+        ),
+        migrations.AddField(
+            model_name='membercontributionstats',
+            name='contribution_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='member_stats', to='contributions.contributiontype'),
+        ),
+        migrations.AddField(
+            model_name='membercontributionstats',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contribution_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='membercontributionstats',
+            constraint=models.UniqueConstraint(fields=('member', 'contribution_type'), name='unique_member_contribution_stats'),
+        ),
+    ]
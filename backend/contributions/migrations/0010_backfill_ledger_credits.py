@@ -0,0 +1,63 @@
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+BATCH_SIZE = 5000
+
+
+def backfill_ledger_credits(apps, schema_editor):
+    """
+    Give every verified contribution from before the ledger existed its CREDIT entry
+
+    Entries are dated when the contribution was verified (falling back to
+    when it was submitted), so ledger-based balances as of any date and
+    dividends see the money from the day it arrived. Balances already include
+    these amounts and are left alone; checkpoints taken after the earliest
+    backfilled credit were computed without it and are dropped.
+    """
+    Contribution = apps.get_model('contributions', 'Contribution')
+    ContributionLedgerEntry = apps.get_model('contributions', 'ContributionLedgerEntry')
+    BalanceCheckpoint = apps.get_model('contributions', 'BalanceCheckpoint')
+
+    missing = Contribution.objects.filter(status='VERIFIED').exclude(
+        Exists(ContributionLedgerEntry.objects.filter(contribution=OuterRef('pk'), entry_type='CREDIT'))
+    ).order_by('pk')
+
+    earliest = None
+    last_pk = 0
+    while True:
+        batch = list(missing.filter(pk__gt=last_pk).values_list(
+            'pk', 'member_id', 'contribution_type_id', 'amount', 'verified_by_id', 'verified_at', 'submitted_at'
+        )[:BATCH_SIZE])
+        if not batch:
+            break
+        entries = []
+        for pk, member_id, type_id, amount, verified_by_id, verified_at, submitted_at in batch:
+            created_at = verified_at or submitted_at
+            entries.append(ContributionLedgerEntry(
+                contribution_id=pk,
+                member_id=member_id,
+                contribution_type_id=type_id,
+                entry_type='CREDIT',
+                amount=amount,
+                recorded_by_id=verified_by_id,
+                created_at=created_at
+            ))
+            if earliest is None or created_at < earliest:
+                earliest = created_at
+        ContributionLedgerEntry.objects.bulk_create(entries)
+        last_pk = batch[-1][0]
+
+    if earliest is not None:
+        BalanceCheckpoint.objects.filter(as_of__gt=earliest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0009_anomaly_scoring'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger_credits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-18 13:50
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0010_backfill_ledger_credits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(django.db.models.functions.text.Upper('mpesa_transaction_code'), name='contribution_code_upper_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 
 from django.db import models
 from django.conf import settings
-from django.core.validators import MinValueValidator
+from django.core.validators import MinValueValidator, FileExtensionValidator
+from django.db.models.functions import Upper
+from django.utils import timezone
 from decimal import Decimal
 
 
@@ -11,6 +13,13 @@ class ContributionType(models.Model):
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    dividend_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        validators=[MinValueValidator(Decimal('0.00'))],
+        help_text="Dividend (%) paid on the average daily balance over a dividend period"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -29,6 +38,7 @@ class Contribution(models.Model):
         ('PENDING', 'Pending Verification'),
         ('VERIFIED', 'Verified'),
         ('REJECTED', 'Rejected'),
+        ('REVERSED', 'Reversed'),
     ]
     
     member = models.ForeignKey(
@@ -63,22 +73,31 @@ class Contribution(models.Model):
     verified_at = models.DateTimeField(null=True, blank=True)
     rejection_reason = models.TextField(blank=True, null=True)
     
-    # Timestamps
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Timestamps (defaulted rather than auto_now_add so historical imports keep their dates)
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
     
     # Additional metadata
     notes = models.TextField(blank=True, null=True)
     
+    # Anomaly score (0-100) and reasons, set at submission; see contributions.risk
+    risk_score = models.FloatField(default=0)
+    risk_flags = models.JSONField(default=list, blank=True)
+    
     class Meta:
         db_table = 'contributions'
         verbose_name = 'Contribution'
         verbose_name_plural = 'Contributions'
         ordering = ['-submitted_at']
         indexes = [
-            models.Index(fields=['member', '-submitted_at']),
-            models.Index(fields=['status', '-submitted_at']),
+            # Trailing -id keeps keyset pagination stable when timestamps tie
+            models.Index(fields=['member', '-submitted_at', '-id']),
+            models.Index(fields=['status', '-submitted_at', '-id']),
+            models.Index(fields=['status', '-risk_score', '-submitted_at', '-id']),
+            models.Index(fields=['-submitted_at', '-id']),
             models.Index(fields=['mpesa_transaction_code']),
+            # Statement and import lookups match codes case-insensitively
+            models.Index(Upper('mpesa_transaction_code'), name='contribution_code_upper_idx'),
         ]
     
     def __str__(self):
@@ -88,10 +107,10 @@ class Contribution(models.Model):
 class SACCOBalance(models.Model):
     """Track SACCO and MMF balances for each member"""
     
-    member = models.OneToOneField(
+    member = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name='sacco_balance'
+        related_name='sacco_balances'
     )
     contribution_type = models.ForeignKey(
         ContributionType,
@@ -141,6 +160,349 @@ class ContributionSummary(models.Model):
         db_table = 'contribution_summaries'
         verbose_name = 'Contribution Summary'
         verbose_name_plural = 'Contribution Summaries'
+        constraints = [
+            models.UniqueConstraint(fields=['contribution_type'], name='unique_summary_per_contribution_type'),
+        ]
+    
+    def __str__(self):
+        return f"{self.contribution_type.name} Summary - Total: KES {self.total_amount}"
+
+
+class ContributionLedgerEntry(models.Model):
+    """Append-only record of every credit applied to or reversed from a balance"""
+    
+    ENTRY_TYPE_CHOICES = [
+        ('CREDIT', 'Verified Credit'),
+        ('REVERSAL', 'Reversal'),
+    ]
+    
+    contribution = models.ForeignKey(
+        Contribution,
+        on_delete=models.PROTECT,
+        related_name='ledger_entries'
+    )
+    member = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries'
+    )
+    contribution_type = models.ForeignKey(
+        ContributionType,
+        on_delete=models.PROTECT,
+        related_name='ledger_entries'
+    )
+    
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPE_CHOICES)
+    # Signed amount: positive for credits, negative for reversals
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    recorded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='recorded_ledger_entries'
+    )
+    # When the balance moved; historical imports set it to the original verification time
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    
+    class Meta:
+        db_table = 'contribution_ledger_entries'
+        verbose_name = 'Contribution Ledger Entry'
+        verbose_name_plural = 'Contribution Ledger Entries'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['member', 'contribution_type', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_entry_type_display()} - {self.contribution.mpesa_transaction_code}: KES {self.amount}"
+    
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Ledger entries are append-only and cannot be modified')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ledger entries are append-only and cannot be deleted')
+
+
+class StatementReconciliation(models.Model):
+    """Reconciliation job matching an uploaded M-Pesa statement against pending contributions"""
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    statement_file = models.FileField(
+        upload_to='statements/%Y/%m/',
+        validators=[FileExtensionValidator(allowed_extensions=['csv'])]
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='statement_reconciliations'
+    )
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    
+    # Progress counters
+    rows_processed = models.PositiveIntegerField(default=0)
+    matched_count = models.PositiveIntegerField(default=0)
+    verified_count = models.PositiveIntegerField(default=0)
+    mismatch_count = models.PositiveIntegerField(default=0)
+    
+    error_message = models.TextField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'statement_reconciliations'
+        verbose_name = 'Statement Reconciliation'
+        verbose_name_plural = 'Statement Reconciliations'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Reconciliation #{self.pk} ({self.status})"
+
+
+class ReconciliationMismatch(models.Model):
+    """Statement row that could not be matched cleanly to a pending contribution"""
+    
+    MISMATCH_TYPE_CHOICES = [
+        ('AMOUNT', 'Amount Differs'),
+        ('UNKNOWN_CODE', 'Unknown Transaction Code'),
+        ('PHONE', 'Phone Number Differs'),
+    ]
+    
+    reconciliation = models.ForeignKey(
+        StatementReconciliation,
+        on_delete=models.CASCADE,
+        related_name='mismatches'
+    )
+    mismatch_type = models.CharField(max_length=15, choices=MISMATCH_TYPE_CHOICES)
+    row_number = models.PositiveIntegerField()
+    
+    # Statement side
+    transaction_code = models.CharField(max_length=20)
+    statement_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    statement_phone_number = models.CharField(max_length=20, blank=True)
+    
+    # Contribution side (matched by code, or suggested by amount and phone for unknown codes)
+    contribution = models.ForeignKey(
+        Contribution,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reconciliation_mismatches'
+    )
+    
+    class Meta:
+        db_table = 'reconciliation_mismatches'
+        verbose_name = 'Reconciliation Mismatch'
+        verbose_name_plural = 'Reconciliation Mismatches'
+        ordering = ['row_number']
+        indexes = [
+            models.Index(fields=['reconciliation', 'mismatch_type']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_mismatch_type_display()} - {self.transaction_code}"
+
+
+class ContributionRollup(models.Model):
+    """Daily and monthly verified contribution totals, per type and optionally per member"""
+    
+    PERIOD_CHOICES = [
+        ('DAY', 'Daily'),
+        ('MONTH', 'Monthly'),
+    ]
+    
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    # Local (Africa/Nairobi) date the bucket starts on; the 1st for monthly buckets
+    period_start = models.DateField()
+    
+    contribution_type = models.ForeignKey(
+        ContributionType,
+        on_delete=models.PROTECT,
+        related_name='rollups'
+    )
+    # Null for the SACCO-wide bucket of a contribution type
+    member = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='contribution_rollups'
+    )
+    
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    contribution_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'contribution_rollups'
+        verbose_name = 'Contribution Rollup'
+        verbose_name_plural = 'Contribution Rollups'
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'contribution_type', 'member', 'period_start'],
+                condition=models.Q(member__isnull=False),
+                name='unique_member_rollup_bucket'
+            ),
+            models.UniqueConstraint(
+                fields=['period', 'contribution_type', 'period_start'],
+                condition=models.Q(member__isnull=True),
+                name='unique_type_rollup_bucket'
+            ),
+        ]
+    
+    def __str__(self):
+        scope = self.member.full_name if self.member_id else 'All members'
+        return f"{self.contribution_type.name} {self.get_period_display()} {self.period_start} ({scope}): KES {self.total_amount}"
+
+
+class BalanceCheckpoint(models.Model):
+    """Ledger balance of a member and contribution type at a month boundary"""
+    
+    member = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='balance_checkpoints'
+    )
+    contribution_type = models.ForeignKey(
+        ContributionType,
+        on_delete=models.PROTECT,
+        related_name='balance_checkpoints'
+    )
+    
+    # Covers every ledger entry created strictly before this instant
+    # (local midnight on the 1st of a month, Africa/Nairobi)
+    as_of = models.DateTimeField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'balance_checkpoints'
+        verbose_name = 'Balance Checkpoint'
+        verbose_name_plural = 'Balance Checkpoints'
+        ordering = ['-as_of']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['member', 'contribution_type', 'as_of'],
+                name='unique_balance_checkpoint'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['as_of']),
+        ]
+    
+    def __str__(self):
+        return f"{self.member.full_name} - {self.contribution_type.name} at {self.as_of}: KES {self.balance}"
+
+
+class DividendRun(models.Model):
+    """A dividend declaration over a period of local calendar dates"""
+    
+    period_start = models.DateField()
+    # Inclusive: the last day whose closing balance counts
+    period_end = models.DateField()
+    
+    member_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    
+    declared_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='declared_dividend_runs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'dividend_runs'
+        verbose_name = 'Dividend Run'
+        verbose_name_plural = 'Dividend Runs'
+        ordering = ['-period_end']
+        constraints = [
+            models.UniqueConstraint(fields=['period_start', 'period_end'], name='unique_dividend_period'),
+        ]
+    
+    def __str__(self):
+        return f"Dividends {self.period_start} to {self.period_end}: KES {self.total_amount}"
+
+
+class DividendPayout(models.Model):
+    """A member's dividend for one contribution type within a DividendRun"""
+    
+    run = models.ForeignKey(DividendRun, on_delete=models.CASCADE, related_name='payouts')
+    member = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='dividend_payouts'
+    )
+    contribution_type = models.ForeignKey(
+        ContributionType,
+        on_delete=models.PROTECT,
+        related_name='dividend_payouts'
+    )
+    
+    average_daily_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    rate = models.DecimalField(max_digits=5, decimal_places=2)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    class Meta:
+        db_table = 'dividend_payouts'
+        verbose_name = 'Dividend Payout'
+        verbose_name_plural = 'Dividend Payouts'
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'member', 'contribution_type'], name='unique_dividend_payout'),
+        ]
+    
+    def __str__(self):
+        return f"{self.member.full_name} - {self.contribution_type.name}: KES {self.amount}"
+
+
+class MemberContributionStats(models.Model):
+    """Running statistics per member and contribution type used for anomaly scoring"""
+    
+    member = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='contribution_stats'
+    )
+    contribution_type = models.ForeignKey(
+        ContributionType,
+        on_delete=models.CASCADE,
+        related_name='member_stats'
+    )
+    
+    # Welford running mean / sum of squared deviations of verified amounts
+    verified_count = models.IntegerField(default=0)
+    amount_mean = models.FloatField(default=0)
+    amount_m2 = models.FloatField(default=0)
+    
+    # Exponentially decayed count of recent submissions
+    submission_rate = models.FloatField(default=0)
+    last_submitted_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'member_contribution_stats'
+        verbose_name = 'Member Contribution Stats'
+        verbose_name_plural = 'Member Contribution Stats'
+        constraints = [
+            models.UniqueConstraint(fields=['member', 'contribution_type'], name='unique_member_contribution_stats'),
+        ]
     
     def __str__(self):
-        return f"{self.contribution_type.name} Summary - Total: KES {self.total_amount}"
\ No newline at end of file
+        return f"{self.member.full_name} - {self.contribution_type.name}: {self.verified_count} verified"
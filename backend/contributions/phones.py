@@ -0,0 +1,28 @@
+"""Phone number normalisation shared by reconciliation, imports and anomaly scoring."""
+
+import re
+
+
+PHONE_PATTERN = re.compile(r'[\d*]{9,}')
+
+
+def normalize_phone(value):
+    """Reduce a phone number to 2547XXXXXXXX form, keeping '*' masks from statements"""
+    match = PHONE_PATTERN.search((value or '').replace(' ', '').replace('+', ''))
+    if not match:
+        return ''
+    phone = match.group(0)
+    if phone.startswith('0'):
+        phone = '254' + phone[1:]
+    elif len(phone) == 9:
+        phone = '254' + phone
+    return phone
+
+
+def phones_match(statement_phone, contribution_phone):
+    """Compare phones digit by digit, treating '*' in the statement as a wildcard"""
+    if not statement_phone:
+        return True
+    if len(statement_phone) != len(contribution_phone):
+        return False
+    return all(a == '*' or a == b for a, b in zip(statement_phone, contribution_phone))
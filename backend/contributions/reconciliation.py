@@ -0,0 +1,215 @@
+"""
+Streaming reconciliation of M-Pesa paybill statements against pending contributions.
+
+The statement is read row by row, so memory is bounded by the number of pending
+contributions (held in a hash index) rather than by the size of the statement.
+"""
+
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .models import Contribution, StatementReconciliation, ReconciliationMismatch
+from .phones import normalize_phone, phones_match
+from .services import bulk_process_contributions
+
+
+# Header aliases used by the different M-Pesa statement exports
+COLUMN_ALIASES = {
+    'code': ['Receipt No.', 'Receipt No', 'Transaction ID', 'TransID'],
+    'amount': ['Paid In', 'Amount', 'TransAmount'],
+    'phone': ['Other Party Info', 'MSISDN', 'Phone Number', 'Sender'],
+    'status': ['Transaction Status', 'Status'],
+}
+
+COMPLETED_STATUSES = {'', 'completed', 'success'}
+
+
+def parse_amount(value):
+    try:
+        return Decimal((value or '').replace(',', '').strip())
+    except InvalidOperation:
+        return None
+
+
+def _resolve_columns(fieldnames):
+    columns = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in fieldnames:
+                columns[key] = alias
+                break
+    missing = {'code', 'amount'} - set(columns)
+    if missing:
+        raise ValueError(f"Statement is missing required columns: {', '.join(sorted(missing))}")
+    return columns
+
+
+def iter_statement_rows(file_obj):
+    """
+    Yield (row_number, code, amount, phone) for completed credits in a statement
+
+    Args:
+        file_obj: Binary or text file object positioned at the start of the CSV
+    """
+    if isinstance(file_obj.read(0), bytes):
+        file_obj = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(file_obj)
+    columns = _resolve_columns(reader.fieldnames or [])
+
+    for row_number, row in enumerate(reader, start=2):
+        if 'status' in columns and (row.get(columns['status']) or '').strip().lower() not in COMPLETED_STATUSES:
+            continue
+        amount = parse_amount(row.get(columns['amount']))
+        code = (row.get(columns['code']) or '').strip().upper()
+        if not code or amount is None or amount <= 0:
+            continue
+        phone = normalize_phone(row.get(columns['phone'])) if 'phone' in columns else ''
+        yield row_number, code, amount, phone
+
+
+class PendingContributionIndex:
+    """In-memory hash index over pending contributions by code and by (amount, phone)"""
+
+    def __init__(self):
+        self.by_code = {}
+        self.by_amount_phone = {}
+        rows = Contribution.objects.filter(status='PENDING').values_list(
+            'pk', 'mpesa_transaction_code', 'amount', 'mpesa_phone_number'
+        ).iterator(chunk_size=5000)
+        for pk, code, amount, phone in rows:
+            phone = normalize_phone(phone)
+            self.by_code[code.upper()] = (pk, amount, phone)
+            self.by_amount_phone.setdefault((amount, phone), []).append(pk)
+
+    def pop(self, code):
+        entry = self.by_code.pop(code, None)
+        if entry is not None:
+            pk, amount, phone = entry
+            candidates = self.by_amount_phone.get((amount, phone))
+            if candidates and pk in candidates:
+                candidates.remove(pk)
+        return entry
+
+    def suggest(self, amount, phone):
+        """Return a pending contribution with the same amount and phone, if any"""
+        candidates = self.by_amount_phone.get((amount, phone))
+        return candidates[0] if candidates else None
+
+
+class StatementReconciler:
+    """Runs a StatementReconciliation job"""
+
+    def __init__(self, job, batch_size=500):
+        self.job = job
+        self.batch_size = batch_size
+        self.index = None
+        self.to_verify = []
+        self.mismatches = []
+        self.unknown = []
+
+    def run(self):
+        job = self.job
+        # A re-run replaces the previous run's results rather than adding to them
+        job.mismatches.all().delete()
+        job.rows_processed = job.matched_count = job.verified_count = job.mismatch_count = 0
+        job.error_message = None
+        job.status = 'RUNNING'
+        job.started_at = timezone.now()
+        job.completed_at = None
+        job.save(update_fields=[
+            'status', 'started_at', 'completed_at', 'error_message',
+            'rows_processed', 'matched_count', 'verified_count', 'mismatch_count'
+        ])
+
+        try:
+            self.index = PendingContributionIndex()
+            with job.statement_file.open('rb') as statement:
+                for row_number, code, amount, phone in iter_statement_rows(statement):
+                    job.rows_processed += 1
+                    self._match(row_number, code, amount, phone)
+                    if len(self.unknown) >= self.batch_size:
+                        self._flush_unknown()
+                    if len(self.to_verify) >= self.batch_size:
+                        self._flush_verified()
+                    if len(self.mismatches) >= self.batch_size:
+                        self._flush_mismatches()
+            self._flush_unknown()
+            self._flush_verified()
+            self._flush_mismatches()
+        except Exception as e:
+            job.status = 'FAILED'
+            job.error_message = str(e)
+        else:
+            job.status = 'COMPLETED'
+        job.completed_at = timezone.now()
+        job.save()
+        return job
+
+    def _match(self, row_number, code, amount, phone):
+        entry = self.index.pop(code)
+        if entry is None:
+            self.unknown.append((row_number, code, amount, phone))
+            return
+
+        pk, expected_amount, expected_phone = entry
+        if amount != expected_amount:
+            self._mismatch('AMOUNT', row_number, code, amount, phone, pk)
+        elif not phones_match(phone, expected_phone):
+            self._mismatch('PHONE', row_number, code, amount, phone, pk)
+        else:
+            self.job.matched_count += 1
+            self.to_verify.append({'id': pk, 'status': 'VERIFIED'})
+
+    def _mismatch(self, mismatch_type, row_number, code, amount, phone, contribution_id=None):
+        self.job.mismatch_count += 1
+        self.mismatches.append(ReconciliationMismatch(
+            reconciliation=self.job,
+            mismatch_type=mismatch_type,
+            row_number=row_number,
+            transaction_code=code[:20],
+            statement_amount=amount,
+            statement_phone_number=phone[:20],
+            contribution_id=contribution_id
+        ))
+
+    def _flush_unknown(self):
+        """Report statement codes that match no contribution at all"""
+        if not self.unknown:
+            return
+        # Statement codes are upper-cased; stored codes may not be
+        known = set(
+            Contribution.objects.annotate(code=Upper('mpesa_transaction_code')).filter(
+                code__in=[code for _, code, _, _ in self.unknown]
+            ).values_list('code', flat=True)
+        )
+        for row_number, code, amount, phone in self.unknown:
+            if code not in known:
+                self._mismatch('UNKNOWN_CODE', row_number, code, amount, phone, self.index.suggest(amount, phone))
+        self.unknown = []
+
+    def _flush_verified(self):
+        if not self.to_verify:
+            return
+        results = bulk_process_contributions(self.to_verify, self.job.uploaded_by)
+        self.job.verified_count += sum(1 for result in results if result['success'])
+        self.to_verify = []
+        StatementReconciliation.objects.filter(pk=self.job.pk).update(
+            rows_processed=self.job.rows_processed,
+            matched_count=self.job.matched_count,
+            verified_count=self.job.verified_count,
+            mismatch_count=self.job.mismatch_count
+        )
+
+    def _flush_mismatches(self):
+        if self.mismatches:
+            ReconciliationMismatch.objects.bulk_create(self.mismatches)
+            self.mismatches = []
+
+
+def run_reconciliation(job, batch_size=500):
+    """Process a single reconciliation job"""
+    return StatementReconciler(job, batch_size=batch_size).run()
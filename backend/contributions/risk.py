@@ -0,0 +1,360 @@
+"""
+Anomaly scoring for submitted contributions.
+
+Each submission gets a 0-100 risk score from four signals:
+
+- AMOUNT_OUTLIER: the amount is far from the member's verified amounts for
+  that contribution type (z-score against a running mean and variance)
+- PHONE_MISMATCH: the paying M-Pesa number is not the member's own
+- CODE_PATTERN: the transaction code does not look like an M-Pesa receipt
+- BURST: many submissions in a short time (exponentially decayed rate)
+
+Statistics live in MemberContributionStats and are updated in O(1) per
+submission, verification or reversal (Welford / Chan updates), so scoring never
+rescans history. score_contributions rebuilds them and rescores the pending
+queue with NumPy when needed.
+"""
+
+import math
+import re
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import Contribution, ContributionType, MemberContributionStats
+from .phones import normalize_phone
+
+
+MPESA_CODE_PATTERN = re.compile(r'^[A-Z][A-Z0-9]{9}$')
+
+# Verified amounts needed before outliers are flagged
+MIN_HISTORY = 3
+OUTLIER_Z = 3.0
+# Floor on the standard deviation, as a fraction of the mean, so members who
+# always pay the same amount are not flagged for a small change
+RELATIVE_STD_FLOOR = 0.05
+
+# Decay time constant (seconds) of the submission rate, and the rate that counts as a burst
+BURST_TAU = 3600.0
+BURST_RATE = 3.0
+
+WEIGHTS = {
+    'AMOUNT_OUTLIER': 40.0,
+    'PHONE_MISMATCH': 25.0,
+    'CODE_PATTERN': 25.0,
+    'BURST': 10.0,
+}
+
+
+def code_is_suspicious(code):
+    return not MPESA_CODE_PATTERN.match((code or '').strip().upper())
+
+
+def phone_mismatch(mpesa_phone_number, member_phone_number):
+    return normalize_phone(mpesa_phone_number) != normalize_phone(member_phone_number)
+
+
+def score_arrays(amounts, counts, means, m2s, phone_mismatches, bad_codes, rates):
+    """
+    Vectorised risk scores
+
+    All arguments are equal-length arrays (or scalars). Returns (scores,
+    flags) where flags maps each flag name to a boolean array.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    means = np.asarray(means, dtype=np.float64)
+    variance = np.divide(np.asarray(m2s, dtype=np.float64), counts, out=np.zeros_like(counts), where=counts > 0)
+    std = np.maximum(np.sqrt(np.maximum(variance, 0)), np.maximum(np.abs(means) * RELATIVE_STD_FLOOR, 1.0))
+    z = np.abs(amounts - means) / std
+
+    flags = {
+        'AMOUNT_OUTLIER': (counts >= MIN_HISTORY) & (z >= OUTLIER_Z),
+        'PHONE_MISMATCH': np.asarray(phone_mismatches, dtype=bool),
+        'CODE_PATTERN': np.asarray(bad_codes, dtype=bool),
+        'BURST': np.asarray(rates, dtype=np.float64) > BURST_RATE,
+    }
+    # Outliers scale from half weight at the threshold to full weight at twice it
+    outlier = np.where(flags['AMOUNT_OUTLIER'], np.minimum(z / (2 * OUTLIER_Z), 1.0), 0.0)
+    scores = (
+        WEIGHTS['AMOUNT_OUTLIER'] * outlier
+        + WEIGHTS['PHONE_MISMATCH'] * flags['PHONE_MISMATCH']
+        + WEIGHTS['CODE_PATTERN'] * flags['CODE_PATTERN']
+        + WEIGHTS['BURST'] * flags['BURST']
+    )
+    return np.round(scores, 1), flags
+
+
+def _flag_names(flags, index=None):
+    return [name for name, mask in flags.items() if (mask[index] if index is not None else mask)]
+
+
+def score_submission(contribution):
+    """
+    Score a newly created contribution and record the submission for burst detection
+
+    One locked read and one write of the member's stats row; must be called
+    inside a transaction.
+    """
+    stats, _ = MemberContributionStats.objects.select_for_update().get_or_create(
+        member_id=contribution.member_id,
+        contribution_type_id=contribution.contribution_type_id
+    )
+    rate = 1.0
+    if stats.last_submitted_at is not None:
+        elapsed = max((contribution.submitted_at - stats.last_submitted_at).total_seconds(), 0.0)
+        rate += stats.submission_rate * math.exp(-elapsed / BURST_TAU)
+    MemberContributionStats.objects.filter(pk=stats.pk).update(
+        submission_rate=rate,
+        last_submitted_at=contribution.submitted_at
+    )
+
+    score, flags = score_arrays(
+        float(contribution.amount),
+        stats.verified_count,
+        stats.amount_mean,
+        stats.amount_m2,
+        phone_mismatch(contribution.mpesa_phone_number, contribution.member.phone_number),
+        code_is_suspicious(contribution.mpesa_transaction_code),
+        rate
+    )
+    contribution.risk_score = float(score)
+    contribution.risk_flags = _flag_names(flags)
+    Contribution.objects.filter(pk=contribution.pk).update(
+        risk_score=contribution.risk_score,
+        risk_flags=contribution.risk_flags
+    )
+    return contribution
+
+
+def _group_amounts(items):
+    groups = {}
+    for member_id, type_id, amount in items:
+        groups.setdefault((member_id, type_id), []).append(float(amount))
+    return groups
+
+
+def record_verified_amounts(items):
+    """
+    Fold verified amounts into the running amount statistics
+
+    Args:
+        items: Iterable of (member_id, contribution_type_id, amount)
+
+    Amounts are grouped per key first and merged with Chan's parallel update,
+    so each stats row is locked and written once. Must be called inside a
+    transaction.
+    """
+    groups = _group_amounts(items)
+    if not groups:
+        return
+
+    keys = sorted(groups)
+    MemberContributionStats.objects.bulk_create(
+        [MemberContributionStats(member_id=member_id, contribution_type_id=type_id) for member_id, type_id in keys],
+        ignore_conflicts=True
+    )
+    for member_id, type_id in keys:
+        stats = MemberContributionStats.objects.select_for_update().get(
+            member_id=member_id, contribution_type_id=type_id
+        )
+        amounts = np.array(groups[(member_id, type_id)])
+        batch_count = len(amounts)
+        batch_mean = amounts.mean()
+        batch_m2 = ((amounts - batch_mean) ** 2).sum()
+
+        count = stats.verified_count + batch_count
+        delta = batch_mean - stats.amount_mean
+        MemberContributionStats.objects.filter(pk=stats.pk).update(
+            verified_count=F('verified_count') + batch_count,
+            amount_mean=stats.amount_mean + delta * batch_count / count,
+            amount_m2=stats.amount_m2 + batch_m2 + delta ** 2 * stats.verified_count * batch_count / count
+        )
+
+
+def forget_verified_amounts(items):
+    """
+    Take amounts that are no longer verified (reversals) out of the running statistics
+
+    The inverse of record_verified_amounts: Chan's update solved for the
+    remaining part. Must be called inside a transaction.
+    """
+    groups = _group_amounts(items)
+    for member_id, type_id in sorted(groups):
+        stats = MemberContributionStats.objects.select_for_update().filter(
+            member_id=member_id, contribution_type_id=type_id
+        ).first()
+        if stats is None:
+            continue
+        amounts = np.array(groups[(member_id, type_id)])
+        batch_count = len(amounts)
+        batch_mean = amounts.mean()
+        batch_m2 = ((amounts - batch_mean) ** 2).sum()
+
+        count = stats.verified_count - batch_count
+        if count <= 0:
+            mean, m2 = 0.0, 0.0
+        else:
+            mean = (stats.amount_mean * stats.verified_count - batch_mean * batch_count) / count
+            delta = batch_mean - mean
+            m2 = max(stats.amount_m2 - batch_m2 - delta ** 2 * count * batch_count / stats.verified_count, 0.0)
+        MemberContributionStats.objects.filter(pk=stats.pk).update(
+            verified_count=max(count, 0),
+            amount_mean=mean,
+            amount_m2=m2
+        )
+
+
+def _dense_keys(member_ids, type_ids):
+    """Map (member, type) pairs to dense group indices"""
+    pairs = np.stack([member_ids, type_ids], axis=1)
+    unique, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    return unique, inverse.reshape(-1)
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def rebuild_stats(now, chunk_size=50000, batch_size=5000):
+    """
+    Recompute every MemberContributionStats row from history with NumPy
+
+    Contributions are read in chunks into dense arrays indexed by member and
+    contribution type. Amount statistics come from verified contributions; the
+    submission rate is the decayed count of all submissions up to `now`.
+
+    Returns:
+        Number of stats rows written
+    """
+    type_ids = np.array(sorted(ContributionType.objects.values_list('pk', flat=True)), dtype=np.int64)
+    if not len(type_ids):
+        return 0
+    member_capacity = (get_user_model().objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+    size = member_capacity * len(type_ids)
+    counts, sums, squares = np.zeros(size), np.zeros(size), np.zeros(size)
+    rates, last = np.zeros(size), np.full(size, -np.inf)
+    now_ts = now.timestamp()
+
+    rows = Contribution.objects.filter(member_id__lt=member_capacity).order_by().values_list(
+        'member_id', 'contribution_type_id', 'amount', 'status', 'submitted_at'
+    ).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        members = np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk))
+        types = np.fromiter((row[1] for row in chunk), dtype=np.int64, count=len(chunk))
+        amounts = np.fromiter((row[2] for row in chunk), dtype=np.float64, count=len(chunk))
+        verified = np.fromiter((row[3] == 'VERIFIED' for row in chunk), dtype=np.float64, count=len(chunk))
+        submitted = np.fromiter((row[4].timestamp() for row in chunk), dtype=np.float64, count=len(chunk))
+
+        keys = members * len(type_ids) + np.searchsorted(type_ids, types)
+        counts += np.bincount(keys, weights=verified, minlength=size)
+        sums += np.bincount(keys, weights=amounts * verified, minlength=size)
+        squares += np.bincount(keys, weights=amounts * amounts * verified, minlength=size)
+        rates += np.bincount(keys, weights=np.exp(-np.maximum(now_ts - submitted, 0) / BURST_TAU), minlength=size)
+        np.maximum.at(last, keys, submitted)
+
+    means = np.divide(sums, counts, out=np.zeros(size), where=counts > 0)
+    m2 = np.maximum(squares - sums * means, 0)
+    present = np.flatnonzero(np.isfinite(last))
+
+    with transaction.atomic():
+        MemberContributionStats.objects.all().delete()
+        MemberContributionStats.objects.bulk_create(
+            (
+                MemberContributionStats(
+                    member_id=int(key // len(type_ids)),
+                    contribution_type_id=int(type_ids[key % len(type_ids)]),
+                    verified_count=int(round(counts[key])),
+                    amount_mean=float(means[key]),
+                    amount_m2=float(m2[key]),
+                    submission_rate=float(rates[key]),
+                    last_submitted_at=datetime.fromtimestamp(last[key], tz=dt_timezone.utc)
+                )
+                for key in present
+            ),
+            batch_size=batch_size
+        )
+    return len(present)
+
+
+def _submission_rates(member_ids, type_ids, timestamps):
+    """
+    Decayed submission rate at the moment of each submission, counting itself
+
+    Within each (member, type) the rate at submission k is
+    sum(exp(-(t_k - t_j) / tau)) over j <= k, computed for all rows at once
+    with a cumulative log-sum-exp. Groups are spread far apart in time so
+    earlier groups decay to nothing.
+    """
+    _, group = _dense_keys(member_ids, type_ids)
+    order = np.lexsort((timestamps, group))
+    elapsed = (timestamps[order] - timestamps.min()) / BURST_TAU
+    # Each group starts well after the previous one ends, so exp(-gap) vanishes
+    scaled = elapsed + group[order] * (elapsed.max() + 50.0)
+    log_cumulative = np.logaddexp.accumulate(scaled)
+    rates = np.empty(len(timestamps))
+    rates[order] = np.exp(log_cumulative - scaled)
+    return rates
+
+
+def rescore_pending(chunk_size=50000, batch_size=2000):
+    """Rescore every pending contribution against the current statistics"""
+    pending = list(
+        Contribution.objects.filter(status='PENDING').order_by().values_list(
+            'pk', 'member_id', 'contribution_type_id', 'amount', 'mpesa_transaction_code',
+            'mpesa_phone_number', 'member__phone_number', 'submitted_at'
+        ).iterator(chunk_size=chunk_size)
+    )
+    if not pending:
+        return 0
+
+    stats = {
+        (member_id, type_id): (count, mean, m2)
+        for member_id, type_id, count, mean, m2 in MemberContributionStats.objects.values_list(
+            'member_id', 'contribution_type_id', 'verified_count', 'amount_mean', 'amount_m2'
+        ).iterator(chunk_size=chunk_size)
+    }
+    member_ids = np.array([row[1] for row in pending], dtype=np.int64)
+    history = np.array([stats.get((row[1], row[2]), (0, 0.0, 0.0)) for row in pending], dtype=np.float64)
+
+    # Burst rates over every submission (not just pending ones) for these pairs
+    submissions = Contribution.objects.filter(
+        member_id__in=set(member_ids.tolist())
+    ).order_by().values_list('pk', 'member_id', 'contribution_type_id', 'submitted_at').iterator(chunk_size=chunk_size)
+    all_ids, all_members, all_types, all_times = [], [], [], []
+    for pk, member_id, type_id, submitted_at in submissions:
+        all_ids.append(pk)
+        all_members.append(member_id)
+        all_types.append(type_id)
+        all_times.append(submitted_at.timestamp())
+    all_rates = _submission_rates(
+        np.array(all_members, dtype=np.int64), np.array(all_types, dtype=np.int64), np.array(all_times)
+    )
+    rate_by_id = dict(zip(all_ids, all_rates.tolist()))
+
+    scores, flags = score_arrays(
+        [float(row[3]) for row in pending],
+        history[:, 0],
+        history[:, 1],
+        history[:, 2],
+        [phone_mismatch(row[5], row[6]) for row in pending],
+        [code_is_suspicious(row[4]) for row in pending],
+        [rate_by_id.get(row[0], 1.0) for row in pending]
+    )
+
+    updates = [
+        Contribution(pk=row[0], risk_score=float(scores[index]), risk_flags=_flag_names(flags, index))
+        for index, row in enumerate(pending)
+    ]
+    Contribution.objects.bulk_update(updates, ['risk_score', 'risk_flags'], batch_size=batch_size)
+    return len(updates)
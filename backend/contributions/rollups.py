@@ -0,0 +1,178 @@
+"""
+Time-bucketed contribution rollups.
+
+Verified contributions are added to daily and monthly buckets (Africa/Nairobi
+local dates, keyed on submission time) as they are verified, so trend charts
+read a handful of pre-aggregated rows instead of grouping the raw
+contributions table.
+"""
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Contribution, ContributionRollup
+
+
+ROLLUP_TIME_ZONE = ZoneInfo('Africa/Nairobi')
+
+
+def rollups_per_member():
+    return getattr(settings, 'CONTRIBUTION_ROLLUPS_PER_MEMBER', True)
+
+
+def local_date(value):
+    """Local calendar date of an aware datetime"""
+    return timezone.localtime(value, ROLLUP_TIME_ZONE).date()
+
+
+def local_midnight(day):
+    """Aware datetime at the start of a local calendar date"""
+    return datetime.combine(day, time.min, tzinfo=ROLLUP_TIME_ZONE)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _bucket_keys(member_id, contribution_type_id, day):
+    """Every rollup bucket a contribution on `day` counts towards"""
+    members = [None, member_id] if rollups_per_member() else [None]
+    for member in members:
+        yield ('DAY', contribution_type_id, member, day)
+        yield ('MONTH', contribution_type_id, member, month_start(day))
+
+
+def apply_rollup_deltas(entries):
+    """
+    Add contributions to their rollup buckets with atomic increments
+
+    Args:
+        entries: Iterable of (member_id, contribution_type_id, submitted_at, amount, count)
+            where amount and count are signed (negative for reversals)
+
+    Must be called inside a transaction.
+    """
+    deltas = {}
+    for member_id, type_id, submitted_at, amount, count in entries:
+        for key in _bucket_keys(member_id, type_id, local_date(submitted_at)):
+            bucket_amount, bucket_count = deltas.get(key, (Decimal('0.00'), 0))
+            deltas[key] = (bucket_amount + amount, bucket_count + count)
+    if not deltas:
+        return
+
+    keys = sorted(deltas, key=lambda key: (key[0], key[1], key[2] or 0, key[3]))
+    ContributionRollup.objects.bulk_create(
+        [
+            ContributionRollup(period=period, contribution_type_id=type_id, member_id=member_id, period_start=start)
+            for period, type_id, member_id, start in keys
+        ],
+        ignore_conflicts=True
+    )
+    now = timezone.now()
+    for period, type_id, member_id, start in keys:
+        amount, count = deltas[(period, type_id, member_id, start)]
+        ContributionRollup.objects.filter(
+            period=period,
+            contribution_type_id=type_id,
+            member_id=member_id,
+            period_start=start
+        ).update(
+            total_amount=F('total_amount') + amount,
+            contribution_count=F('contribution_count') + count,
+            updated_at=now
+        )
+
+
+def rollup_series(period, start, end, contribution_type_id=None, member_id=None):
+    """
+    Rollup rows for a date range, oldest first
+
+    Served from the rollup buckets' unique index: one range read whatever the span.
+    """
+    queryset = ContributionRollup.objects.filter(
+        period=period,
+        period_start__gte=start,
+        period_start__lte=end,
+    )
+    if member_id is None:
+        queryset = queryset.filter(member__isnull=True)
+    else:
+        queryset = queryset.filter(member_id=member_id)
+    if contribution_type_id is not None:
+        queryset = queryset.filter(contribution_type_id=contribution_type_id)
+    return queryset.order_by('period_start', 'contribution_type_id')
+
+
+def month_windows(first, last):
+    """Yield (start, end) local midnight datetimes for each month from first to last"""
+    current = month_start(first)
+    while current <= last:
+        following = date(current.year + (current.month == 12), current.month % 12 + 1, 1)
+        yield local_midnight(current), local_midnight(following)
+        current = following
+
+
+def backfill_rollups(batch_size=1000, stdout=None):
+    """
+    Rebuild every rollup bucket from verified contributions, one month at a time
+
+    Each month is grouped by local day in the database and written with
+    bulk_create, so memory is bounded by the buckets in a single month. The
+    rebuild runs in one transaction so readers never see a partial series.
+
+    Returns:
+        Number of rollup rows written
+    """
+    with transaction.atomic():
+        return _rebuild_rollups(batch_size, stdout)
+
+
+def _rebuild_rollups(batch_size, stdout):
+    verified = Contribution.objects.filter(status='VERIFIED').order_by()
+    bounds = verified.aggregate(first=Min('submitted_at'), last=Max('submitted_at'))
+    ContributionRollup.objects.all().delete()
+    if bounds['first'] is None:
+        return 0
+
+    group_by = ['contribution_type_id', 'member_id'] if rollups_per_member() else ['contribution_type_id']
+    written = 0
+    for window_start, window_end in month_windows(local_date(bounds['first']), local_date(bounds['last'])):
+        rows = verified.filter(
+            submitted_at__gte=window_start,
+            submitted_at__lt=window_end
+        ).annotate(
+            day=TruncDate('submitted_at', tzinfo=ROLLUP_TIME_ZONE)
+        ).values('day', *group_by).annotate(amount=Sum('amount'), count=Count('pk'))
+
+        buckets = {}
+        for row in rows:
+            member_id = row.get('member_id')
+            for key in _bucket_keys(member_id, row['contribution_type_id'], row['day']):
+                amount, count = buckets.get(key, (Decimal('0.00'), 0))
+                buckets[key] = (amount + row['amount'], count + row['count'])
+
+        ContributionRollup.objects.bulk_create(
+            [
+                ContributionRollup(
+                    period=period,
+                    contribution_type_id=type_id,
+                    member_id=member_id,
+                    period_start=start,
+                    total_amount=amount,
+                    contribution_count=count
+                )
+                for (period, type_id, member_id, start), (amount, count) in buckets.items()
+            ],
+            batch_size=batch_size
+        )
+        written += len(buckets)
+        if stdout is not None:
+            stdout.write(f'{window_start:%Y-%m}: {len(buckets)} buckets')
+    return written
@@ -1,6 +1,11 @@
 
 from rest_framework import serializers
-from .models import ContributionType, Contribution, SACCOBalance, ContributionSummary
+from django.db import IntegrityError, transaction
+from .models import (
+    ContributionType, Contribution, SACCOBalance, ContributionSummary,
+    StatementReconciliation, ReconciliationMismatch, ContributionRollup
+)
+from .risk import score_submission
 from accounts.serializers import UserSerializer
 
 
@@ -9,7 +14,7 @@ class ContributionTypeSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ContributionType
-        fields = ['id', 'name', 'description', 'is_active', 'created_at']
+        fields = ['id', 'name', 'description', 'is_active', 'dividend_rate', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
@@ -31,18 +36,34 @@ class ContributionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'member', 'status', 'verified_by', 'verified_at', 'submitted_at', 'updated_at']
 
 
+class PendingContributionSerializer(ContributionSerializer):
+    """Contribution with its anomaly score, for the admin verification queue"""
+    
+    class Meta(ContributionSerializer.Meta):
+        fields = ContributionSerializer.Meta.fields + ['risk_score', 'risk_flags']
+        read_only_fields = ContributionSerializer.Meta.read_only_fields + ['risk_score', 'risk_flags']
+
+
 class ContributionCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating contributions (member submission)"""
     
     class Meta:
         model = Contribution
         fields = ['contribution_type', 'amount', 'mpesa_transaction_code', 'mpesa_phone_number', 'notes']
+        # Uniqueness is enforced by the database index instead of a pre-check query
+        extra_kwargs = {'mpesa_transaction_code': {'validators': []}}
     
-    def validate_mpesa_transaction_code(self, value):
-        """Validate that M-Pesa transaction code is unique"""
-        if Contribution.objects.filter(mpesa_transaction_code=value).exists():
-            raise serializers.ValidationError("This M-Pesa transaction code has already been submitted")
-        return value
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                contribution = super().create(validated_data)
+                return score_submission(contribution)
+        except IntegrityError as e:
+            if 'mpesa_transaction_code' not in str(e):
+                raise
+            raise serializers.ValidationError({
+                'mpesa_transaction_code': ["This M-Pesa transaction code has already been submitted"]
+            })
 
 
 class ContributionVerificationSerializer(serializers.Serializer):
@@ -57,6 +78,30 @@ class ContributionVerificationSerializer(serializers.Serializer):
         return attrs
 
 
+class ContributionBulkDecisionSerializer(ContributionVerificationSerializer):
+    """Single decision within a bulk verification request"""
+    
+    id = serializers.IntegerField()
+
+
+class ContributionBulkVerificationSerializer(serializers.Serializer):
+    """Serializer for admin bulk verification of contributions"""
+    
+    decisions = ContributionBulkDecisionSerializer(many=True, allow_empty=False, max_length=1000)
+    
+    def validate_decisions(self, value):
+        ids = [decision['id'] for decision in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each contribution can only appear once per request")
+        return value
+
+
+class ContributionReversalSerializer(serializers.Serializer):
+    """Serializer for admin reversal of verified contributions"""
+    
+    reason = serializers.CharField()
+
+
 class SACCOBalanceSerializer(serializers.ModelSerializer):
     """Serializer for SACCO Balance"""
     
@@ -70,6 +115,65 @@ class SACCOBalanceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'total_balance', 'last_contribution_date', 'updated_at']
 
 
+class ContributionRollupSerializer(serializers.ModelSerializer):
+    """Serializer for a daily or monthly contribution rollup bucket"""
+    
+    contribution_type_name = serializers.CharField(source='contribution_type.name', read_only=True)
+    
+    class Meta:
+        model = ContributionRollup
+        fields = ['period', 'period_start', 'contribution_type', 'contribution_type_name',
+                  'member', 'total_amount', 'contribution_count']
+        read_only_fields = fields
+
+
+class ContributionTrendQuerySerializer(serializers.Serializer):
+    """Query parameters for contribution trend series"""
+    
+    period = serializers.ChoiceField(choices=['DAY', 'MONTH'], default='MONTH')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    contribution_type = serializers.IntegerField(required=False)
+    member = serializers.IntegerField(required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({"start": "Start date must be on or before end date"})
+        return attrs
+
+
+class MemberStatementQuerySerializer(serializers.Serializer):
+    """Query parameters for streamed member statements"""
+    
+    export = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    contribution_type = serializers.IntegerField(required=False)
+    member = serializers.IntegerField(required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({"start": "Start date must be on or before end date"})
+        return attrs
+
+
+class BalanceAsOfQuerySerializer(serializers.Serializer):
+    """Query parameters for point-in-time balances"""
+    
+    date = serializers.DateField()
+    contribution_type = serializers.IntegerField(required=False)
+    member = serializers.IntegerField(required=False)
+    export = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+
+
+class BalanceAsOfSerializer(serializers.Serializer):
+    """A member's balance for one contribution type at the end of a date"""
+    
+    contribution_type = serializers.IntegerField()
+    contribution_type_name = serializers.CharField()
+    balance = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
 class ContributionSummarySerializer(serializers.ModelSerializer):
     """Serializer for Contribution Summary"""
     
@@ -87,4 +191,43 @@ class MemberBalanceSerializer(serializers.Serializer):
     
     contribution_type = serializers.CharField()
     total_balance = serializers.DecimalField(max_digits=12, decimal_places=2)
-    last_contribution_date = serializers.DateTimeField(allow_null=True)
\ No newline at end of file
+    last_contribution_date = serializers.DateTimeField(allow_null=True)
+
+
+class StatementReconciliationSerializer(serializers.ModelSerializer):
+    """Serializer for M-Pesa statement reconciliation jobs"""
+    
+    uploaded_by_name = serializers.CharField(source='uploaded_by.full_name', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = StatementReconciliation
+        fields = [
+            'id', 'statement_file', 'uploaded_by', 'uploaded_by_name', 'status',
+            'rows_processed', 'matched_count', 'verified_count', 'mismatch_count',
+            'error_message', 'created_at', 'started_at', 'completed_at'
+        ]
+        read_only_fields = [
+            'id', 'uploaded_by', 'status', 'rows_processed', 'matched_count',
+            'verified_count', 'mismatch_count', 'error_message',
+            'created_at', 'started_at', 'completed_at'
+        ]
+
+
+class ReconciliationMismatchSerializer(serializers.ModelSerializer):
+    """Serializer for statement rows that failed reconciliation"""
+    
+    mismatch_type_display = serializers.CharField(source='get_mismatch_type_display', read_only=True)
+    contribution_amount = serializers.DecimalField(
+        source='contribution.amount', max_digits=10, decimal_places=2, read_only=True, allow_null=True
+    )
+    contribution_phone_number = serializers.CharField(
+        source='contribution.mpesa_phone_number', read_only=True, allow_null=True
+    )
+    
+    class Meta:
+        model = ReconciliationMismatch
+        fields = [
+            'id', 'mismatch_type', 'mismatch_type_display', 'row_number',
+            'transaction_code', 'statement_amount', 'statement_phone_number',
+            'contribution', 'contribution_amount', 'contribution_phone_number'
+        ]
@@ -0,0 +1,371 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from decimal import Decimal
+
+from .models import Contribution, SACCOBalance, ContributionSummary, ContributionLedgerEntry
+from .rollups import apply_rollup_deltas
+from .risk import forget_verified_amounts, record_verified_amounts
+from .dashboard import invalidate_dashboard_stats
+
+
+class ContributionStateError(Exception):
+    """Raised when a contribution is not in the state an action requires"""
+
+
+def _ensure_balance_rows(keys):
+    """Create missing balance and summary rows for (member_id, contribution_type_id) keys without racing other workers"""
+    SACCOBalance.objects.bulk_create(
+        [SACCOBalance(member_id=member_id, contribution_type_id=type_id) for member_id, type_id in keys],
+        ignore_conflicts=True
+    )
+    ContributionSummary.objects.bulk_create(
+        [ContributionSummary(contribution_type_id=type_id) for type_id in {type_id for _, type_id in keys}],
+        ignore_conflicts=True
+    )
+
+
+def apply_balance_deltas(deltas):
+    """
+    Apply grouped balance changes with single-statement atomic increments
+
+    Args:
+        deltas: Dict mapping (member_id, contribution_type_id) to a tuple of
+            (signed amount, signed contribution count, latest contribution date or None)
+
+    Each member balance and each summary row is updated exactly once, in key
+    order so concurrent callers lock rows in the same sequence. Balance rows
+    are locked before the update so the summary's active member count can be
+    adjusted by the number of balances crossing zero instead of recounted.
+    Must be called inside a transaction.
+    """
+    if not deltas:
+        return
+    keys = sorted(deltas)
+    _ensure_balance_rows(keys)
+    now = timezone.now()
+
+    balance_filter = Q()
+    for member_id, type_id in keys:
+        balance_filter |= Q(member_id=member_id, contribution_type_id=type_id)
+    current_balances = dict(
+        ((member_id, type_id), total_balance)
+        for member_id, type_id, total_balance in SACCOBalance.objects.select_for_update().filter(
+            balance_filter
+        ).order_by('member_id', 'contribution_type_id').values_list(
+            'member_id', 'contribution_type_id', 'total_balance'
+        )
+    )
+
+    summary_deltas = {}
+    for member_id, type_id in keys:
+        amount, count, contribution_date = deltas[(member_id, type_id)]
+        balance_updates = {
+            'total_balance': F('total_balance') + amount,
+            'updated_at': now,
+        }
+        if contribution_date is not None:
+            balance_updates['last_contribution_date'] = Greatest(
+                Coalesce('last_contribution_date', contribution_date),
+                contribution_date
+            )
+        SACCOBalance.objects.filter(
+            member_id=member_id,
+            contribution_type_id=type_id
+        ).update(**balance_updates)
+
+        old_balance = current_balances.get((member_id, type_id), Decimal('0.00'))
+        new_balance = old_balance + amount
+        activated = int(new_balance > 0) - int(old_balance > 0)
+
+        type_amount, type_count, type_activated = summary_deltas.get(type_id, (Decimal('0.00'), 0, 0))
+        summary_deltas[type_id] = (type_amount + amount, type_count + count, type_activated + activated)
+
+    for type_id, (amount, count, activated) in sorted(summary_deltas.items()):
+        ContributionSummary.objects.filter(contribution_type_id=type_id).update(
+            total_amount=F('total_amount') + amount,
+            total_contributions=F('total_contributions') + count,
+            active_members=F('active_members') + activated,
+            last_updated=now
+        )
+
+
+def apply_balance_delta(member_id, contribution_type_id, amount, count, contribution_date=None):
+    """
+    Apply a single balance change with single-statement atomic increments
+
+    Args:
+        member_id: ID of the member whose balance changes
+        contribution_type_id: ID of the contribution type
+        amount: Signed Decimal added to the balance and summary total
+        count: Signed number of contributions added to the summary
+        contribution_date: Latest contribution date to record, if any
+
+    Must be called inside a transaction.
+    """
+    apply_balance_deltas({(member_id, contribution_type_id): (amount, count, contribution_date)})
+
+
+def _transition(contribution, from_status, to_status, **fields):
+    """
+    Move a contribution between statuses with a conditional UPDATE
+
+    Only one concurrent caller can win the transition, so a contribution
+    is never credited or reversed twice.
+    """
+    updated = Contribution.objects.filter(pk=contribution.pk, status=from_status).update(
+        status=to_status,
+        updated_at=timezone.now(),
+        **fields
+    )
+    if not updated:
+        raise ContributionStateError('Contribution has already been processed')
+    contribution.refresh_from_db()
+    invalidate_dashboard_stats()
+
+
+def verify_contribution(contribution, verified_by):
+    """Verify a pending contribution and credit the member's balance"""
+    with transaction.atomic():
+        _transition(
+            contribution, 'PENDING', 'VERIFIED',
+            verified_by=verified_by,
+            verified_at=timezone.now()
+        )
+        ContributionLedgerEntry.objects.create(
+            contribution=contribution,
+            member_id=contribution.member_id,
+            contribution_type_id=contribution.contribution_type_id,
+            entry_type='CREDIT',
+            amount=contribution.amount,
+            recorded_by=verified_by
+        )
+        apply_balance_delta(
+            contribution.member_id,
+            contribution.contribution_type_id,
+            contribution.amount,
+            1,
+            contribution_date=contribution.submitted_at
+        )
+        apply_rollup_deltas([(
+            contribution.member_id,
+            contribution.contribution_type_id,
+            contribution.submitted_at,
+            contribution.amount,
+            1
+        )])
+        record_verified_amounts([(contribution.member_id, contribution.contribution_type_id, contribution.amount)])
+    return contribution
+
+
+def reject_contribution(contribution, verified_by, rejection_reason=''):
+    """Reject a pending contribution; balances are left untouched"""
+    with transaction.atomic():
+        _transition(
+            contribution, 'PENDING', 'REJECTED',
+            verified_by=verified_by,
+            verified_at=timezone.now(),
+            rejection_reason=rejection_reason
+        )
+    return contribution
+
+
+def reverse_contribution(contribution, reversed_by, reason=''):
+    """Reverse a verified contribution and debit the member's balance"""
+    with transaction.atomic():
+        _transition(contribution, 'VERIFIED', 'REVERSED', rejection_reason=reason)
+        ContributionLedgerEntry.objects.create(
+            contribution=contribution,
+            member_id=contribution.member_id,
+            contribution_type_id=contribution.contribution_type_id,
+            entry_type='REVERSAL',
+            amount=-contribution.amount,
+            recorded_by=reversed_by
+        )
+        apply_balance_delta(
+            contribution.member_id,
+            contribution.contribution_type_id,
+            -contribution.amount,
+            -1
+        )
+        apply_rollup_deltas([(
+            contribution.member_id,
+            contribution.contribution_type_id,
+            contribution.submitted_at,
+            -contribution.amount,
+            -1
+        )])
+        forget_verified_amounts([(contribution.member_id, contribution.contribution_type_id, contribution.amount)])
+    return contribution
+
+
+def bulk_process_contributions(decisions, verified_by):
+    """
+    Verify or reject many pending contributions in one transaction
+
+    Args:
+        decisions: List of dicts with 'id', 'status' and optional 'rejection_reason'
+        verified_by: Admin user applying the decisions
+
+    Returns:
+        List of per-item result dicts in the order the decisions were given
+    """
+    decisions_by_id = {decision['id']: decision for decision in decisions}
+    now = timezone.now()
+
+    with transaction.atomic():
+        contributions = {
+            contribution.pk: contribution
+            for contribution in Contribution.objects.select_for_update().filter(
+                pk__in=decisions_by_id
+            ).order_by('pk')
+        }
+
+        updated = []
+        ledger_entries = []
+        deltas = {}
+        results = []
+        for decision in decisions:
+            contribution = contributions.get(decision['id'])
+            if contribution is None:
+                results.append({'id': decision['id'], 'success': False, 'error': 'Contribution not found'})
+                continue
+            if contribution.status != 'PENDING':
+                results.append({
+                    'id': decision['id'],
+                    'success': False,
+                    'error': 'Contribution has already been processed'
+                })
+                continue
+
+            contribution.status = decision['status']
+            contribution.verified_by = verified_by
+            contribution.verified_at = now
+            contribution.updated_at = now
+            if contribution.status == 'REJECTED':
+                contribution.rejection_reason = decision.get('rejection_reason', '')
+            else:
+                ledger_entries.append(ContributionLedgerEntry(
+                    contribution=contribution,
+                    member_id=contribution.member_id,
+                    contribution_type_id=contribution.contribution_type_id,
+                    entry_type='CREDIT',
+                    amount=contribution.amount,
+                    recorded_by=verified_by
+                ))
+                key = (contribution.member_id, contribution.contribution_type_id)
+                amount, count, latest = deltas.get(key, (Decimal('0.00'), 0, None))
+                deltas[key] = (
+                    amount + contribution.amount,
+                    count + 1,
+                    max(latest, contribution.submitted_at) if latest else contribution.submitted_at
+                )
+            updated.append(contribution)
+            results.append({'id': contribution.pk, 'success': True, 'status': contribution.status})
+
+        if updated:
+            Contribution.objects.bulk_update(
+                updated,
+                ['status', 'verified_by', 'verified_at', 'rejection_reason', 'updated_at']
+            )
+            invalidate_dashboard_stats()
+        ContributionLedgerEntry.objects.bulk_create(ledger_entries)
+        apply_balance_deltas(deltas)
+        apply_rollup_deltas(
+            (entry.member_id, entry.contribution_type_id, entry.contribution.submitted_at, entry.amount, 1)
+            for entry in ledger_entries
+        )
+        record_verified_amounts(
+            (entry.member_id, entry.contribution_type_id, entry.amount) for entry in ledger_entries
+        )
+
+    return results
+
+
+def _pk_windows(queryset, chunk_size):
+    """Yield querysets covering consecutive primary key ranges of at most chunk_size ids"""
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        yield queryset.filter(pk__gte=start, pk__lt=start + chunk_size)
+
+
+def compute_summary_totals(chunk_size=10000):
+    """
+    Rebuild summary counters from scratch, scanning in primary key chunks
+
+    Returns:
+        Dict mapping contribution_type_id to a dict of total_amount,
+        total_contributions and active_members
+    """
+    totals = {}
+
+    def _totals(type_id):
+        return totals.setdefault(type_id, {
+            'total_amount': Decimal('0.00'),
+            'total_contributions': 0,
+            'active_members': 0,
+        })
+
+    verified = Contribution.objects.filter(status='VERIFIED').order_by()
+    for window in _pk_windows(verified, chunk_size):
+        for row in window.values('contribution_type_id').annotate(amount=Sum('amount'), count=Count('pk')):
+            type_totals = _totals(row['contribution_type_id'])
+            type_totals['total_amount'] += row['amount']
+            type_totals['total_contributions'] += row['count']
+
+    active = SACCOBalance.objects.filter(total_balance__gt=0).order_by()
+    for window in _pk_windows(active, chunk_size):
+        for row in window.values('contribution_type_id').annotate(count=Count('pk')):
+            _totals(row['contribution_type_id'])['active_members'] += row['count']
+
+    return totals
+
+
+def reconcile_summaries(chunk_size=10000, apply=True):
+    """
+    Compare stored summary counters with freshly computed ones
+
+    Args:
+        chunk_size: Number of primary keys scanned per query
+        apply: Write the recomputed counters back when drift is found
+
+    Returns:
+        List of (contribution_type_id, field, stored, actual) drift tuples
+    """
+    totals = compute_summary_totals(chunk_size)
+    stored = {summary.contribution_type_id: summary for summary in ContributionSummary.objects.all()}
+
+    drift = []
+    for type_id in sorted(set(totals) | set(stored)):
+        actual = totals.get(type_id, {
+            'total_amount': Decimal('0.00'),
+            'total_contributions': 0,
+            'active_members': 0,
+        })
+        summary = stored.get(type_id)
+        changed = {}
+        for field, value in actual.items():
+            current = getattr(summary, field) if summary else None
+            if current != value:
+                drift.append((type_id, field, current, value))
+                changed[field] = value
+
+        if apply and changed:
+            if summary is None:
+                ContributionSummary.objects.create(contribution_type_id=type_id, **actual)
+            else:
+                ContributionSummary.objects.filter(pk=summary.pk).update(last_updated=timezone.now(), **changed)
+
+    return drift
+
+
+def ledger_balance(member_id, contribution_type_id):
+    """Recompute a balance from the ledger (used for audits and benchmarks)"""
+    total = ContributionLedgerEntry.objects.filter(
+        member_id=member_id,
+        contribution_type_id=contribution_type_id
+    ).aggregate(total=Sum('amount'))['total']
+    return total or Decimal('0.00')
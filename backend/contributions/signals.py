@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .dashboard import invalidate_dashboard_stats
+from .models import Contribution
+
+# User fields the dashboard's member count depends on
+DASHBOARD_USER_FIELDS = ('role', 'is_active')
+
+
+@receiver(post_save, sender=Contribution)
+def contribution_saved(sender, instance, created, **kwargs):
+    """New submissions change the pending count on the dashboard"""
+    invalidate_dashboard_stats()
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    """Note whether an existing user's save changes a field the dashboard counts by"""
+    instance._dashboard_fields_changed = False
+    if instance._state.adding or instance.pk is None:
+        return
+    deferred = instance.get_deferred_fields()
+    fields = [
+        name for name in DASHBOARD_USER_FIELDS
+        if name not in deferred and (update_fields is None or name in update_fields)
+    ]
+    if not fields:
+        return
+    current = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    instance._dashboard_fields_changed = current is not None and any(
+        getattr(instance, name) != value for name, value in zip(fields, current)
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_dashboard_fields_changed', False):
+        invalidate_dashboard_stats()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_dashboard_stats()
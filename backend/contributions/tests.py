@@ -1,3 +1,950 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from importlib import import_module
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from sacco_project.exports import EXPORT_DATASETS, export_stream
+from sacco_project.query_planning import build_query_plan
+from .checkpoints import balances_as_of, create_balance_checkpoints
+from .dashboard import GENERATION_KEY, get_dashboard_stats
+from .dividends import compute_dividends, run_dividends
+from .importer import ContributionImporter, ContributionImportError, _copy_value
+from .models import (
+    BalanceCheckpoint, Contribution, ContributionLedgerEntry, ContributionRollup, ContributionSummary,
+    ContributionType, DividendPayout, MemberContributionStats, SACCOBalance, StatementReconciliation
+)
+from .reconciliation import run_reconciliation
+from .risk import rebuild_stats, rescore_pending, score_submission
+from .rollups import backfill_rollups, local_date, local_midnight
+from .serializers import ContributionSerializer
+from .services import (
+    ContributionStateError, bulk_process_contributions, ledger_balance, reconcile_summaries,
+    reverse_contribution, verify_contribution
+)
+from .statements import statement_rows
+
+User = get_user_model()
+
+
+class ContributionFixtures:
+    """Members, an admin and a contribution type shared by the test cases"""
+
+    def make_fixtures(self):
+        self.contribution_type = ContributionType.objects.create(name='Shares')
+        self.admin = User.objects.create_user(
+            phone_number='254700000001', password='pass12345', first_name='Ada', last_name='Admin', role='ADMIN'
+        )
+        self.member = User.objects.create_user(
+            phone_number='254700000002', password='pass12345', first_name='Mo', last_name='Member'
+        )
+        self.codes = iter(range(10 ** 6))
+
+    def contribution(self, amount='100.00', member=None, code=None, phone=None):
+        member = member or self.member
+        return Contribution.objects.create(
+            member=member,
+            contribution_type=self.contribution_type,
+            amount=Decimal(amount),
+            mpesa_transaction_code=code or f'QAB{next(self.codes):07d}',
+            mpesa_phone_number=phone or member.phone_number
+        )
+
+    def balance(self, member=None):
+        member = member or self.member
+        return SACCOBalance.objects.filter(
+            member=member, contribution_type=self.contribution_type
+        ).values_list('total_balance', flat=True).first() or Decimal('0.00')
+
+    def ledger_credit(self, amount, moment, member=None):
+        """Verify a new contribution and date its ledger credit at `moment`"""
+        contribution = verify_contribution(self.contribution(amount, member=member), self.admin)
+        ContributionLedgerEntry.objects.filter(contribution=contribution).update(created_at=moment)
+        return contribution
+
+    def assertBalanceMatchesLedger(self, expected, member=None):
+        member = member or self.member
+        self.assertEqual(self.balance(member), expected)
+        self.assertEqual(ledger_balance(member.pk, self.contribution_type.pk), expected)
+        self.assertEqual(reconcile_summaries(apply=False), [])
+
+
+class LedgerTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+
+    def test_verify_credits_balance_ledger_and_summary(self):
+        verify_contribution(self.contribution('150.00'), self.admin)
+        verify_contribution(self.contribution('50.00'), self.admin)
+
+        self.assertBalanceMatchesLedger(Decimal('200.00'))
+        summary = ContributionSummary.objects.get(contribution_type=self.contribution_type)
+        self.assertEqual(summary.total_amount, Decimal('200.00'))
+        self.assertEqual(summary.total_contributions, 2)
+        self.assertEqual(summary.active_members, 1)
+
+    def test_second_verify_of_stale_instance_is_rejected(self):
+        contribution = self.contribution('100.00')
+        stale = Contribution.objects.get(pk=contribution.pk)
+
+        verify_contribution(contribution, self.admin)
+        with self.assertRaises(ContributionStateError):
+            verify_contribution(stale, self.admin)
+
+        self.assertEqual(ContributionLedgerEntry.objects.filter(contribution=contribution).count(), 1)
+        self.assertBalanceMatchesLedger(Decimal('100.00'))
+
+    def test_reversal_debits_once(self):
+        contribution = verify_contribution(self.contribution('80.00'), self.admin)
+        stale = Contribution.objects.get(pk=contribution.pk)
+
+        reverse_contribution(contribution, self.admin, 'Duplicate payment')
+        with self.assertRaises(ContributionStateError):
+            reverse_contribution(stale, self.admin, 'Duplicate payment')
+
+        self.assertBalanceMatchesLedger(Decimal('0.00'))
+        summary = ContributionSummary.objects.get(contribution_type=self.contribution_type)
+        self.assertEqual((summary.total_contributions, summary.active_members), (0, 0))
+
+    def test_bulk_skips_processed_and_unknown_contributions(self):
+        pending = self.contribution('10.00')
+        rejected = self.contribution('20.00')
+        already = verify_contribution(self.contribution('30.00'), self.admin)
+
+        results = bulk_process_contributions([
+            {'id': pending.pk, 'status': 'VERIFIED'},
+            {'id': rejected.pk, 'status': 'REJECTED', 'rejection_reason': 'Wrong code'},
+            {'id': already.pk, 'status': 'VERIFIED'},
+            {'id': 999999, 'status': 'VERIFIED'},
+        ], self.admin)
+
+        self.assertEqual([result['success'] for result in results], [True, True, False, False])
+        self.assertEqual(Contribution.objects.get(pk=rejected.pk).status, 'REJECTED')
+        self.assertBalanceMatchesLedger(Decimal('40.00'))
+
+    def test_bulk_after_single_verify_does_not_double_credit(self):
+        contribution = self.contribution('25.00')
+        verify_contribution(Contribution.objects.get(pk=contribution.pk), self.admin)
+
+        results = bulk_process_contributions([{'id': contribution.pk, 'status': 'VERIFIED'}], self.admin)
+
+        self.assertFalse(results[0]['success'])
+        self.assertBalanceMatchesLedger(Decimal('25.00'))
+
+    def test_migration_backfills_credits_for_verified_contributions(self):
+        backfill = import_module('contributions.migrations.0010_backfill_ledger_credits').backfill_ledger_credits
+        verified_at = timezone.now() - timedelta(days=400)
+        legacy = self.contribution('70.00')
+        Contribution.objects.filter(pk=legacy.pk).update(
+            status='VERIFIED', verified_by=self.admin, verified_at=verified_at
+        )
+        unstamped = self.contribution('30.00')
+        Contribution.objects.filter(pk=unstamped.pk).update(status='VERIFIED')
+        self.contribution('5.00')
+        current = verify_contribution(self.contribution('10.00'), self.admin)
+        stale = BalanceCheckpoint.objects.create(
+            member=self.member, contribution_type=self.contribution_type,
+            as_of=verified_at + timedelta(days=1), balance=Decimal('0.00')
+        )
+
+        backfill(apps, None)
+        backfill(apps, None)
+
+        entries = ContributionLedgerEntry.objects.filter(member=self.member)
+        self.assertEqual(entries.count(), 3)
+        self.assertEqual(entries.filter(contribution=current).count(), 1)
+        self.assertEqual(entries.get(contribution=legacy).created_at, verified_at)
+        unstamped.refresh_from_db()
+        self.assertEqual(entries.get(contribution=unstamped).created_at, unstamped.submitted_at)
+        self.assertEqual(entries.get(contribution=legacy).recorded_by, self.admin)
+        self.assertEqual(ledger_balance(self.member.pk, self.contribution_type.pk), Decimal('110.00'))
+        self.assertFalse(BalanceCheckpoint.objects.filter(pk=stale.pk).exists())
+
+
+class ContributionAdminTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.superuser = User.objects.create_superuser('254700000009', 'pass12345', first_name='Su', last_name='Per')
+        self.client.force_login(self.superuser)
+
+    def act(self, action, *contributions):
+        return self.client.post('/admin/contributions/contribution/', {
+            'action': action,
+            '_selected_action': [contribution.pk for contribution in contributions],
+        })
+
+    def test_status_and_balance_are_read_only(self):
+        pending = self.contribution('40.00')
+        verified = verify_contribution(self.contribution('60.00'), self.admin)
+
+        response = self.client.get(f'/admin/contributions/contribution/{pending.pk}/change/')
+        self.assertNotIn('status', response.context['adminform'].form.fields)
+        self.assertIn('amount', response.context['adminform'].form.fields)
+        response = self.client.get(f'/admin/contributions/contribution/{verified.pk}/change/')
+        self.assertNotIn('amount', response.context['adminform'].form.fields)
+        balance = SACCOBalance.objects.get(member=self.member, contribution_type=self.contribution_type)
+        response = self.client.get(f'/admin/contributions/saccobalance/{balance.pk}/change/')
+        self.assertNotIn('total_balance', response.context['adminform'].form.fields)
+
+    def test_actions_go_through_the_ledger(self):
+        first = self.contribution('40.00')
+        second = self.contribution('60.00')
+        rejected = self.contribution('15.00')
+
+        self.act('verify_selected', first, second)
+        self.act('reject_selected', rejected)
+        self.act('reverse_selected', second, rejected)
+
+        self.assertEqual(
+            list(Contribution.objects.order_by('pk').values_list('status', flat=True)),
+            ['VERIFIED', 'REVERSED', 'REJECTED']
+        )
+        self.assertBalanceMatchesLedger(Decimal('40.00'))
+        self.assertEqual(ContributionLedgerEntry.objects.filter(contribution=second).count(), 2)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentVerifyTests(ContributionFixtures, TransactionTestCase):
+    """Real races need row locks; SQLite serialises writers, so these run on PostgreSQL"""
+
+    workers = 8
+
+    def setUp(self):
+        self.make_fixtures()
+
+    def _race(self, target, count):
+        barrier = threading.Barrier(count)
+        outcomes = []
+        lock = threading.Lock()
+
+        def run():
+            try:
+                barrier.wait()
+                target()
+                outcome = 'ok'
+            except ContributionStateError:
+                outcome = 'lost'
+            finally:
+                connection.close()
+            with lock:
+                outcomes.append(outcome)
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrent_verifies_credit_once(self):
+        contribution = self.contribution('500.00')
+
+        outcomes = self._race(
+            lambda: verify_contribution(Contribution.objects.get(pk=contribution.pk), self.admin),
+            self.workers
+        )
+
+        self.assertEqual(outcomes.count('ok'), 1)
+        self.assertBalanceMatchesLedger(Decimal('500.00'))
+
+    def test_concurrent_bulk_requests_credit_each_contribution_once(self):
+        contributions = [self.contribution('10.00') for _ in range(20)]
+        decisions = [{'id': contribution.pk, 'status': 'VERIFIED'} for contribution in contributions]
+
+        self._race(lambda: bulk_process_contributions(decisions, self.admin), 4)
+
+        self.assertEqual(ContributionLedgerEntry.objects.count(), 20)
+        self.assertBalanceMatchesLedger(Decimal('200.00'))
+
+
+class SummaryTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.other = User.objects.create_user(
+            phone_number='254700000003', password='pass12345', first_name='Ot', last_name='Her'
+        )
+
+    def summary(self):
+        summary = ContributionSummary.objects.get(contribution_type=self.contribution_type)
+        return summary.total_amount, summary.total_contributions, summary.active_members
+
+    def test_counters_follow_verifications_and_reversals(self):
+        verify_contribution(self.contribution('100.00'), self.admin)
+        verify_contribution(self.contribution('50.00', member=self.other), self.admin)
+        reversed_contribution = verify_contribution(self.contribution('30.00', member=self.other), self.admin)
+        self.assertEqual(self.summary(), (Decimal('180.00'), 3, 2))
+
+        reverse_contribution(reversed_contribution, self.admin, 'Duplicate payment')
+
+        self.assertEqual(self.summary(), (Decimal('150.00'), 2, 2))
+        self.assertEqual(reconcile_summaries(apply=False), [])
+
+    def test_member_leaves_active_count_when_balance_reaches_zero(self):
+        contribution = verify_contribution(self.contribution('40.00', member=self.other), self.admin)
+        verify_contribution(self.contribution('60.00'), self.admin)
+
+        reverse_contribution(contribution, self.admin, 'Wrong member')
+
+        self.assertEqual(self.summary(), (Decimal('60.00'), 1, 1))
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        verify_contribution(self.contribution('100.00'), self.admin)
+        ContributionSummary.objects.update(total_amount=Decimal('1.00'), active_members=5)
+
+        drift = reconcile_summaries(apply=False)
+        self.assertEqual(
+            sorted((field, stored, actual) for _, field, stored, actual in drift),
+            [('active_members', 5, 1), ('total_amount', Decimal('1.00'), Decimal('100.00'))]
+        )
+        self.assertEqual(self.summary(), (Decimal('1.00'), 1, 5))
+
+        self.assertEqual(reconcile_summaries(), drift)
+        self.assertEqual(self.summary(), (Decimal('100.00'), 1, 1))
+        self.assertEqual(reconcile_summaries(apply=False), [])
+
+
+class ReconciliationTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_job(self, rows):
+        job = StatementReconciliation.objects.create(uploaded_by=self.admin)
+        lines = ['Receipt No.,Paid In,Other Party Info'] + [','.join(row) for row in rows]
+        job.statement_file.save('statement.csv', ContentFile('\n'.join(lines).encode()))
+        return job
+
+    def test_matches_verify_and_mismatches_are_reported(self):
+        matched = self.contribution('100.00', code='QRC0000001')
+        self.contribution('200.00', code='QRC0000002')
+        job = self.make_job([
+            ('QRC0000001', '100.00', self.member.phone_number),
+            ('QRC0000002', '250.00', self.member.phone_number),
+            ('QRC9999999', '50.00', self.member.phone_number),
+        ])
+
+        job = run_reconciliation(job)
+
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(
+            (job.rows_processed, job.matched_count, job.verified_count, job.mismatch_count),
+            (3, 1, 1, 2)
+        )
+        self.assertEqual(
+            sorted(job.mismatches.values_list('mismatch_type', flat=True)), ['AMOUNT', 'UNKNOWN_CODE']
+        )
+        self.assertEqual(Contribution.objects.get(pk=matched.pk).status, 'VERIFIED')
+        self.assertBalanceMatchesLedger(Decimal('100.00'))
+
+    def test_rerun_replaces_previous_results(self):
+        self.contribution('100.00', code='QRC0000001')
+        self.contribution('200.00', code='QRC0000002')
+        job = self.make_job([
+            ('QRC0000001', '100.00', self.member.phone_number),
+            ('QRC0000002', '250.00', self.member.phone_number),
+            ('QRC9999999', '50.00', self.member.phone_number),
+        ])
+
+        run_reconciliation(job)
+        job = run_reconciliation(StatementReconciliation.objects.get(pk=job.pk))
+        job.refresh_from_db()
+
+        self.assertEqual(job.rows_processed, 3)
+        self.assertEqual(job.mismatch_count, 2)
+        self.assertEqual(job.mismatches.count(), 2)
+        # Already verified on the first run; not credited again
+        self.assertEqual(job.verified_count, 0)
+        self.assertBalanceMatchesLedger(Decimal('100.00'))
+
+    def test_processed_code_stored_in_lower_case_is_not_unknown(self):
+        verify_contribution(self.contribution('100.00', code='qrc0000003'), self.admin)
+        job = self.make_job([('qrc0000003', '100.00', self.member.phone_number)])
+
+        job = run_reconciliation(job)
+
+        self.assertEqual((job.matched_count, job.mismatch_count), (0, 0))
+        self.assertFalse(job.mismatches.exists())
+
+
+class IdempotencyKeyTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+        self.payload = {
+            'contribution_type': self.contribution_type.pk,
+            'amount': '300.00',
+            'mpesa_transaction_code': 'QID0000001',
+            'mpesa_phone_number': self.member.phone_number,
+        }
+
+    def post(self, payload, key='submit-1'):
+        return self.client.post('/api/contributions/create/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self.post(self.payload)
+        retry = self.post(self.payload)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Contribution.objects.filter(mpesa_transaction_code='QID0000001').count(), 1)
+
+    def test_key_reused_with_different_payload_is_rejected(self):
+        self.post(self.payload)
+        response = self.post(dict(self.payload, amount='301.00'))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Contribution.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        other = User.objects.create_user(
+            phone_number='254700000003', password='pass12345', first_name='Ot', last_name='Her'
+        )
+        self.post(self.payload)
+        self.client.force_authenticate(other)
+        response = self.post(dict(self.payload, mpesa_phone_number=other.phone_number))
+
+        # Not a replay of the first member's response: the code is already taken
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_failed_request_does_not_burn_the_key(self):
+        self.contribution(code='QID0000001')
+        self.assertEqual(self.post(self.payload).status_code, 400)
+
+        response = self.post(dict(self.payload, mpesa_transaction_code='QID0000002'), key='submit-1')
+        self.assertEqual(response.status_code, 201)
+
+
+class KeysetPaginationTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+        # Several rows share a submitted_at so the id tiebreaker matters
+        base = timezone.now()
+        for index in range(12):
+            contribution = self.contribution(str(10 + index))
+            Contribution.objects.filter(pk=contribution.pk).update(submitted_at=base - timedelta(minutes=index // 3))
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def expected_ids(self):
+        return list(Contribution.objects.order_by('-submitted_at', '-id').values_list('pk', flat=True))
+
+    def test_pages_cover_every_row_once_in_order(self):
+        self.assertEqual(self.walk('/api/contributions/?pagination=cursor&page_size=5'), self.expected_ids())
+
+    def test_inserts_during_paging_do_not_shift_later_pages(self):
+        first = self.client.get('/api/contributions/?pagination=cursor&page_size=5')
+        seen = [row['id'] for row in first.data['results']]
+
+        # A newer row lands on page one; offset pagination would repeat a row on page two
+        self.contribution('999.00')
+        rest = self.walk(first.data['next'])
+
+        self.assertEqual(seen + rest, [pk for pk in self.expected_ids() if pk in set(seen + rest)])
+        self.assertEqual(len(set(seen + rest)), 12)
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get('/api/contributions/?pagination=cursor&page_size=4')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']]
+        )
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/contributions/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryPlanTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/contributions/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_plan_covers_nested_and_dotted_relations(self):
+        plan = build_query_plan(ContributionSerializer)
+
+        self.assertLessEqual({'member', 'contribution_type', 'verified_by'}, set(plan.select_related))
+        self.assertIs(build_query_plan(ContributionSerializer), plan)
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        for _ in range(2):
+            verify_contribution(self.contribution(), self.admin)
+        few = self.list_queries()
+
+        for _ in range(8):
+            verify_contribution(self.contribution(), self.admin)
+        self.assertEqual(self.list_queries(), few)
+
+
+class RollupTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+
+    def buckets(self):
+        return {
+            (rollup.period, rollup.member_id, rollup.period_start): (rollup.total_amount, rollup.contribution_count)
+            for rollup in ContributionRollup.objects.all()
+        }
+
+    def dated(self, amount, days_ago, member=None):
+        contribution = self.contribution(amount, member=member)
+        Contribution.objects.filter(pk=contribution.pk).update(
+            submitted_at=timezone.now() - timedelta(days=days_ago)
+        )
+        contribution.refresh_from_db()
+        return contribution
+
+    def test_verify_and_reverse_update_day_and_month_buckets(self):
+        contribution = verify_contribution(self.contribution('120.00'), self.admin)
+        day = local_date(contribution.submitted_at)
+
+        buckets = self.buckets()
+        self.assertEqual(buckets[('DAY', None, day)], (Decimal('120.00'), 1))
+        self.assertEqual(buckets[('DAY', self.member.pk, day)], (Decimal('120.00'), 1))
+        self.assertEqual(buckets[('MONTH', self.member.pk, day.replace(day=1))], (Decimal('120.00'), 1))
+
+        reverse_contribution(contribution, self.admin, 'Duplicate payment')
+
+        self.assertEqual(self.buckets()[('MONTH', None, day.replace(day=1))], (Decimal('0.00'), 0))
+
+    def test_backfill_matches_incremental_rollups(self):
+        other = User.objects.create_user(
+            phone_number='254700000003', password='pass12345', first_name='Ot', last_name='Her'
+        )
+        for amount, days_ago, member in [('10.00', 0, None), ('20.00', 1, None), ('30.00', 45, other)]:
+            verify_contribution(self.dated(amount, days_ago, member), self.admin)
+        reverse_contribution(verify_contribution(self.dated('5.00', 1), self.admin), self.admin, 'Duplicate payment')
+        self.dated('99.00', 2)
+
+        incremental = {key: value for key, value in self.buckets().items() if value[1]}
+        backfill_rollups()
+
+        self.assertEqual(self.buckets(), incremental)
+
+    def test_trends_show_members_only_their_own_series(self):
+        other = User.objects.create_user(
+            phone_number='254700000003', password='pass12345', first_name='Ot', last_name='Her'
+        )
+        verify_contribution(self.contribution('70.00'), self.admin)
+        verify_contribution(self.contribution('30.00', member=other), self.admin)
+        client = APIClient()
+        client.force_authenticate(self.member)
+
+        response = client.get('/api/contributions/trends/?period=DAY')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['member'], self.member.pk)
+        self.assertEqual([row['total_amount'] for row in response.data['series']], ['70.00'])
+
+
+class StatementTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.first = self.ledger_credit('100.00', self.at(date(2024, 3, 1)))
+        self.second = self.ledger_credit('200.00', self.at(date(2024, 3, 4)))
+        reverse_contribution(self.second, self.admin, 'Duplicate payment')
+        ContributionLedgerEntry.objects.filter(contribution=self.second, entry_type='REVERSAL').update(
+            created_at=self.at(date(2024, 3, 8))
+        )
+        self.third = self.ledger_credit('50.00', self.at(date(2024, 3, 10)))
+        self.contribution('75.00')
+
+    def at(self, day):
+        return local_midnight(day) + timedelta(hours=9)
+
+    def test_reversal_is_a_debit_on_its_own_date(self):
+        rows = list(statement_rows(self.member.pk, start=date(2024, 3, 3)))
+
+        self.assertEqual(rows[0][3:], ('OPENING_BALANCE', None, Decimal('100.00')))
+        self.assertEqual([(row[0].date(), row[1]) for row in rows[1:]], [
+            (date(2024, 3, 4), self.second.mpesa_transaction_code),
+            (date(2024, 3, 8), self.second.mpesa_transaction_code),
+            (date(2024, 3, 10), self.third.mpesa_transaction_code),
+        ])
+        self.assertEqual([row[3:] for row in rows[1:]], [
+            ('CREDIT', Decimal('200.00'), Decimal('300.00')),
+            ('REVERSAL', Decimal('-200.00'), Decimal('100.00')),
+            ('CREDIT', Decimal('50.00'), Decimal('150.00')),
+        ])
+
+    def test_opening_balance_includes_earlier_reversals(self):
+        rows = list(statement_rows(self.member.pk, start=date(2024, 3, 9)))
+
+        self.assertEqual(rows[0][-1], Decimal('100.00'))
+        self.assertEqual([row[-1] for row in rows[1:]], [Decimal('150.00')])
+
+    def test_end_date_is_inclusive(self):
+        rows = list(statement_rows(self.member.pk, end=date(2024, 3, 8)))
+
+        self.assertEqual([row[3] for row in rows[1:]], ['CREDIT', 'CREDIT', 'REVERSAL'])
+        self.assertEqual(rows[-1][-1], Decimal('100.00'))
+
+    def test_statement_streams_as_csv(self):
+        client = APIClient()
+        client.force_authenticate(self.member)
+
+        response = client.get('/api/contributions/statement/?export=csv')
+
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][-1], 'running_balance')
+        self.assertEqual([row[-1] for row in rows[1:]], ['0.00', '100.00', '300.00', '100.00', '150.00'])
+
+
+class DashboardTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        cache.clear()
+
+    def test_stats_are_cached_until_a_contribution_changes(self):
+        self.assertEqual(get_dashboard_stats()['pending_contributions'], 0)
+        with self.assertNumQueries(0):
+            get_dashboard_stats()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            contribution = self.contribution('100.00')
+        self.assertEqual(get_dashboard_stats()['pending_contributions'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            verify_contribution(contribution, self.admin)
+        stats = get_dashboard_stats()
+        self.assertEqual(stats['pending_contributions'], 0)
+        self.assertEqual(stats['contribution_summaries'][0]['total_amount'], '100.00')
+
+    def test_new_member_invalidates_the_stats(self):
+        members = get_dashboard_stats()['total_members']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(
+                phone_number='254700000003', password='pass12345', first_name='Ot', last_name='Her'
+            )
+
+        self.assertEqual(get_dashboard_stats()['total_members'], members + 1)
+
+    def test_role_or_active_change_invalidates_the_stats(self):
+        members = get_dashboard_stats()['total_members']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.role = 'ADMIN'
+            self.member.save()
+        self.assertEqual(get_dashboard_stats()['total_members'], members - 1)
+
+        generation = cache.get(GENERATION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_active = False
+            self.admin.save(update_fields=['is_active'])
+        self.assertNotEqual(cache.get(GENERATION_KEY), generation)
+
+    def test_profile_edit_keeps_the_cached_stats(self):
+        get_dashboard_stats()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.first_name = 'Moses'
+            self.member.save()
+
+        with self.assertNumQueries(0):
+            get_dashboard_stats()
+
+    def test_rolled_back_change_keeps_the_cached_stats(self):
+        get_dashboard_stats()
+
+        with self.captureOnCommitCallbacks(execute=False):
+            self.contribution('100.00')
+
+        self.assertEqual(get_dashboard_stats()['pending_contributions'], 0)
+
+
+class ExportTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.old = self.contribution('10.00')
+        Contribution.objects.filter(pk=self.old.pk).update(submitted_at=timezone.now() - timedelta(days=30))
+        self.new = self.contribution('20.00')
+
+    def lines(self, export_format, **kwargs):
+        return list(export_stream('contributions', export_format, compress=False, **kwargs))
+
+    def test_csv_has_a_header_and_one_line_per_row(self):
+        rows = list(csv.reader(self.lines('csv')))
+
+        self.assertEqual(rows[0], EXPORT_DATASETS['contributions'].columns)
+        self.assertEqual(
+            [(row[0], row[4]) for row in rows[1:]],
+            [(str(self.old.pk), '10.00'), (str(self.new.pk), '20.00')]
+        )
+
+    def test_since_and_until_filter_on_submission_time(self):
+        boundary = timezone.now() - timedelta(days=1)
+
+        recent = [json.loads(line) for line in self.lines('ndjson', since=boundary)]
+        older = [json.loads(line) for line in self.lines('ndjson', until=boundary)]
+
+        self.assertEqual([(record['id'], record['amount']) for record in recent], [(self.new.pk, '20.00')])
+        self.assertEqual([record['id'] for record in older], [self.old.pk])
+
+    def test_gzip_stream_decompresses_to_the_plain_export(self):
+        compressed = b''.join(export_stream('contributions', 'csv'))
+
+        self.assertEqual(gzip.decompress(compressed).decode(), ''.join(self.lines('csv')))
+
+
+class CheckpointTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.key = (self.member.pk, self.contribution_type.pk)
+
+    def at(self, year, month, day):
+        return local_midnight(date(year, month, day))
+
+    def test_checkpoints_do_not_change_point_in_time_balances(self):
+        self.ledger_credit('100.00', self.at(2024, 1, 10))
+        reversed_contribution = self.ledger_credit('40.00', self.at(2024, 2, 5))
+        reverse_contribution(reversed_contribution, self.admin, 'Duplicate payment')
+        ContributionLedgerEntry.objects.filter(entry_type='REVERSAL').update(created_at=self.at(2024, 2, 20))
+        self.ledger_credit('25.00', self.at(2024, 3, 15))
+        moments = [self.at(2024, 2, 1), self.at(2024, 2, 10), self.at(2024, 2, 25), self.at(2024, 4, 1)]
+
+        before = [balances_as_of(moment).get(self.key) for moment in moments]
+        self.assertEqual(create_balance_checkpoints(), 3)
+        after = [balances_as_of(moment).get(self.key) for moment in moments]
+
+        self.assertEqual(before, [Decimal('100.00'), Decimal('140.00'), Decimal('100.00'), Decimal('125.00')])
+        self.assertEqual(after, before)
+        self.assertEqual(
+            list(BalanceCheckpoint.objects.order_by('as_of').values_list('balance', flat=True)),
+            [Decimal('100.00'), Decimal('100.00'), Decimal('125.00')]
+        )
+        self.assertEqual(create_balance_checkpoints(), 0)
+
+    def test_balance_before_any_history_is_absent(self):
+        self.ledger_credit('100.00', self.at(2024, 1, 10))
+
+        self.assertEqual(balances_as_of(self.at(2024, 1, 1)), {})
+
+    def test_member_balance_as_of_a_date(self):
+        self.ledger_credit('100.00', self.at(2024, 1, 10))
+        self.ledger_credit('50.00', self.at(2024, 1, 20))
+        client = APIClient()
+        client.force_authenticate(self.member)
+
+        response = client.get('/api/contributions/balance/as-of/?date=2024-01-15')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['balance'] for row in response.data['balances']], ['100.00'])
+
+
+class DividendTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        ContributionType.objects.filter(pk=self.contribution_type.pk).update(dividend_rate=Decimal('10.00'))
+        self.other = User.objects.create_user(
+            phone_number='254700000003', password='pass12345', first_name='Ot', last_name='Her'
+        )
+        self.start, self.end = date(2024, 1, 1), date(2024, 1, 10)
+        # Held all ten days, held for the last five, and too late to count
+        self.ledger_credit('1000.00', local_midnight(date(2023, 12, 15)))
+        self.ledger_credit('1000.00', local_midnight(date(2024, 1, 6)) + timedelta(hours=12))
+        self.ledger_credit('500.00', local_midnight(date(2024, 1, 11)) + timedelta(hours=1))
+        self.ledger_credit('0.04', local_midnight(date(2024, 1, 1)), member=self.other)
+
+    def test_average_daily_balance_weights_entries_by_days_held(self):
+        payouts = compute_dividends(self.start, self.end)
+
+        self.assertEqual(payouts, [
+            (self.member.pk, self.contribution_type.pk, Decimal('1500.00'), Decimal('10.00'), Decimal('150.00')),
+        ])
+
+    def test_dry_run_records_nothing(self):
+        run, payouts = run_dividends(self.start, self.end, declared_by=self.admin, dry_run=True)
+
+        self.assertIsNone(run.pk)
+        self.assertEqual((run.member_count, run.total_amount), (1, Decimal('150.00')))
+        self.assertFalse(DividendPayout.objects.exists())
+
+        run, payouts = run_dividends(self.start, self.end, declared_by=self.admin)
+        self.assertEqual(
+            list(DividendPayout.objects.filter(run=run).values_list('member_id', 'amount')),
+            [(self.member.pk, Decimal('150.00'))]
+        )
+
+
+class ImporterTests(ContributionFixtures, TestCase):
+    header = 'phone_number,contribution_type,amount,mpesa_transaction_code,submitted_at,status'
+
+    def setUp(self):
+        self.make_fixtures()
+        self.contribution('10.00', code='QIM0000009')
+        self.phone = self.member.phone_number
+
+    def run_import(self, rows, dry_run=False):
+        data = '\n'.join([self.header] + rows).encode()
+        return ContributionImporter(imported_by=self.admin, batch_size=3).run(io.BytesIO(data), dry_run=dry_run)
+
+    def test_valid_rows_are_imported_and_bad_rows_reported(self):
+        importer = self.run_import([
+            f'{self.phone},Shares,100.00,qim0000001,2023-05-04,VERIFIED',
+            f'{self.phone},shares,250.50,QIM0000002,04/06/2023 10:30,',
+            f'{self.phone},Shares,75.00,QIM0000003,2023-06-10,PENDING',
+            '254799999999,Shares,10.00,QIM0000004,2023-06-10,',
+            f'{self.phone},Savings,10.00,QIM0000005,2023-06-10,',
+            f'{self.phone},Shares,-5,QIM0000006,2023-06-10,',
+            f'{self.phone},Shares,10.00,QIM0000009,2023-06-10,',
+            f'{self.phone},Shares,10.00,QIM0000001,2023-06-10,',
+            f'{self.phone},Shares,10.00,QIM0000007,someday,',
+        ])
+
+        self.assertEqual((importer.rows_read, importer.imported, importer.error_count), (9, 3, 6))
+        self.assertEqual(sorted(row for row, _ in importer.errors), [5, 6, 7, 8, 9, 10])
+        self.assertBalanceMatchesLedger(Decimal('350.50'))
+        imported = Contribution.objects.get(mpesa_transaction_code='QIM0000002')
+        self.assertEqual((imported.status, local_date(imported.submitted_at)), ('VERIFIED', date(2023, 6, 4)))
+        self.assertEqual(Contribution.objects.get(mpesa_transaction_code='QIM0000003').status, 'PENDING')
+        rollup = ContributionRollup.objects.get(period='MONTH', member=self.member, period_start=date(2023, 5, 1))
+        self.assertEqual(rollup.total_amount, Decimal('100.00'))
+
+    def test_duplicate_check_ignores_case_of_stored_codes(self):
+        self.contribution('10.00', code='qim0000008')
+
+        importer = self.run_import([f'{self.phone},Shares,100.00,QIM0000008,2023-05-04,VERIFIED'])
+
+        self.assertEqual((importer.imported, importer.errors), (0, [(2, "Duplicate transaction code 'QIM0000008'")]))
+        self.assertEqual(self.balance(), Decimal('0.00'))
+
+    def test_balance_and_rollups_follow_the_submission_date(self):
+        self.header += ',verified_at'
+        self.run_import([f'{self.phone},Shares,100.00,QIM0000001,2023-05-31 18:00,VERIFIED,2023-06-02 09:00'])
+
+        balance = SACCOBalance.objects.get(member=self.member, contribution_type=self.contribution_type)
+        self.assertEqual(local_date(balance.last_contribution_date), date(2023, 5, 31))
+        rollups = ContributionRollup.objects.filter(member=self.member).order_by('period')
+        self.assertEqual(
+            list(rollups.values_list('period', 'period_start')),
+            [('DAY', date(2023, 5, 31)), ('MONTH', date(2023, 5, 1))]
+        )
+        self.assertEqual(
+            ContributionLedgerEntry.objects.get(contribution__mpesa_transaction_code='QIM0000001').created_at,
+            local_midnight(date(2023, 6, 2)) + timedelta(hours=9)
+        )
+
+    def test_dry_run_counts_rows_and_rolls_back(self):
+        importer = self.run_import([f'{self.phone},Shares,100.00,QIM0000001,2023-05-04,VERIFIED'], dry_run=True)
+
+        self.assertEqual(importer.imported, 1)
+        self.assertFalse(Contribution.objects.filter(mpesa_transaction_code='QIM0000001').exists())
+        self.assertEqual(self.balance(), Decimal('0.00'))
+
+    def test_missing_required_column_rejects_the_file(self):
+        with self.assertRaises(ContributionImportError):
+            ContributionImporter().run(io.BytesIO(b'phone_number,amount\n254700000002,10.00'))
+
+
+class RiskScoringTests(ContributionFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+
+    def stats(self):
+        stats = MemberContributionStats.objects.get(member=self.member, contribution_type=self.contribution_type)
+        return stats.verified_count, stats.amount_mean, stats.amount_m2
+
+    def assertStatsMatchRebuild(self):
+        incremental = self.stats()
+        rebuild_stats(timezone.now())
+        rebuilt = self.stats()
+        self.assertEqual(incremental[0], rebuilt[0])
+        self.assertAlmostEqual(incremental[1], rebuilt[1])
+        self.assertAlmostEqual(incremental[2], rebuilt[2])
+
+    def test_ordinary_submission_is_not_flagged(self):
+        contribution = score_submission(self.contribution('100.00'))
+
+        self.assertEqual((contribution.risk_score, contribution.risk_flags), (0.0, []))
+
+    def test_foreign_phone_and_odd_code_are_flagged(self):
+        contribution = score_submission(self.contribution('100.00', code='12345', phone='0711111111'))
+
+        self.assertEqual(set(contribution.risk_flags), {'PHONE_MISMATCH', 'CODE_PATTERN'})
+        self.assertEqual(Contribution.objects.get(pk=contribution.pk).risk_score, 50.0)
+
+    def test_amount_far_from_history_is_an_outlier(self):
+        for amount in ('100.00', '110.00', '90.00'):
+            verify_contribution(self.contribution(amount), self.admin)
+
+        self.assertEqual(score_submission(self.contribution('105.00')).risk_flags, [])
+        self.assertIn('AMOUNT_OUTLIER', score_submission(self.contribution('5000.00')).risk_flags)
+
+    def test_rapid_submissions_are_a_burst(self):
+        flags = [score_submission(self.contribution('100.00')).risk_flags for _ in range(5)]
+
+        self.assertEqual(flags[:3], [[], [], []])
+        self.assertEqual(flags[-1], ['BURST'])
+
+    def test_rebuild_and_rescore_agree_with_incremental_scoring(self):
+        for amount in ('100.00', '110.00', '90.00'):
+            verify_contribution(self.contribution(amount), self.admin)
+        pending = score_submission(self.contribution('5000.00'))
+        Contribution.objects.filter(pk=pending.pk).update(risk_score=0, risk_flags=[])
+
+        self.assertStatsMatchRebuild()
+        self.assertEqual(rescore_pending(), 1)
+        self.assertIn('AMOUNT_OUTLIER', Contribution.objects.get(pk=pending.pk).risk_flags)
+
+    def test_reversal_takes_the_amount_out_of_the_statistics(self):
+        contributions = [
+            verify_contribution(self.contribution(amount), self.admin) for amount in ('100.00', '300.00', '80.00')
+        ]
+
+        reverse_contribution(contributions[1], self.admin, 'Duplicate payment')
+
+        self.assertEqual(self.stats()[0], 2)
+        self.assertAlmostEqual(self.stats()[1], 90.0)
+        self.assertStatsMatchRebuild()
+
+    def test_copy_values_encode_nulls_dates_and_json(self):
+        moment = local_midnight(date(2024, 1, 1))
+
+        self.assertEqual(
+            [_copy_value(value) for value in (None, moment, [], ['BURST'], 5)],
+            ['', moment.isoformat(), '[]', '["BURST"]', 5]
+        )
@@ -2,7 +2,10 @@ from django.urls import path
 from .views import (
     ContributionTypeListView, ContributionCreateView, ContributionListView,
     ContributionDetailView, PendingContributionsView, ContributionVerifyView,
-    MemberBalanceView, AllBalancesView, ContributionSummaryView, DashboardStatsView
+    ContributionBulkVerifyView, ContributionReverseView,
+    MemberBalanceView, AllBalancesView, BalanceAsOfView, AllBalancesAsOfView, ContributionSummaryView, DashboardStatsView,
+    StatementReconciliationListCreateView, StatementReconciliationDetailView,
+    ReconciliationMismatchListView, ContributionTrendView, MemberStatementView
 )
 
 urlpatterns = [
@@ -16,13 +19,24 @@ urlpatterns = [
     
     # Admin - Verification
     path('pending/', PendingContributionsView.as_view(), name='pending-contributions'),
+    path('bulk-verify/', ContributionBulkVerifyView.as_view(), name='contribution-bulk-verify'),
     path('<int:pk>/verify/', ContributionVerifyView.as_view(), name='contribution-verify'),
+    path('<int:pk>/reverse/', ContributionReverseView.as_view(), name='contribution-reverse'),
+    
+    # Admin - M-Pesa statement reconciliation
+    path('reconciliations/', StatementReconciliationListCreateView.as_view(), name='reconciliation-list-create'),
+    path('reconciliations/<int:pk>/', StatementReconciliationDetailView.as_view(), name='reconciliation-detail'),
+    path('reconciliations/<int:pk>/mismatches/', ReconciliationMismatchListView.as_view(), name='reconciliation-mismatches'),
     
     # Balances
     path('balance/', MemberBalanceView.as_view(), name='member-balance'),
     path('balances/', AllBalancesView.as_view(), name='all-balances'),
+    path('balance/as-of/', BalanceAsOfView.as_view(), name='member-balance-as-of'),
+    path('balances/as-of/', AllBalancesAsOfView.as_view(), name='all-balances-as-of'),
+    path('statement/', MemberStatementView.as_view(), name='member-statement'),
     
     # Summaries and Dashboard
     path('summary/', ContributionSummaryView.as_view(), name='contribution-summary'),
     path('dashboard/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('trends/', ContributionTrendView.as_view(), name='contribution-trends'),
 ]
\ No newline at end of file
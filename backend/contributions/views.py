@@ -1,20 +1,41 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db.models import Sum, Count
-from decimal import Decimal
+from datetime import timedelta
 
-from .models import ContributionType, Contribution, SACCOBalance, ContributionSummary
+from .models import (
+    ContributionType, Contribution, SACCOBalance, ContributionSummary,
+    StatementReconciliation, ReconciliationMismatch
+)
 from .serializers import (
-    ContributionTypeSerializer, ContributionSerializer, ContributionCreateSerializer,
-    ContributionVerificationSerializer, SACCOBalanceSerializer,
-    ContributionSummarySerializer, MemberBalanceSerializer
+    ContributionTypeSerializer, ContributionSerializer, ContributionCreateSerializer, PendingContributionSerializer,
+    ContributionVerificationSerializer, ContributionBulkVerificationSerializer,
+    ContributionReversalSerializer,
+    SACCOBalanceSerializer, ContributionSummarySerializer, MemberBalanceSerializer,
+    StatementReconciliationSerializer, ReconciliationMismatchSerializer,
+    ContributionRollupSerializer, ContributionTrendQuerySerializer, MemberStatementQuerySerializer,
+    BalanceAsOfQuerySerializer, BalanceAsOfSerializer
+)
+from .services import (
+    ContributionStateError, verify_contribution, reject_contribution, reverse_contribution,
+    bulk_process_contributions
 )
+from .idempotency import IdempotentCreateMixin
+from .rollups import ROLLUP_TIME_ZONE, local_midnight, rollup_series
+from .statements import STATEMENT_COLUMNS, statement_rows
+from .checkpoints import balances_as_of
+from .dashboard import get_dashboard_stats
 from accounts.permissions import IsAdmin, IsOwnerOrAdmin
+from sacco_project.pagination import CursorPaginationMixin
+from sacco_project.query_planning import QueryPlanMixin, build_query_plan
+from sacco_project.streaming import STREAM_FORMATS
 
 
-class ContributionTypeListView(generics.ListAPIView):
+class ContributionTypeListView(QueryPlanMixin, generics.ListAPIView):
     """List all active contribution types"""
     
     queryset = ContributionType.objects.filter(is_active=True)
@@ -22,7 +43,7 @@ class ContributionTypeListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ContributionCreateView(generics.CreateAPIView):
+class ContributionCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     """Create a new contribution (member submits M-Pesa transaction)"""
     
     serializer_class = ContributionCreateSerializer
@@ -32,11 +53,12 @@ class ContributionCreateView(generics.CreateAPIView):
         serializer.save(member=self.request.user)
 
 
-class ContributionListView(generics.ListAPIView):
+class ContributionListView(CursorPaginationMixin, QueryPlanMixin, generics.ListAPIView):
     """List contributions - members see only their own, admins see all"""
     
     serializer_class = ContributionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-submitted_at', '-id')
     
     def get_queryset(self):
         user = self.request.user
@@ -45,7 +67,7 @@ class ContributionListView(generics.ListAPIView):
         return Contribution.objects.filter(member=user)
 
 
-class ContributionDetailView(generics.RetrieveAPIView):
+class ContributionDetailView(QueryPlanMixin, generics.RetrieveAPIView):
     """Get contribution details"""
     
     serializer_class = ContributionSerializer
@@ -58,12 +80,21 @@ class ContributionDetailView(generics.RetrieveAPIView):
         return Contribution.objects.filter(member=user)
 
 
-class PendingContributionsView(generics.ListAPIView):
-    """List pending contributions (admin only)"""
+class PendingContributionsView(CursorPaginationMixin, QueryPlanMixin, generics.ListAPIView):
+    """List pending contributions, newest first or riskiest first with ?ordering=risk (admin only)"""
     
-    serializer_class = ContributionSerializer
+    serializer_class = PendingContributionSerializer
     permission_classes = [IsAdmin]
     queryset = Contribution.objects.filter(status='PENDING')
+    
+    @property
+    def cursor_ordering(self):
+        if self.request.query_params.get('ordering') == 'risk':
+            return ('-risk_score', '-submitted_at', '-id')
+        return ('-submitted_at', '-id')
+    
+    def get_queryset(self):
+        return super().get_queryset().order_by(*self.cursor_ordering)
 
 
 class ContributionVerifyView(APIView):
@@ -83,41 +114,60 @@ class ContributionVerifyView(APIView):
         serializer = ContributionVerificationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        contribution.status = serializer.validated_data['status']
-        contribution.verified_by = request.user
-        contribution.verified_at = timezone.now()
-        
-        if contribution.status == 'REJECTED':
-            contribution.rejection_reason = serializer.validated_data.get('rejection_reason', '')
-        elif contribution.status == 'VERIFIED':
-            # Update member's balance
-            balance, created = SACCOBalance.objects.get_or_create(
-                member=contribution.member,
-                contribution_type=contribution.contribution_type,
-                defaults={'total_balance': Decimal('0.00')}
-            )
-            balance.total_balance += contribution.amount
-            balance.last_contribution_date = contribution.submitted_at
-            balance.save()
-            
-            # Update contribution summary
-            summary, created = ContributionSummary.objects.get_or_create(
-                contribution_type=contribution.contribution_type,
-                defaults={
-                    'total_amount': Decimal('0.00'),
-                    'total_contributions': 0,
-                    'active_members': 0
-                }
-            )
-            summary.total_amount += contribution.amount
-            summary.total_contributions += 1
-            summary.active_members = SACCOBalance.objects.filter(
-                contribution_type=contribution.contribution_type,
-                total_balance__gt=0
-            ).count()
-            summary.save()
-        
-        contribution.save()
+        try:
+            if serializer.validated_data['status'] == 'VERIFIED':
+                verify_contribution(contribution, request.user)
+            else:
+                reject_contribution(
+                    contribution,
+                    request.user,
+                    serializer.validated_data.get('rejection_reason', '')
+                )
+        except ContributionStateError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(ContributionSerializer(contribution).data)
+
+
+class ContributionBulkVerifyView(APIView):
+    """Verify or reject many pending contributions in one request (admin only)"""
+    
+    permission_classes = [IsAdmin]
+    
+    def post(self, request):
+        serializer = ContributionBulkVerificationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = bulk_process_contributions(serializer.validated_data['decisions'], request.user)
+        
+        return Response({
+            'processed': sum(1 for result in results if result['success']),
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results
+        })
+
+
+class ContributionReverseView(APIView):
+    """Reverse a verified contribution (admin only)"""
+    
+    permission_classes = [IsAdmin]
+    
+    def post(self, request, pk):
+        try:
+            contribution = Contribution.objects.get(pk=pk)
+        except Contribution.DoesNotExist:
+            return Response({'error': 'Contribution not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if contribution.status != 'VERIFIED':
+            return Response({'error': 'Only verified contributions can be reversed'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = ContributionReversalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            reverse_contribution(contribution, request.user, serializer.validated_data['reason'])
+        except ContributionStateError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(ContributionSerializer(contribution).data)
 
@@ -144,7 +194,75 @@ class MemberBalanceView(APIView):
         return Response(serializer.data)
 
 
-class AllBalancesView(generics.ListAPIView):
+class BalanceAsOfView(APIView):
+    """Get a member's balances at the end of a past date - members see only their own"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        serializer = BalanceAsOfQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        member_id = request.user.pk
+        if request.user.role == 'ADMIN' and params.get('member'):
+            member_id = params['member']
+            if not User.objects.filter(pk=member_id).exists():
+                return Response({'error': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        balances = balances_as_of(
+            local_midnight(params['date'] + timedelta(days=1)),
+            member_id=member_id,
+            contribution_type_id=params.get('contribution_type')
+        )
+        type_names = dict(ContributionType.objects.filter(
+            pk__in=[type_id for _, type_id in balances]
+        ).values_list('pk', 'name'))
+        
+        data = [
+            {
+                'contribution_type': type_id,
+                'contribution_type_name': type_names.get(type_id, ''),
+                'balance': balance
+            }
+            for (_, type_id), balance in sorted(balances.items())
+        ]
+        return Response({
+            'member': member_id,
+            'date': params['date'],
+            'balances': BalanceAsOfSerializer(data, many=True).data
+        })
+
+
+class AllBalancesAsOfView(APIView):
+    """Stream every member's balances at the end of a past date, e.g. for year-end audits (admin only)"""
+    
+    permission_classes = [IsAdmin]
+    columns = ['member_id', 'phone_number', 'contribution_type', 'balance']
+    
+    def get(self, request):
+        serializer = BalanceAsOfQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        balances = balances_as_of(
+            local_midnight(params['date'] + timedelta(days=1)),
+            contribution_type_id=params.get('contribution_type')
+        )
+        type_names = dict(ContributionType.objects.values_list('pk', 'name'))
+        phone_numbers = dict(User.objects.values_list('pk', 'phone_number').iterator()) if balances else {}
+        rows = (
+            (member_id, phone_numbers.get(member_id, ''), type_names.get(type_id, ''), balance)
+            for (member_id, type_id), balance in sorted(balances.items())
+        )
+        
+        encode, content_type, extension = STREAM_FORMATS[params['export']]
+        response = StreamingHttpResponse(encode(self.columns, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="balances-{params["date"]}.{extension}"'
+        return response
+
+
+class AllBalancesView(CursorPaginationMixin, QueryPlanMixin, generics.ListAPIView):
     """List all member balances (admin only)"""
     
     queryset = SACCOBalance.objects.all().select_related('member', 'contribution_type')
@@ -152,7 +270,7 @@ class AllBalancesView(generics.ListAPIView):
     permission_classes = [IsAdmin]
 
 
-class ContributionSummaryView(generics.ListAPIView):
+class ContributionSummaryView(QueryPlanMixin, generics.ListAPIView):
     """Get contribution summaries (admin only)"""
     
     queryset = ContributionSummary.objects.all().select_related('contribution_type')
@@ -160,25 +278,118 @@ class ContributionSummaryView(generics.ListAPIView):
     permission_classes = [IsAdmin]
 
 
-class DashboardStatsView(APIView):
-    """Get dashboard statistics (admin only)"""
+class ContributionTrendView(APIView):
+    """Daily or monthly contribution series from rollups - members see only their own"""
     
-    permission_classes = [IsAdmin]
+    permission_classes = [permissions.IsAuthenticated]
+    default_span_days = {'DAY': 90, 'MONTH': 5 * 366}
     
     def get(self, request):
-        total_members = User.objects.filter(role='MEMBER').count()
-        pending_contributions = Contribution.objects.filter(status='PENDING').count()
+        serializer = ContributionTrendQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        period = params['period']
+        end = params.get('end') or timezone.localtime(timezone.now(), ROLLUP_TIME_ZONE).date()
+        start = params.get('start') or end - timedelta(days=self.default_span_days[period])
+        if period == 'MONTH':
+            start = start.replace(day=1)
+        
+        member_id = params.get('member')
+        if request.user.role != 'ADMIN':
+            member_id = request.user.pk
         
-        summaries = ContributionSummary.objects.all()
-        summary_data = ContributionSummarySerializer(summaries, many=True).data
+        series = build_query_plan(ContributionRollupSerializer).apply(rollup_series(
+            period,
+            start,
+            end,
+            contribution_type_id=params.get('contribution_type'),
+            member_id=member_id
+        ))
         
         return Response({
-            'total_members': total_members,
-            'pending_contributions': pending_contributions,
-            'contribution_summaries': summary_data
+            'period': period,
+            'start': start,
+            'end': end,
+            'member': member_id,
+            'series': ContributionRollupSerializer(series, many=True).data
         })
 
 
+class MemberStatementView(APIView):
+    """Stream a member's contribution statement as CSV or NDJSON - members see only their own"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        serializer = MemberStatementQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        member_id = request.user.pk
+        if request.user.role == 'ADMIN' and params.get('member'):
+            member_id = params['member']
+            if not User.objects.filter(pk=member_id).exists():
+                return Response({'error': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        encode, content_type, extension = STREAM_FORMATS[params['export']]
+        rows = statement_rows(
+            member_id,
+            start=params.get('start'),
+            end=params.get('end'),
+            contribution_type_id=params.get('contribution_type')
+        )
+        response = StreamingHttpResponse(encode(STATEMENT_COLUMNS, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="statement-{member_id}.{extension}"'
+        return response
+
+
+class StatementReconciliationListCreateView(QueryPlanMixin, generics.ListCreateAPIView):
+    """Upload M-Pesa statements for reconciliation and list past jobs (admin only)"""
+    
+    queryset = StatementReconciliation.objects.all().select_related('uploaded_by')
+    serializer_class = StatementReconciliationSerializer
+    permission_classes = [IsAdmin]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def perform_create(self, serializer):
+        # Jobs are picked up by the process_reconciliations management command
+        serializer.save(uploaded_by=self.request.user)
+
+
+class StatementReconciliationDetailView(QueryPlanMixin, generics.RetrieveAPIView):
+    """Get reconciliation job progress (admin only)"""
+    
+    queryset = StatementReconciliation.objects.all().select_related('uploaded_by')
+    serializer_class = StatementReconciliationSerializer
+    permission_classes = [IsAdmin]
+
+
+class ReconciliationMismatchListView(QueryPlanMixin, generics.ListAPIView):
+    """Mismatch report for a reconciliation job (admin only)"""
+    
+    serializer_class = ReconciliationMismatchSerializer
+    permission_classes = [IsAdmin]
+    
+    def get_queryset(self):
+        queryset = ReconciliationMismatch.objects.filter(
+            reconciliation_id=self.kwargs['pk']
+        ).select_related('contribution')
+        mismatch_type = self.request.query_params.get('type')
+        if mismatch_type:
+            queryset = queryset.filter(mismatch_type=mismatch_type)
+        return queryset
+
+
+class DashboardStatsView(APIView):
+    """Get dashboard statistics (admin only)"""
+    
+    permission_classes = [IsAdmin]
+    
+    def get(self, request):
+        return Response(get_dashboard_stats())
+
+
 # Import User model
 from django.contrib.auth import get_user_model
 User = get_user_model()
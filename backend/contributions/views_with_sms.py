@@ -1,14 +1,16 @@
-# Updated ContributionVerifyView with SMS integration
-# Replace the existing ContributionVerifyView in contributions/views.py with this implementation
+# Updated ContributionVerifyView and ContributionBulkVerifyView with SMS integration
+# Replace the existing views in contributions/views.py with these implementations
 
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
-from decimal import Decimal
 
-from .models import Contribution, SACCOBalance, ContributionSummary
-from .serializers import ContributionSerializer, ContributionVerificationSerializer
+from .models import Contribution
+from .serializers import (
+    ContributionSerializer, ContributionVerificationSerializer, ContributionBulkVerificationSerializer
+)
+from .services import ContributionStateError, verify_contribution, reject_contribution, bulk_process_contributions
 from accounts.permissions import IsAdmin
 from notifications.services import SMSService
 
@@ -30,57 +32,47 @@ class ContributionVerifyView(APIView):
         serializer = ContributionVerificationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        contribution.status = serializer.validated_data['status']
-        contribution.verified_by = request.user
-        contribution.verified_at = timezone.now()
-        
-        # Initialize SMS service
         sms_service = SMSService()
         
-        if contribution.status == 'REJECTED':
-            contribution.rejection_reason = serializer.validated_data.get('rejection_reason', '')
-            contribution.save()
-            
-            # Send rejection SMS
-            try:
-                sms_service.send_contribution_rejected_sms(contribution)
-            except Exception as e:
-                print(f"Failed to send rejection SMS: {str(e)}")
-                
-        elif contribution.status == 'VERIFIED':
-            # Update member's balance
-            balance, created = SACCOBalance.objects.get_or_create(
-                member=contribution.member,
-                contribution_type=contribution.contribution_type,
-                defaults={'total_balance': Decimal('0.00')}
-            )
-            balance.total_balance += contribution.amount
-            balance.last_contribution_date = contribution.submitted_at
-            balance.save()
-            
-            # Update contribution summary
-            summary, created = ContributionSummary.objects.get_or_create(
-                contribution_type=contribution.contribution_type,
-                defaults={
-                    'total_amount': Decimal('0.00'),
-                    'total_contributions': 0,
-                    'active_members': 0
-                }
+        try:
+            # The outbox row commits (or rolls back) together with the status change;
+            # the sms_dispatcher command sends it, so the provider is never on this request's path
+            with transaction.atomic():
+                if serializer.validated_data['status'] == 'REJECTED':
+                    reject_contribution(
+                        contribution,
+                        request.user,
+                        serializer.validated_data.get('rejection_reason', '')
+                    )
+                    sms_service.queue_contribution_rejected_sms(contribution)
+                else:
+                    verify_contribution(contribution, request.user)
+                    sms_service.queue_contribution_verified_sms(contribution)
+        except ContributionStateError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(ContributionSerializer(contribution).data)
+
+
+class ContributionBulkVerifyView(APIView):
+    """Verify or reject many pending contributions in one request (admin only) with SMS notification"""
+    
+    permission_classes = [IsAdmin]
+    
+    def post(self, request):
+        serializer = ContributionBulkVerificationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        with transaction.atomic():
+            results = bulk_process_contributions(serializer.validated_data['decisions'], request.user)
+            # Notices are merged per member, so clearing a member's backlog sends them one SMS
+            processed = Contribution.objects.select_related('member', 'contribution_type').filter(
+                pk__in=[result['id'] for result in results if result['success']]
             )
-            summary.total_amount += contribution.amount
-            summary.total_contributions += 1
-            summary.active_members = SACCOBalance.objects.filter(
-                contribution_type=contribution.contribution_type,
-                total_balance__gt=0
-            ).count()
-            summary.save()
-            
-            contribution.save()
-            
-            # Send verification SMS
-            try:
-                sms_service.send_contribution_verified_sms(contribution)
-            except Exception as e:
-                print(f"Failed to send verification SMS: {str(e)}")
+            SMSService().queue_contribution_notifications(processed)
         
-        return Response(ContributionSerializer(contribution).data)
\ No newline at end of file
+        return Response({
+            'processed': sum(1 for result in results if result['success']),
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results
+        })
@@ -112,6 +112,9 @@ class Document(models.Model):
         indexes = [
             models.Index(fields=['user', 'category']),
             models.Index(fields=['status', '-uploaded_at']),
+            # Trailing -id keeps keyset pagination stable when timestamps tie
+            models.Index(fields=['user', '-uploaded_at', '-id']),
+            models.Index(fields=['-uploaded_at', '-id']),
         ]
     
     def __str__(self):
@@ -11,9 +11,11 @@ from .serializers import (
     DocumentVerificationSerializer
 )
 from accounts.permissions import IsAdmin
+from sacco_project.pagination import CursorPaginationMixin
+from sacco_project.query_planning import QueryPlanMixin, build_query_plan
 
 
-class DocumentCategoryListView(generics.ListAPIView):
+class DocumentCategoryListView(QueryPlanMixin, generics.ListAPIView):
     """List all document categories"""
     
     queryset = DocumentCategory.objects.filter(is_active=True)
@@ -21,11 +23,12 @@ class DocumentCategoryListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class DocumentListCreateView(generics.ListCreateAPIView):
+class DocumentListCreateView(CursorPaginationMixin, QueryPlanMixin, generics.ListCreateAPIView):
     """List and create documents"""
     
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    cursor_ordering = ('-uploaded_at', '-id')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -42,7 +45,7 @@ class DocumentListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DocumentDetailView(QueryPlanMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete document"""
     
     serializer_class = DocumentSerializer
@@ -63,7 +66,7 @@ class DocumentVerifyView(APIView):
     
     def post(self, request, pk):
         try:
-            document = Document.objects.get(pk=pk)
+            document = build_query_plan(DocumentSerializer).apply(Document.objects.all()).get(pk=pk)
         except Document.DoesNotExist:
             return Response(
                 {'error': 'Document not found'},
@@ -85,7 +88,7 @@ class DocumentVerifyView(APIView):
         return Response(DocumentSerializer(document).data)
 
 
-class UserDocumentsView(generics.ListAPIView):
+class UserDocumentsView(QueryPlanMixin, generics.ListAPIView):
     """Get current user's documents grouped by category"""
     
     serializer_class = DocumentSerializer
@@ -95,7 +98,7 @@ class UserDocumentsView(generics.ListAPIView):
         return Document.objects.filter(user=self.request.user)
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
         
         # Group by category
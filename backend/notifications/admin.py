@@ -1,3 +1,23 @@
 from django.contrib import admin
+from .models import SMSNotification, NotificationTemplate, SMSArchive
 
-# Register your models here.
+
+@admin.register(SMSNotification)
+class SMSNotificationAdmin(admin.ModelAdmin):
+    list_display = ['phone_number', 'recipient', 'status', 'delivery_status', 'attempts', 'sent_at', 'delivered_at', 'created_at']
+    list_filter = ['status']
+    search_fields = ['phone_number', 'external_id']
+    raw_id_fields = ['recipient']
+
+
+@admin.register(NotificationTemplate)
+class NotificationTemplateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'is_active', 'updated_at']
+    list_filter = ['is_active']
+    search_fields = ['name']
+
+
+@admin.register(SMSArchive)
+class SMSArchiveAdmin(admin.ModelAdmin):
+    list_display = ['month', 'part', 'row_count', 'purged', 'path', 'created_at']
+    exclude = ['recipient_offsets']
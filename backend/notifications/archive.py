@@ -0,0 +1,326 @@
+"""
+Monthly rollover of the SMS notification log.
+
+Whole local months older than settings.SMS_RETENTION_MONTHS are written to
+one gzip-compressed NDJSON file per month under SMS_ARCHIVE_ROOT and then
+deleted from sms_notifications, so the hot table only ever holds the
+retention window. Rows are written grouped by recipient, each recipient as
+its own gzip member; SMSArchive records every member's byte range, so
+reading one member's archived messages decompresses only their rows.
+
+Messages still PENDING are never archived. When they settle after their
+month was archived, a later run writes them to a further part of that month
+(sms-YYYY-MM.1.ndjson.gz, ...). The same happens to a row whose delivery
+fields change between being written and being purged (a late delivery
+report): the purge only deletes rows still matching their archived copy, so
+the newer state is archived again in a later part, which supersedes the
+earlier one when reading. Each archive is marked purged once its rows are
+gone from the hot table, so later runs never reread finished archives.
+"""
+
+import gzip
+import itertools
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Q
+from django.db.models.fields.json import KT
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from contributions.rollups import local_date, local_midnight, month_windows
+from sacco_project.streaming import gzip_stream, ndjson_lines
+
+from .models import SMSArchive, SMSNotification
+
+
+ARCHIVE_COLUMNS = [
+    'id', 'recipient_id', 'phone_number', 'message', 'status', 'attempts', 'sent_at', 'created_at',
+    'external_id', 'error_message', 'delivery_status', 'delivered_at', 'failed_at'
+]
+DATETIME_COLUMNS = {'sent_at', 'created_at', 'delivered_at', 'failed_at'}
+# Columns that retries and delivery reports can still change after a row is archived
+MUTABLE_COLUMNS = [
+    'status', 'attempts', 'sent_at', 'external_id', 'error_message', 'delivery_status', 'delivered_at', 'failed_at'
+]
+
+
+def archive_cutoff(now=None, retention_months=None):
+    """Start of the oldest month kept in the hot table"""
+    retention_months = settings.SMS_RETENTION_MONTHS if retention_months is None else retention_months
+    today = local_date(now or timezone.now())
+    months = today.year * 12 + today.month - 1 - retention_months
+    return local_midnight(date(months // 12, months % 12 + 1, 1))
+
+
+def _archive_path(archive):
+    return Path(settings.SMS_ARCHIVE_ROOT) / archive.path
+
+
+def _offset_key(recipient_id):
+    # Not a bare number, which JSON key lookups would treat as an array index
+    return f'r{recipient_id}'
+
+
+def _archivable(window_start, window_end):
+    return SMSNotification.objects.filter(
+        created_at__gte=window_start,
+        created_at__lt=window_end
+    ).exclude(status='PENDING')
+
+
+def _write_archive(month, part, window_start, window_end, chunk_size):
+    suffix = f'.{part}' if part else ''
+    relative = Path(f'{month:%Y}') / f'sms-{month:%Y-%m}{suffix}.ndjson.gz'
+    path = Path(settings.SMS_ARCHIVE_ROOT) / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+
+    rows = _archivable(window_start, window_end).order_by('recipient_id', 'created_at', 'id').values_list(
+        *ARCHIVE_COLUMNS
+    ).iterator(chunk_size=chunk_size)
+    offsets = {}
+    row_count = 0
+    with open(partial, 'wb') as archive_file:
+        for recipient_id, group in itertools.groupby(rows, key=lambda row: row[1]):
+            group = list(group)
+            data = b''.join(gzip_stream(ndjson_lines(ARCHIVE_COLUMNS, group)))
+            offsets[_offset_key(recipient_id)] = [archive_file.tell(), len(data), len(group)]
+            archive_file.write(data)
+            row_count += len(group)
+        archive_file.flush()
+        os.fsync(archive_file.fileno())
+    os.replace(partial, path)
+
+    return SMSArchive.objects.create(
+        month=month,
+        part=part,
+        path=str(relative),
+        row_count=row_count,
+        recipient_offsets=offsets
+    )
+
+
+def _decode(line):
+    record = json.loads(line)
+    for column in DATETIME_COLUMNS:
+        if record.get(column):
+            record[column] = parse_datetime(record[column])
+    return record
+
+
+def _archived_states(archive):
+    """(id, MUTABLE_COLUMNS values) for every row of an archive"""
+    with gzip.open(_archive_path(archive), 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            record = _decode(line)
+            yield record['id'], tuple(record[column] for column in MUTABLE_COLUMNS)
+
+
+def _purge(archive, batch_size):
+    """
+    Delete an archive's rows from the hot table and mark it purged
+
+    Rows are locked and compared with their archived copy first; a row that
+    changed since it was written stays in the hot table to be archived again.
+    """
+    deleted = 0
+    states = _archived_states(archive)
+    while True:
+        batch = dict(itertools.islice(states, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            current = SMSNotification.objects.select_for_update().filter(pk__in=batch).values_list(
+                'id', *MUTABLE_COLUMNS
+            )
+            unchanged = [row[0] for row in current if tuple(row[1:]) == batch[row[0]]]
+            deleted += SMSNotification.objects.filter(pk__in=unchanged).delete()[0]
+    archive.purged = True
+    archive.save(update_fields=['purged'])
+    return deleted
+
+
+def archive_month(window_start, window_end, chunk_size=5000, batch_size=5000):
+    """
+    Archive one month and delete its archived rows from the hot table
+
+    Safe to re-run: archives not yet purged (a run interrupted while
+    deleting) are purged first, and whatever archivable rows of the month are
+    still in the hot table after that go into a new part.
+
+    Returns:
+        (archives written, rows deleted)
+    """
+    month = local_date(window_start)
+    archives = list(SMSArchive.objects.filter(month=month).order_by('part'))
+
+    deleted = 0
+    for archive in archives:
+        if not archive.purged:
+            deleted += _purge(archive, batch_size)
+
+    written = []
+    if _archivable(window_start, window_end).exists():
+        part = archives[-1].part + 1 if archives else 0
+        archive = _write_archive(month, part, window_start, window_end, chunk_size)
+        deleted += _purge(archive, batch_size)
+        written.append(archive)
+    return written, deleted
+
+
+def archive_notifications(retention_months=None, chunk_size=5000, batch_size=5000, stdout=None):
+    """
+    Archive every month older than the retention window, oldest first
+
+    Returns:
+        Number of rows moved out of the hot table
+    """
+    cutoff = archive_cutoff(retention_months=retention_months)
+    first = SMSNotification.objects.filter(created_at__lt=cutoff).exclude(status='PENDING').aggregate(
+        first=Min('created_at')
+    )['first']
+    unpurged = SMSArchive.objects.filter(purged=False).aggregate(first=Min('month'))['first']
+    starts = [month for month in (first and local_date(first), unpurged) if month is not None]
+    if not starts:
+        return 0
+
+    moved = 0
+    for window_start, window_end in month_windows(min(starts), local_date(cutoff)):
+        if window_end > cutoff:
+            break
+        written, deleted = archive_month(window_start, window_end, chunk_size, batch_size)
+        moved += deleted
+        if stdout is not None and (written or deleted):
+            rows = sum(archive.row_count for archive in written)
+            stdout.write(f'{local_date(window_start):%Y-%m}: {rows} archived, {deleted} deleted')
+    return moved
+
+
+def read_archived(archive, recipient_id, entry=None):
+    """A recipient's messages from one archive, oldest first"""
+    entry = entry or archive.recipient_offsets.get(_offset_key(recipient_id))
+    if not entry:
+        return []
+    offset, length, _ = entry
+    with open(_archive_path(archive), 'rb') as archive_file:
+        archive_file.seek(offset)
+        data = gzip.decompress(archive_file.read(length))
+    return [_decode(line) for line in data.decode('utf-8').splitlines() if line]
+
+
+def _not_in_hot_table(records, chunk_size=5000):
+    """Skip archived records whose row is still in the hot table, which holds the newer copy"""
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        hot = set(
+            SMSNotification.objects.filter(pk__in=[record['id'] for record in chunk]).values_list('pk', flat=True)
+        )
+        for record in chunk:
+            if record['id'] not in hot:
+                yield record
+
+
+def _archived_records(since=None, until=None):
+    archives = SMSArchive.objects.order_by('month', '-part')
+    if since is not None:
+        archives = archives.filter(month__gte=local_date(since).replace(day=1))
+    if until is not None:
+        archives = archives.filter(month__lt=local_date(until))
+    for _, parts in itertools.groupby(archives.only('month', 'part', 'path'), key=lambda archive: archive.month):
+        parts = list(parts)
+        # Only months archived in several parts can hold a row twice
+        seen = set() if len(parts) > 1 else None
+        for archive in parts:
+            with gzip.open(_archive_path(archive), 'rt', encoding='utf-8') as lines:
+                for line in lines:
+                    record = _decode(line)
+                    if since is not None and record['created_at'] < since:
+                        continue
+                    if until is not None and record['created_at'] >= until:
+                        continue
+                    if seen is not None:
+                        if record['id'] in seen:
+                            continue
+                        seen.add(record['id'])
+                    yield record
+
+
+def archived_rows(columns, since=None, until=None):
+    """
+    Archived messages created in [since, until) as tuples of `columns`
+
+    Archives are read whole, oldest month first; within a month rows come in
+    archive order (by recipient), not by id. A row archived in more than one
+    part of a month comes from the newest part, and rows still in the hot
+    table are left to the caller's hot table read.
+    """
+    for record in _not_in_hot_table(_archived_records(since, until)):
+        yield tuple(record.get(column) for column in columns)
+
+
+def notification_history(recipient_id, since=None, until=None, before=None, limit=None):
+    """
+    A recipient's messages created in [since, until), newest first
+
+    Reads the hot table and, for archived months in range, the recipient's
+    rows of each archive file. With `before` (a (created_at, id) position)
+    only older messages are returned, and with `limit` at most that many:
+    the hot table is read with the same bound and archived months are read
+    newest first only until enough rows have been collected, so a page
+    costs the same however far back it is.
+
+    Returns:
+        List of dicts keyed by ARCHIVE_COLUMNS
+    """
+    queryset = SMSNotification.objects.filter(recipient_id=recipient_id)
+    archives = SMSArchive.objects.all()
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+        archives = archives.filter(month__gte=local_date(since).replace(day=1))
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+        archives = archives.filter(month__lt=local_date(until))
+    if before is not None:
+        before_at, before_id = before
+        queryset = queryset.filter(
+            created_at__lte=before_at
+        ).filter(Q(created_at__lt=before_at) | Q(id__lt=before_id))
+        archives = archives.filter(month__lte=local_date(before_at).replace(day=1))
+
+    hot = queryset.order_by('-created_at', '-id').values(*ARCHIVE_COLUMNS)
+    records = {record['id']: record for record in (hot if limit is None else hot[:limit])}
+
+    # Fetch only this recipient's byte range from each archive's offsets
+    entries = archives.annotate(entry=KT(f'recipient_offsets__{_offset_key(recipient_id)}')).filter(
+        entry__isnull=False
+    ).order_by('-month', '-part').only('month', 'part', 'path')
+    archived = {}
+    month = None
+    for archive in entries:
+        # Months are read whole, so stop only on a month boundary
+        if limit is not None and archive.month != month and len(archived) >= limit:
+            break
+        month = archive.month
+        for record in read_archived(archive, recipient_id, json.loads(archive.entry)):
+            if since is not None and record['created_at'] < since:
+                continue
+            if until is not None and record['created_at'] >= until:
+                continue
+            if before is not None and (record['created_at'], record['id']) >= (before_at, before_id):
+                continue
+            # Newest part first: a row archived twice keeps its newer copy
+            archived.setdefault(record['id'], record)
+
+    # A row still in the hot table (archive interrupted mid-delete, or changed since) is the newer copy
+    for record_id, record in archived.items():
+        records.setdefault(record_id, record)
+    history = sorted(records.values(), key=lambda record: (record['created_at'], record['id']), reverse=True)
+    return history if limit is None else history[:limit]
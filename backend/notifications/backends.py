@@ -0,0 +1,206 @@
+"""
+Pluggable SMS provider backends.
+
+settings.SMS_BACKEND names the backend class, in the same way as Django's
+EMAIL_BACKEND. The dispatcher only talks to providers through send(), so a
+fake backend can stand in for Africa's Talking in development and tests.
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from .metrics import provider_latency
+
+
+@dataclass
+class SendResult:
+    """Outcome of sending one message"""
+
+    success: bool
+    external_id: str = ''
+    error: str = ''
+    # False for failures that will not go away on retry (e.g. an invalid number)
+    retryable: bool = True
+    # Held back by rate limiting; retry after retry_in seconds without counting an attempt
+    throttled: bool = False
+    retry_in: float = 0
+
+
+class BaseSMSBackend:
+    """Interface for SMS providers; send() and send_batch() must be safe to call from several threads"""
+
+    # Most recipients one send_batch() call accepts
+    max_batch_size = 1
+
+    def send(self, phone_number, message):
+        raise NotImplementedError
+
+    def send_batch(self, phone_numbers, message):
+        """Send one message to several numbers; returns a SendResult per number, in order"""
+        return [self.send(phone_number, message) for phone_number in phone_numbers]
+
+
+class AfricasTalkingBackend(BaseSMSBackend):
+    """
+    Sends through the Africa's Talking SMS API
+
+    Talks to the messaging endpoint directly over a pooled keep-alive
+    requests session with timeouts (the SDK opens a new connection per call
+    and never times out). One instance is shared per process, see get_sms_backend().
+    """
+
+    # Recipient statuses that retrying cannot fix
+    PERMANENT_ERRORS = {'InvalidPhoneNumber', 'InvalidSenderId', 'UserInBlacklist', 'DoNotDisturbRejection'}
+
+    # Numbers the API accepts (as validated by the SDK)
+    PHONE_PATTERN = re.compile(r'^\+\d{1,3}\d{3,}$')
+
+    def __init__(self):
+        domain = 'sandbox.africastalking.com' if settings.AT_USERNAME == 'sandbox' else 'africastalking.com'
+        self.url = f'https://api.{domain}/version1/messaging'
+        self.max_batch_size = settings.SMS_BATCH_SIZE
+        self.timeout = (settings.SMS_HTTP_CONNECT_TIMEOUT, settings.SMS_HTTP_READ_TIMEOUT)
+
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=settings.SMS_HTTP_POOL_SIZE))
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'apiKey': settings.AT_API_KEY,
+        })
+
+    def close(self):
+        self.session.close()
+
+    def _post(self, phone_numbers, message):
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.post(
+                self.url,
+                data={
+                    'username': settings.AT_USERNAME,
+                    'to': ','.join(phone_numbers),
+                    'message': message,
+                    'bulkSMSMode': 1,
+                    'from': settings.AT_SENDER_ID,
+                },
+                timeout=self.timeout
+            )
+            if not 200 <= response.status_code < 300:
+                raise requests.HTTPError(f'{response.status_code}: {response.text[:200]}', response=response)
+            ok = True
+            return response.json()
+        finally:
+            provider_latency.record(time.perf_counter() - started, ok)
+
+    def send(self, phone_number, message):
+        return self.send_batch([phone_number], message)[0]
+
+    def send_batch(self, phone_numbers, message):
+        results = [None] * len(phone_numbers)
+        # The API rejects the whole request if any number is malformed, so those fail on their own
+        positions = {}
+        for index, phone_number in enumerate(phone_numbers):
+            if self.PHONE_PATTERN.match(phone_number or ''):
+                positions.setdefault(phone_number, []).append(index)
+            else:
+                results[index] = SendResult(success=False, error='InvalidPhoneNumber', retryable=False)
+        if not positions:
+            return results
+
+        try:
+            response = self._post(list(positions), message)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                retry_after = e.response.headers.get('Retry-After', '')
+                retry_in = int(retry_after) if retry_after.isdigit() else settings.SMS_RETRY_BASE_SECONDS
+                failure = SendResult(success=False, error='Rate limited by provider', throttled=True, retry_in=retry_in)
+            else:
+                failure = SendResult(success=False, error=str(e))
+            return [result or failure for result in results]
+        except Exception as e:
+            return [result or SendResult(success=False, error=str(e)) for result in results]
+
+        # Each recipient entry reports the number it belongs to
+        for recipient in response.get('SMSMessageData', {}).get('Recipients') or []:
+            indexes = positions.get(recipient.get('number'))
+            if not indexes:
+                continue
+            if recipient.get('status') == 'Success':
+                result = SendResult(success=True, external_id=recipient.get('messageId', ''))
+            else:
+                error = recipient.get('status', 'Unknown error')
+                result = SendResult(success=False, error=error, retryable=error not in self.PERMANENT_ERRORS)
+            for index in indexes:
+                results[index] = result
+
+        # The request went through, so a number missing from the response is not retried
+        return [
+            result or SendResult(success=False, error='No status in response', retryable=False)
+            for result in results
+        ]
+
+
+class FakeSMSBackend(BaseSMSBackend):
+    """
+    In-memory backend for development and tests
+
+    Sent messages are appended to FakeSMSBackend.outbox. Numbers listed in
+    `fail_numbers` fail permanently and those in `flaky_numbers` fail with a
+    retryable error.
+    """
+
+    max_batch_size = 100
+    outbox = []
+    fail_numbers = set()
+    flaky_numbers = set()
+    _lock = threading.Lock()
+
+    def send(self, phone_number, message):
+        if phone_number in self.fail_numbers:
+            return SendResult(success=False, error='InvalidPhoneNumber', retryable=False)
+        if phone_number in self.flaky_numbers:
+            return SendResult(success=False, error='Temporary provider error')
+        external_id = f'fake-{uuid.uuid4().hex[:12]}'
+        with self._lock:
+            self.outbox.append((phone_number, message, external_id))
+        return SendResult(success=True, external_id=external_id)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_sms_backend():
+    """The process-wide instance of the backend configured in settings.SMS_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(settings.SMS_BACKEND)()
+    return _backend
+
+
+def reset_sms_backend():
+    """
+    Drop the shared backend so the next call builds a fresh one
+
+    Runs automatically in forked children (e.g. gunicorn workers with
+    --preload), which must not share the parent's pooled sockets.
+    """
+    global _backend, _backend_lock
+    _backend_lock = threading.Lock()
+    _backend = None
+    provider_latency.reset()
+
+
+os.register_at_fork(after_in_child=reset_sms_backend)
@@ -0,0 +1,103 @@
+"""
+SMS delivery reports.
+
+The provider calls back once per message and status change. The webhook only
+appends each callback to SMSDeliveryReport, one small insert with no lookups,
+so bursts of thousands per minute are cheap. apply_delivery_reports() then
+drains that buffer in batches: it keeps the most significant report per
+external_id, loads the matching notifications through the external_id index
+with one query, and saves them with one bulk update.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SMSDeliveryReport, SMSNotification
+
+
+# Africa's Talking delivery statuses that end a message's life
+DELIVERED_STATUSES = {'Success'}
+FAILED_STATUSES = {'Failed', 'Rejected', 'AbsentSubscriber', 'Expired'}
+
+# A callback can beat the dispatcher recording the message id; such reports are
+# retried every ORPHAN_RETRY and dropped once older than ORPHAN_TTL
+ORPHAN_RETRY = timedelta(seconds=30)
+ORPHAN_TTL = timedelta(hours=1)
+
+
+def _rank(report):
+    # Final statuses outrank intermediate ones (Sent, Submitted, Buffered) that may arrive late
+    return report.status in DELIVERED_STATUSES or report.status in FAILED_STATUSES
+
+
+def record_delivery_report(external_id, status, failure_reason=''):
+    return SMSDeliveryReport.objects.create(
+        external_id=external_id,
+        status=status,
+        failure_reason=failure_reason or ''
+    )
+
+
+def apply_delivery_reports(batch_size=1000):
+    """
+    Apply up to batch_size buffered reports to their notifications
+
+    Notifications already DELIVERED or FAILED keep their final state.
+    Several workers may run this at once.
+
+    Returns:
+        (reports processed, notifications updated)
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        reports = list(
+            SMSDeliveryReport.objects.select_for_update(skip_locked=True).filter(
+                retry_after__lte=now
+            ).order_by('id')[:batch_size]
+        )
+        if not reports:
+            return 0, 0
+
+        # Reports are in arrival order, so later ones win among equals
+        latest = {}
+        for report in reports:
+            current = latest.get(report.external_id)
+            if current is None or _rank(report) >= _rank(current):
+                latest[report.external_id] = report
+
+        notifications = list(
+            SMSNotification.objects.select_for_update().filter(external_id__in=latest).only(
+                'pk', 'external_id', 'status', 'delivery_status', 'delivered_at', 'failed_at', 'error_message'
+            )
+        )
+        updated = []
+        for notification in notifications:
+            if notification.delivered_at or notification.failed_at:
+                continue
+            report = latest[notification.external_id]
+            notification.delivery_status = report.status
+            if report.status in DELIVERED_STATUSES:
+                notification.status = 'DELIVERED'
+                notification.delivered_at = report.received_at
+            elif report.status in FAILED_STATUSES:
+                notification.status = 'FAILED'
+                notification.failed_at = report.received_at
+                notification.error_message = report.failure_reason or report.status
+            updated.append(notification)
+        SMSNotification.objects.bulk_update(
+            updated, ['status', 'delivery_status', 'delivered_at', 'failed_at', 'error_message']
+        )
+
+        matched = {notification.external_id for notification in notifications}
+        done, waiting = [], []
+        for report in reports:
+            if report.external_id in matched or report.received_at < now - ORPHAN_TTL:
+                done.append(report.pk)
+            else:
+                waiting.append(report.pk)
+        SMSDeliveryReport.objects.filter(pk__in=done).delete()
+        if waiting:
+            SMSDeliveryReport.objects.filter(pk__in=waiting).update(retry_after=now + ORPHAN_RETRY)
+    return len(reports), len(updated)
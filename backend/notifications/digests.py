@@ -0,0 +1,149 @@
+"""
+Coalesced contribution notifications.
+
+Verification and rejection notices are held per member for
+settings.SMS_DIGEST_WINDOW_SECONDS, counted from the member's oldest held
+notice, and then sent as one SMS: the usual message for a single notice, a
+digest such as "3 contributions totalling KES 4500.00 have been verified" for
+several. A member reaching SMS_DIGEST_MAX_ITEMS held notices is flushed
+straight away. The sms_dispatcher command flushes due digests into the outbox,
+so provider calls scale with members rather than events. A window of 0
+disables coalescing.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import DigestItem, SMSNotification
+from .preferences import sms_opted_out
+from .templating import member_context, render_template
+
+
+def _item_context(item):
+    return {
+        **member_context(item.recipient),
+        'amount': item.amount,
+        'contribution_type': item.contribution_type,
+        'transaction_code': item.transaction_code,
+        'rejection_reason': item.rejection_reason,
+    }
+
+
+def _summary(items, verb):
+    total = sum((item.amount for item in items), Decimal('0.00'))
+    if len(items) == 1:
+        return f'1 contribution of KES {total} has been {verb}'
+    return f'{len(items)} contributions totalling KES {total} have been {verb}'
+
+
+def digest_message(recipient, items):
+    """One SMS text covering all of a member's held notices"""
+    if len(items) == 1:
+        item = items[0]
+        name = 'contribution_verified' if item.kind == 'VERIFIED' else 'contribution_rejected'
+        return render_template(name, _item_context(item))
+
+    verified = [item for item in items if item.kind == 'VERIFIED']
+    rejected = [item for item in items if item.kind == 'REJECTED']
+    parts = []
+    if verified:
+        parts.append(_summary(verified, 'verified'))
+    if rejected:
+        parts.append(_summary(rejected, 'rejected'))
+    return render_template('contribution_digest', {
+        **member_context(recipient),
+        'summary': ' and '.join(parts),
+        'verified_count': len(verified),
+        'verified_total': sum((item.amount for item in verified), Decimal('0.00')),
+        'rejected_count': len(rejected),
+        'rejected_total': sum((item.amount for item in rejected), Decimal('0.00')),
+    })
+
+
+def queue_contribution_notifications(contributions):
+    """
+    Notify members that their contributions were verified or rejected
+
+    Runs in the caller's transaction. Members who opted out of contribution
+    SMS are skipped (one query for all of them).
+
+    Returns:
+        The DigestItem objects held back, or the SMSNotification objects
+        queued directly when coalescing is disabled
+    """
+    contributions = [
+        contribution for contribution in contributions if contribution.status in ('VERIFIED', 'REJECTED')
+    ]
+    opted_out = sms_opted_out('contributions', {contribution.member_id for contribution in contributions})
+    items = [
+        DigestItem(
+            recipient=contribution.member,
+            kind=contribution.status,
+            amount=contribution.amount,
+            contribution_type=contribution.contribution_type.name,
+            transaction_code=contribution.mpesa_transaction_code,
+            rejection_reason=contribution.rejection_reason or ''
+        )
+        for contribution in contributions
+        if contribution.member_id not in opted_out
+    ]
+    if settings.SMS_DIGEST_WINDOW_SECONDS > 0:
+        return DigestItem.objects.bulk_create(items)
+
+    return SMSNotification.objects.bulk_create([
+        SMSNotification(
+            recipient=item.recipient,
+            phone_number=item.recipient.phone_number,
+            message=digest_message(item.recipient, [item]),
+            status='PENDING'
+        )
+        for item in items
+    ])
+
+
+def flush_digests(limit=500):
+    """
+    Move the held notices of up to `limit` due members into the outbox, one SMS each
+
+    Returns:
+        (members flushed, notices merged)
+    """
+    now = timezone.now()
+    window = timedelta(seconds=max(settings.SMS_DIGEST_WINDOW_SECONDS, 0))
+    due = list(
+        DigestItem.objects.values('recipient_id').annotate(
+            first=Min('created_at'),
+            count=Count('id')
+        ).filter(
+            Q(first__lte=now - window) | Q(count__gte=settings.SMS_DIGEST_MAX_ITEMS)
+        ).order_by('first').values_list('recipient_id', flat=True)[:limit]
+    )
+    if not due:
+        return 0, 0
+
+    with transaction.atomic():
+        items = list(
+            DigestItem.objects.select_for_update(skip_locked=True, of=('self',)).select_related(
+                'recipient'
+            ).filter(recipient_id__in=due).order_by('id')
+        )
+        by_recipient = {}
+        for item in items:
+            by_recipient.setdefault(item.recipient_id, []).append(item)
+
+        SMSNotification.objects.bulk_create([
+            SMSNotification(
+                recipient=group[0].recipient,
+                phone_number=group[0].recipient.phone_number,
+                message=digest_message(group[0].recipient, group),
+                status='PENDING'
+            )
+            for group in by_recipient.values()
+        ])
+        DigestItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+    return len(by_recipient), len(items)
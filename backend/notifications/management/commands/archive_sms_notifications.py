@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications.archive import archive_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        'Move whole months of SMS notifications older than the retention window into '
+        'compressed NDJSON archives under SMS_ARCHIVE_ROOT. Schedule monthly; re-running '
+        'is safe and resumes an interrupted run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, default=settings.SMS_RETENTION_MONTHS)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        moved = archive_notifications(
+            retention_months=options['retention_months'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            stdout=self.stdout if options['verbosity'] > 1 else None
+        )
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} SMS notifications to archives'))
@@ -0,0 +1,94 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.metrics import LatencyStats
+from notifications.models import SMSNotification
+
+
+FAILURE_REASONS = ['DeliveryFailure', 'AbsentSubscriber', 'InsufficientCredit', 'UserInBlacklist', 'UserDoesNotExist']
+INTERMEDIATE_STATUSES = ['Sent', 'Submitted', 'Buffered']
+
+
+class Command(BaseCommand):
+    help = (
+        'Stand-in for the SMS provider: POST realistic delivery report callbacks for sent '
+        'messages to the webhook, at a given rate, and report how the endpoint kept up.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/notifications/sms/delivery-reports/')
+        parser.add_argument('--token', default=settings.SMS_CALLBACK_TOKEN)
+        parser.add_argument('--count', type=int, default=1000, help='Messages to report on (most recent sent first)')
+        parser.add_argument('--rate', type=float, default=3000, help='Callbacks per minute; 0 sends as fast as possible')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--failure-rate', type=float, default=0.05)
+        parser.add_argument('--intermediate-rate', type=float, default=0.5, help='Share of messages with a Sent/Buffered report first')
+        parser.add_argument('--late-rate', type=float, default=0.05, help='Share of intermediate reports arriving after the final one')
+        parser.add_argument('--duplicate-rate', type=float, default=0.02)
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        if not options['token']:
+            raise CommandError('Set SMS_CALLBACK_TOKEN or pass --token')
+        rng = random.Random(options['seed'])
+
+        messages = SMSNotification.objects.filter(
+            status='SENT',
+            external_id__isnull=False
+        ).order_by('-id').values_list('external_id', 'phone_number')[:options['count']]
+
+        # (offset in seconds after the message was sent, callback form data)
+        events = []
+        for external_id, phone_number in messages:
+            report = {'id': external_id, 'phoneNumber': phone_number, 'networkCode': '63902', 'retryCount': 0}
+            delivered_after = rng.expovariate(1 / 5)
+            if rng.random() < options['failure_rate']:
+                final = {**report, 'status': 'Failed', 'failureReason': rng.choice(FAILURE_REASONS)}
+            else:
+                final = {**report, 'status': 'Success'}
+            events.append((delivered_after, final))
+            if rng.random() < options['duplicate_rate']:
+                events.append((delivered_after + rng.uniform(0, 30), final))
+            if rng.random() < options['intermediate_rate']:
+                offset = delivered_after + rng.uniform(0, 10) if rng.random() < options['late_rate'] else rng.uniform(0, delivered_after)
+                events.append((offset, {**report, 'status': rng.choice(INTERMEDIATE_STATUSES)}))
+        if not events:
+            raise CommandError('No sent messages with a provider id to report on')
+        events.sort(key=lambda event: event[0])
+
+        session = requests.Session()
+        session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=options['concurrency']))
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=options['concurrency']))
+        latency = LatencyStats(window=len(events))
+
+        def post(data):
+            started = time.perf_counter()
+            try:
+                response = session.post(options['url'], params={'token': options['token']}, data=data, timeout=10)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            latency.record(time.perf_counter() - started, ok)
+
+        interval = 60 / options['rate'] if options['rate'] else 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for index, (_, data) in enumerate(events):
+                if interval:
+                    delay = started + index * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                executor.submit(post, data)
+        elapsed = time.perf_counter() - started
+
+        stats = latency.snapshot()
+        self.stdout.write(
+            f'Posted {stats["calls"]} callbacks for {len(messages)} messages in {elapsed:.1f}s '
+            f'({stats["calls"] / elapsed * 60:.0f}/min), {stats["errors"]} errors'
+        )
+        self.stdout.write(f'Callback latency: {stats}')
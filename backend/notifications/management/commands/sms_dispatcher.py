@@ -0,0 +1,74 @@
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.backends import get_sms_backend
+from notifications.delivery import apply_delivery_reports
+from notifications.digests import flush_digests
+from notifications.metrics import provider_latency
+from notifications.outbox import dispatch_due
+from notifications.ratelimit import rate_limit_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Flush due notification digests, send queued SMS notifications from the outbox and '
+        'apply buffered delivery reports. Runs until stopped (SIGTERM/SIGINT finish the '
+        'current batch first); several dispatchers may run at once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due messages once and exit')
+        parser.add_argument('--concurrency', type=int, default=8, help='Provider requests in flight at once')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--max-attempts', type=int, default=settings.SMS_MAX_ATTEMPTS)
+        parser.add_argument('--report-batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        backend = get_sms_backend()
+        verbose = options['verbosity'] > 1
+        total_claimed = total_sent = total_reports = 0
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='sms-dispatch') as executor:
+            while not stop.is_set():
+                close_old_connections()
+                members, merged = flush_digests()
+                if members and verbose:
+                    self.stdout.write(f'Merged {merged} notices into {members} digests')
+                claimed, sent = dispatch_due(
+                    backend,
+                    batch_size=options['batch_size'],
+                    executor=executor,
+                    max_attempts=options['max_attempts']
+                )
+                reports, updated = apply_delivery_reports(batch_size=options['report_batch_size'])
+                total_claimed += claimed
+                total_sent += sent
+                total_reports += reports
+                if claimed and verbose:
+                    self.stdout.write(f'Sent {sent} of {claimed} messages; provider latency {provider_latency.snapshot()}')
+                if reports and verbose:
+                    self.stdout.write(f'Applied {reports} delivery reports to {updated} messages')
+                if claimed < options['batch_size'] and reports < options['report_batch_size']:
+                    if options['once']:
+                        break
+                    stop.wait(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {total_sent} of {total_claimed} messages, applied {total_reports} delivery reports'
+        ))
+        if provider_latency.calls:
+            self.stdout.write(f'Provider latency: {provider_latency.snapshot()}')
+        for bucket in rate_limit_stats():
+            self.stdout.write(
+                f"Rate limit {bucket['key']}: {bucket['granted']} admitted, {bucket['waited']} waited, "
+                f"{bucket['deferred']} deferred"
+            )
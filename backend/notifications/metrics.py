@@ -0,0 +1,57 @@
+"""
+In-process latency statistics for SMS provider calls.
+
+Each process (gunicorn worker, sms_dispatcher) keeps its own figures, taken
+over a window of the most recent calls.
+"""
+
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """Thread-safe call counts and latency percentiles over the last `window` calls"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self._samples.append(seconds)
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.calls = 0
+            self.errors = 0
+
+    def snapshot(self):
+        """Totals since start (or reset) and millisecond latencies of the recent window"""
+        with self._lock:
+            samples = sorted(self._samples)
+            calls, errors = self.calls, self.errors
+        if not samples:
+            return {'calls': calls, 'errors': errors, 'window': 0}
+
+        def percentile(fraction):
+            return round(samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000, 1)
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'window': len(samples),
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 1),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(samples[-1] * 1000, 1),
+        }
+
+
+provider_latency = LatencyStats()
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_sms_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsnotification',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='smsnotification',
+            name='delivery_status',
+            field=models.CharField(blank=True, max_length=30, null=True),
+        ),
+        migrations.AddField(
+            model_name='smsnotification',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='external_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('DELIVERED', 'Delivered'), ('FAILED', 'Failed')], default='PENDING', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='SMSDeliveryReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=30)),
+                ('failure_reason', models.CharField(blank=True, max_length=100)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('retry_after', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'SMS Delivery Report',
+                'verbose_name_plural': 'SMS Delivery Reports',
+                'db_table': 'sms_delivery_reports',
+                'indexes': [models.Index(fields=['retry_after'], name='sms_deliver_retry_a_d747ba_idx')],
+            },
+        ),
+    ]
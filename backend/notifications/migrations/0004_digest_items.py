@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_delivery_reports'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('VERIFIED', 'Verified'), ('REJECTED', 'Rejected')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('contribution_type', models.CharField(max_length=50)),
+                ('transaction_code', models.CharField(max_length=20)),
+                ('rejection_reason', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Digest Item',
+                'verbose_name_plural': 'Digest Items',
+                'db_table': 'notification_digest_items',
+                'indexes': [models.Index(fields=['recipient', 'created_at'], name='notificatio_recipie_79ba30_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_digest_items'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the archived month', unique=True)),
+                ('path', models.CharField(help_text='Relative to SMS_ARCHIVE_ROOT', max_length=255)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('recipient_offsets', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'SMS Archive',
+                'verbose_name_plural': 'SMS Archives',
+                'db_table': 'sms_notification_archives',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='smsnotification',
+            index=models.Index(fields=['-created_at'], name='sms_notific_created_cb6041_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smsnotification',
+            index=models.Index(fields=['recipient', '-created_at'], name='sms_notific_recipie_f4530d_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_sms_archives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSRateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.DateTimeField()),
+                ('granted', models.BigIntegerField(default=0, help_text='Messages admitted')),
+                ('waited', models.BigIntegerField(default=0, help_text='Sends that had to wait for tokens')),
+                ('deferred', models.BigIntegerField(default=0, help_text='Messages put back in the outbox for later')),
+            ],
+            options={
+                'verbose_name': 'SMS Rate Limit Bucket',
+                'verbose_name_plural': 'SMS Rate Limit Buckets',
+                'db_table': 'sms_rate_limit_buckets',
+            },
+        ),
+    ]
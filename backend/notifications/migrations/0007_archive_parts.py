@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_rate_limit'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='smsarchive',
+            options={'ordering': ['-month', 'part'], 'verbose_name': 'SMS Archive', 'verbose_name_plural': 'SMS Archives'},
+        ),
+        migrations.AddField(
+            model_name='smsarchive',
+            name='part',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='smsarchive',
+            name='purged',
+            field=models.BooleanField(default=False, help_text='Archived rows deleted from sms_notifications'),
+        ),
+        migrations.AlterField(
+            model_name='smsarchive',
+            name='month',
+            field=models.DateField(help_text='First day of the archived month'),
+        ),
+        migrations.AddConstraint(
+            model_name='smsarchive',
+            constraint=models.UniqueConstraint(fields=('month', 'part'), name='sms_archive_month_part_unique'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_archive_parts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='smsnotification',
+            name='sms_notific_recipie_f4530d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='smsnotification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='sms_notific_recipie_6d5d14_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 class SMSNotification(models.Model):
@@ -8,6 +10,7 @@ class SMSNotification(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
         ('SENT', 'Sent'),
+        ('DELIVERED', 'Delivered'),
         ('FAILED', 'Failed'),
     ]
     
@@ -26,19 +29,139 @@ class SMSNotification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     # External service response
-    external_id = models.CharField(max_length=100, blank=True, null=True)
+    external_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     error_message = models.TextField(blank=True, null=True)
     
+    # Delivery reports: the provider's latest status and when the message reached its final state
+    delivery_status = models.CharField(max_length=30, blank=True, null=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Outbox delivery: the dispatcher sends PENDING rows once next_attempt_at has passed
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    
     class Meta:
         db_table = 'sms_notifications'
         verbose_name = 'SMS Notification'
         verbose_name_plural = 'SMS Notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['-created_at']),
+            # Trailing -id keeps the cursor-paged history stable when timestamps tie
+            models.Index(fields=['recipient', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f"SMS to {self.phone_number} - {self.status}"
 
 
+class SMSRateLimitBucket(models.Model):
+    """Shared token bucket for one sender ID, coordinating every process that sends SMS"""
+    
+    key = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+    
+    # Running totals, for metrics
+    granted = models.BigIntegerField(default=0, help_text="Messages admitted")
+    waited = models.BigIntegerField(default=0, help_text="Sends that had to wait for tokens")
+    deferred = models.BigIntegerField(default=0, help_text="Messages put back in the outbox for later")
+    
+    class Meta:
+        db_table = 'sms_rate_limit_buckets'
+        verbose_name = 'SMS Rate Limit Bucket'
+        verbose_name_plural = 'SMS Rate Limit Buckets'
+    
+    def __str__(self):
+        return f"Rate limit for {self.key}"
+
+
+class SMSArchive(models.Model):
+    """A month of SMS notifications moved out of sms_notifications into a compressed NDJSON file"""
+    
+    month = models.DateField(help_text="First day of the archived month")
+    # Rows that settle after their month was archived go into further parts
+    part = models.PositiveSmallIntegerField(default=0)
+    path = models.CharField(max_length=255, help_text="Relative to SMS_ARCHIVE_ROOT")
+    row_count = models.PositiveIntegerField(default=0)
+    purged = models.BooleanField(default=False, help_text="Archived rows deleted from sms_notifications")
+    
+    # recipient id -> [byte offset, byte length, rows] of that recipient's gzip member
+    recipient_offsets = models.JSONField(default=dict)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'sms_notification_archives'
+        verbose_name = 'SMS Archive'
+        verbose_name_plural = 'SMS Archives'
+        ordering = ['-month', 'part']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'part'], name='sms_archive_month_part_unique'),
+        ]
+    
+    def __str__(self):
+        suffix = f" part {self.part}" if self.part else ""
+        return f"SMS archive {self.month:%Y-%m}{suffix} ({self.row_count} messages)"
+
+
+class SMSDeliveryReport(models.Model):
+    """Provider delivery callbacks waiting to be applied to their SMSNotification"""
+    
+    external_id = models.CharField(max_length=100)
+    status = models.CharField(max_length=30)
+    failure_reason = models.CharField(max_length=100, blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+    
+    # Reports that arrive before the send is recorded are retried until they match
+    retry_after = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'sms_delivery_reports'
+        verbose_name = 'SMS Delivery Report'
+        verbose_name_plural = 'SMS Delivery Reports'
+        indexes = [
+            models.Index(fields=['retry_after']),
+        ]
+    
+    def __str__(self):
+        return f"{self.external_id} - {self.status}"
+
+
+class DigestItem(models.Model):
+    """A contribution notification held back to be merged into the member's next digest SMS"""
+    
+    KIND_CHOICES = [
+        ('VERIFIED', 'Verified'),
+        ('REJECTED', 'Rejected'),
+    ]
+    
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='digest_items'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    contribution_type = models.CharField(max_length=50)
+    transaction_code = models.CharField(max_length=20)
+    rejection_reason = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'notification_digest_items'
+        verbose_name = 'Digest Item'
+        verbose_name_plural = 'Digest Items'
+        indexes = [
+            models.Index(fields=['recipient', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.amount} for {self.recipient_id}"
+
+
 class NotificationTemplate(models.Model):
     """Reusable notification templates"""
     
@@ -56,4 +179,12 @@ class NotificationTemplate(models.Model):
         verbose_name_plural = 'Notification Templates'
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+    
+    def clean(self):
+        from .templating import CompiledTemplate, TemplateError
+        
+        try:
+            CompiledTemplate(self.name, self.template_text)
+        except TemplateError as e:
+            raise ValidationError({'template_text': str(e)})
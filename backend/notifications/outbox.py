@@ -0,0 +1,227 @@
+"""
+Transactional SMS outbox.
+
+Messages are queued as PENDING SMSNotification rows inside the caller's
+database transaction, so an SMS exists if and only if the change it reports
+was committed. The sms_dispatcher command drains the outbox: it claims due
+rows with SELECT ... FOR UPDATE SKIP LOCKED (so several dispatchers can run
+side by side), sends them through the configured backend with bounded
+concurrency, and records the outcome. Retryable failures are rescheduled with
+exponential backoff until settings.SMS_MAX_ATTEMPTS is reached.
+"""
+
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .backends import SendResult
+from .models import SMSNotification
+from .ratelimit import get_rate_limiter
+
+
+# How long a claimed row stays invisible to other dispatchers; a dispatcher
+# that dies mid-batch leaves its rows to be picked up again after this
+LEASE = timedelta(minutes=5)
+
+# Upper bound on the retry delay
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def queue_sms(recipient, message):
+    """Add a message to the outbox; it is sent once the surrounding transaction commits"""
+    return SMSNotification.objects.create(
+        recipient=recipient,
+        phone_number=recipient.phone_number,
+        message=message,
+        status='PENDING'
+    )
+
+
+def create_leased(items, lease=LEASE, batch_size=1000):
+    """
+    Insert PENDING notifications already leased to the caller, for immediate sending
+
+    If the caller dies before recording the outcome, the dispatcher picks the
+    rows up once the lease runs out.
+
+    Args:
+        items: Iterable of (recipient, message) pairs
+    """
+    next_attempt_at = timezone.now() + lease
+    return SMSNotification.objects.bulk_create(
+        [
+            SMSNotification(
+                recipient=recipient,
+                phone_number=recipient.phone_number,
+                message=message,
+                status='PENDING',
+                attempts=1,
+                next_attempt_at=next_attempt_at
+            )
+            for recipient, message in items
+        ],
+        batch_size=batch_size
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter after the given number of attempts"""
+    delay = min(settings.SMS_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_RETRY_DELAY.total_seconds())
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim_due(batch_size, lease=LEASE):
+    """
+    Lease up to batch_size due PENDING notifications to this dispatcher
+
+    Returns:
+        List of SMSNotification instances with `attempts` already counting this attempt
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            SMSNotification.objects.select_for_update(skip_locked=True).filter(
+                status='PENDING',
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'id').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        SMSNotification.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + lease
+        )
+        return list(SMSNotification.objects.filter(pk__in=ids).order_by('next_attempt_at', 'id'))
+
+
+def apply_result(notification, result, max_attempts=None):
+    """Set a notification's status fields from a send result (without saving)"""
+    max_attempts = max_attempts or settings.SMS_MAX_ATTEMPTS
+    now = timezone.now()
+    if result.throttled:
+        # Not the message's fault: back to the outbox without using up an attempt
+        notification.status = 'PENDING'
+        notification.attempts = max(notification.attempts - 1, 0)
+        notification.next_attempt_at = now + timedelta(seconds=result.retry_in)
+        notification.error_message = result.error
+    elif result.success:
+        notification.status = 'SENT'
+        notification.sent_at = now
+        notification.external_id = result.external_id
+        notification.error_message = None
+    elif result.retryable and notification.attempts < max_attempts:
+        notification.status = 'PENDING'
+        notification.next_attempt_at = now + retry_delay(notification.attempts)
+        notification.error_message = result.error
+    else:
+        notification.status = 'FAILED'
+        notification.error_message = result.error
+    return notification
+
+
+def _send_batch(backend, phone_numbers, message):
+    try:
+        return backend.send_batch(phone_numbers, message)
+    except Exception as e:
+        return [SendResult(success=False, error=str(e))] * len(phone_numbers)
+
+
+def batches(notifications, batch_size):
+    """Group notifications with identical text into chunks of at most batch_size recipients"""
+    by_message = {}
+    for notification in notifications:
+        by_message.setdefault(notification.message, []).append(notification)
+    for message, group in by_message.items():
+        for start in range(0, len(group), batch_size):
+            yield message, group[start:start + batch_size]
+
+
+def deliver(notifications, backend, executor=None, max_attempts=None, batch_size=1000):
+    """
+    Send leased notifications and save their outcomes with bulk updates
+
+    Recipients of the same text share multi-recipient provider requests of up
+    to the backend's batch size. Each request first takes its recipients'
+    tokens from the shared rate limiter; once the limiter asks to wait longer
+    than SMS_RATE_LIMIT_MAX_WAIT, the remaining requests are deferred.
+    Requests run on the executor's threads when one is given; rate limiting
+    and database writes stay on the calling thread.
+
+    Returns:
+        Number of notifications sent successfully
+    """
+    if not notifications:
+        return 0
+    chunks = list(batches(notifications, max(1, getattr(backend, 'max_batch_size', 1))))
+    limiter = get_rate_limiter()
+
+    def send(chunk):
+        message, group = chunk
+        return _send_batch(backend, [notification.phone_number for notification in group], message)
+
+    responses = []
+    deferred = None
+    deferred_count = 0
+    for chunk in chunks:
+        group = chunk[1]
+        if limiter is not None and deferred is None:
+            delay = limiter.acquire(len(group))
+            if delay:
+                deferred = SendResult(success=False, error='Rate limited', throttled=True, retry_in=delay)
+        if deferred is not None:
+            responses.append([deferred] * len(group))
+            deferred_count += len(group)
+        elif executor is None:
+            responses.append(send(chunk))
+        else:
+            responses.append(executor.submit(send, chunk))
+    if deferred_count:
+        limiter.record_deferred(deferred_count)
+
+    sent = 0
+    for (_, group), response in zip(chunks, responses):
+        results = response if isinstance(response, list) else response.result()
+        for notification, result in zip(group, results):
+            apply_result(notification, result, max_attempts)
+            sent += result.success
+    SMSNotification.objects.bulk_update(
+        notifications,
+        ['status', 'sent_at', 'external_id', 'error_message', 'next_attempt_at', 'attempts'],
+        batch_size=batch_size
+    )
+    return sent
+
+
+def dispatch_due(backend, batch_size=100, executor=None, max_attempts=None):
+    """
+    Claim and send one batch of due notifications
+
+    Returns:
+        (claimed, sent) counts
+    """
+    notifications = claim_due(batch_size)
+    return len(notifications), deliver(notifications, backend, executor, max_attempts)
+
+
+def send_now(notification, backend):
+    """
+    Send one notification synchronously, bypassing the dispatcher
+
+    If the rate limiter cannot admit it soon enough, it is left PENDING for
+    the dispatcher instead.
+    """
+    notification.attempts += 1
+    limiter = get_rate_limiter()
+    delay = limiter.acquire(1) if limiter is not None else 0
+    if delay:
+        limiter.record_deferred(1)
+        result = SendResult(success=False, error='Rate limited', throttled=True, retry_in=delay)
+    else:
+        result = _send_batch(backend, [notification.phone_number], notification.message)[0]
+    apply_result(notification, result, max_attempts=1)
+    notification.save(update_fields=['status', 'sent_at', 'external_id', 'error_message', 'attempts', 'next_attempt_at'])
+    return notification
@@ -0,0 +1,48 @@
+"""
+Member notification preferences.
+
+Preferences live in settings.UserSettings; members without a settings row
+get the defaults, which allow everything. Opt-outs for a whole fan-out are
+read in one query.
+"""
+
+from django.db.models import Q
+
+from settings.models import UserSettings
+
+
+# Notification categories and the UserSettings flag that controls each
+CATEGORY_FIELDS = {
+    'contributions': 'notify_contributions',
+    'approvals': 'notify_approvals',
+    'reports': 'notify_reports',
+    'updates': 'notify_updates',
+}
+
+# Above this many recipients, fetch every opt-out instead of sending a long IN list
+IN_LIST_LIMIT = 1000
+
+
+def sms_opted_out(category, user_ids=None):
+    """
+    Ids of users who do not want SMS notifications of a category
+
+    Args:
+        category: Key of CATEGORY_FIELDS
+        user_ids: Recipients to check, or None for all users
+    """
+    if category not in CATEGORY_FIELDS:
+        raise ValueError(f"Unknown notification category '{category}'")
+    queryset = UserSettings.objects.filter(Q(sms_notifications=False) | Q(**{CATEGORY_FIELDS[category]: False}))
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        if not user_ids:
+            return set()
+        if len(user_ids) <= IN_LIST_LIMIT:
+            queryset = queryset.filter(user_id__in=user_ids)
+    opted_out = set(queryset.values_list('user_id', flat=True))
+    return opted_out if user_ids is None else opted_out & user_ids
+
+
+def wants_sms(user, category):
+    return user.pk not in sms_opted_out(category, [user.pk])
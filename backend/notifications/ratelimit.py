@@ -0,0 +1,145 @@
+"""
+Shared SMS rate limiting.
+
+Africa's Talking throttles per sender ID, so every process that sends
+(gunicorn workers, sms_dispatcher) draws from one token bucket per sender,
+stored in an SMSRateLimitBucket row and updated under a row lock. Each
+message costs one token; the bucket refills at SMS_RATE_LIMIT_PER_SECOND up
+to SMS_RATE_LIMIT_BURST. A multi-recipient request larger than the burst is
+admitted once the bucket is full and leaves it in debt, so later senders wait
+until it has refilled.
+
+Senders wait for tokens up to SMS_RATE_LIMIT_MAX_WAIT seconds; past that the
+messages go back to the outbox with their next attempt set to when tokens
+will be available, instead of failing.
+
+The bucket row is only ever locked by a short transaction of its own, never
+while sleeping. A caller already inside a transaction (send_now from a
+request) has the bucket updated on a separate connection, so the lock is not
+held until that request commits, and is never made to sleep: if tokens are
+not available right away its messages are deferred to the dispatcher.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SMSRateLimitBucket
+
+
+def _outside_transaction(function, *args):
+    """
+    Run function in its own transaction, even when called inside one
+
+    Inside an atomic block the call runs on a worker thread, which has its
+    own database connection. SQLite has no row locks and admits a single
+    writer, so there it runs in the caller's transaction instead.
+    """
+    if not connection.in_atomic_block or not connection.features.has_select_for_update:
+        return function(*args)
+
+    def run():
+        try:
+            return function(*args)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run).result()
+
+
+class TokenBucket:
+    """A token bucket kept in the database, shared by every process"""
+
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    def _bucket(self):
+        try:
+            return SMSRateLimitBucket.objects.select_for_update().get(key=self.key)
+        except SMSRateLimitBucket.DoesNotExist:
+            try:
+                with transaction.atomic():
+                    SMSRateLimitBucket.objects.create(key=self.key, tokens=self.capacity, updated_at=timezone.now())
+            except IntegrityError:
+                pass
+            return SMSRateLimitBucket.objects.select_for_update().get(key=self.key)
+
+    def take(self, count, waited=False):
+        """
+        Try to take `count` tokens, in a transaction of its own
+
+        Returns:
+            0 if they were taken, otherwise the seconds until they will be available
+        """
+        return _outside_transaction(self._take, count, waited)
+
+    def _take(self, count, waited):
+        with transaction.atomic():
+            bucket = self._bucket()
+            now = timezone.now()
+            elapsed = max((now - bucket.updated_at).total_seconds(), 0)
+            tokens = min(self.capacity, bucket.tokens + elapsed * self.rate)
+            needed = min(count, self.capacity)
+            if tokens < needed:
+                return (needed - tokens) / self.rate
+            SMSRateLimitBucket.objects.filter(pk=bucket.pk).update(
+                tokens=tokens - count,
+                updated_at=now,
+                granted=F('granted') + count,
+                waited=F('waited') + int(waited)
+            )
+            return 0
+
+    def acquire(self, count, max_wait=None):
+        """
+        Take `count` tokens, sleeping for up to max_wait seconds in total
+
+        Inside a transaction there is no waiting at all, since anything the
+        caller has written stays locked while it sleeps.
+
+        Returns:
+            0 once the tokens are taken, or the seconds the caller should
+            defer by if they would take longer than max_wait to come
+        """
+        max_wait = settings.SMS_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        if connection.in_atomic_block:
+            max_wait = 0
+        deadline = time.monotonic() + max_wait
+        waited = False
+        while True:
+            delay = self.take(count, waited)
+            if not delay:
+                return 0
+            if time.monotonic() + delay > deadline:
+                return delay
+            time.sleep(delay)
+            waited = True
+
+    def record_deferred(self, count):
+        _outside_transaction(self._record_deferred, count)
+
+    def _record_deferred(self, count):
+        SMSRateLimitBucket.objects.filter(key=self.key).update(deferred=F('deferred') + count)
+
+
+def get_rate_limiter():
+    """The bucket for the configured sender ID, or None when rate limiting is off"""
+    if settings.SMS_RATE_LIMIT_PER_SECOND <= 0:
+        return None
+    return TokenBucket(
+        settings.AT_SENDER_ID,
+        settings.SMS_RATE_LIMIT_PER_SECOND,
+        max(settings.SMS_RATE_LIMIT_BURST, 1)
+    )
+
+
+def rate_limit_stats():
+    """Totals of every bucket: messages admitted, sends that waited, messages deferred"""
+    return list(SMSRateLimitBucket.objects.values('key', 'tokens', 'granted', 'waited', 'deferred'))
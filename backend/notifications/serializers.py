@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+
+class DeliveryReportSerializer(serializers.Serializer):
+    """Africa's Talking delivery report callback (form fields as sent by the provider)"""
+    
+    id = serializers.CharField(max_length=100)
+    status = serializers.CharField(max_length=30)
+    failureReason = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+
+class SMSHistoryQuerySerializer(serializers.Serializer):
+    """Query parameters for a member's SMS history"""
+    
+    recipient = serializers.IntegerField(required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
@@ -1,19 +1,97 @@
-import africastalking
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
-from django.utils import timezone
+
+from .backends import get_sms_backend
+from .digests import queue_contribution_notifications
 from .models import SMSNotification
+from .outbox import create_leased, deliver, queue_sms, send_now
+from .preferences import sms_opted_out, wants_sms
+from .templating import get_template, member_context, render_template
+
+
+def contribution_context(contribution):
+    return {
+        **member_context(contribution.member),
+        'amount': contribution.amount,
+        'contribution_type': contribution.contribution_type.name,
+        'transaction_code': contribution.mpesa_transaction_code,
+        'rejection_reason': contribution.rejection_reason,
+    }
+
+
+def contribution_verified_message(contribution):
+    return render_template('contribution_verified', contribution_context(contribution))
+
+
+def contribution_rejected_message(contribution):
+    return render_template('contribution_rejected', contribution_context(contribution))
+
+
+def build_messages(recipients, template_name, category, context=None, recipient_context=None):
+    """
+    Render a template for every recipient who accepts SMS of the category
+    
+    Opt-outs are read in one query and the template is compiled once.
+    
+    Args:
+        recipients: User objects
+        template_name: NotificationTemplate name
+        category: Notification category (see preferences.CATEGORY_FIELDS)
+        context: Placeholders shared by all recipients
+        recipient_context: Optional callable returning extra placeholders for one recipient
+    
+    Returns:
+        List of (User, message) pairs
+    """
+    recipients = list(recipients)
+    opted_out = sms_opted_out(category, [recipient.pk for recipient in recipients])
+    template = get_template(template_name)
+    messages = []
+    for recipient in recipients:
+        if recipient.pk in opted_out:
+            continue
+        values = {**member_context(recipient), **(context or {})}
+        if recipient_context is not None:
+            values.update(recipient_context(recipient))
+        messages.append((recipient, template.render(values)))
+    return messages
 
 
 class SMSService:
-    """Service for sending SMS notifications via Africa's Talking"""
+    """
+    Service for SMS notifications
     
-    def __init__(self):
-        # Initialize Africa's Talking
-        africastalking.initialize(
-            username=settings.AT_USERNAME,
-            api_key=settings.AT_API_KEY
-        )
-        self.sms = africastalking.SMS
+    queue_* methods write to the outbox (contribution notices via the
+    per-member digest) and return immediately; the sms_dispatcher command
+    sends the messages. send_* methods call the provider synchronously.
+    Contribution notifications are rendered from templates and skipped for
+    members who opted out.
+    """
+    
+    def __init__(self, backend=None):
+        self._backend = backend
+    
+    @property
+    def backend(self):
+        # Looked up on first use so queueing never touches the provider client
+        if self._backend is None:
+            self._backend = get_sms_backend()
+        return self._backend
+    
+    def queue_sms(self, recipient_user, message):
+        """Queue an SMS in the outbox as part of the current transaction"""
+        return queue_sms(recipient_user, message)
+    
+    def queue_contribution_notifications(self, contributions):
+        """Queue verified/rejected notices, merged per member into digests (see digests.py)"""
+        return queue_contribution_notifications(contributions)
+    
+    def queue_contribution_verified_sms(self, contribution):
+        return self.queue_contribution_notifications([contribution])
+    
+    def queue_contribution_rejected_sms(self, contribution):
+        return self.queue_contribution_notifications([contribution])
     
     def send_sms(self, recipient_user, message):
         """
@@ -26,65 +104,44 @@ class SMSService:
         Returns:
             SMSNotification object
         """
-        # Create notification record
         notification = SMSNotification.objects.create(
             recipient=recipient_user,
             phone_number=recipient_user.phone_number,
             message=message,
             status='PENDING'
         )
-        
-        try:
-            # Send SMS via Africa's Talking
-            response = self.sms.send(
-                message=message,
-                recipients=[recipient_user.phone_number],
-                sender_id=settings.AT_SENDER_ID
-            )
-            
-            # Update notification status
-            if response['SMSMessageData']['Recipients']:
-                recipient_data = response['SMSMessageData']['Recipients'][0]
-                
-                if recipient_data['status'] == 'Success':
-                    notification.status = 'SENT'
-                    notification.sent_at = timezone.now()
-                    notification.external_id = recipient_data.get('messageId', '')
-                else:
-                    notification.status = 'FAILED'
-                    notification.error_message = recipient_data.get('status', 'Unknown error')
-            else:
-                notification.status = 'FAILED'
-                notification.error_message = 'No recipients in response'
-                
-        except Exception as e:
-            notification.status = 'FAILED'
-            notification.error_message = str(e)
-        
-        notification.save()
-        return notification
+        return send_now(notification, self.backend)
     
     def send_contribution_verified_sms(self, contribution):
         """Send SMS notification when contribution is verified"""
-        message = (
-            f"Dear {contribution.member.first_name}, "
-            f"your contribution of KES {contribution.amount} "
-            f"for {contribution.contribution_type.name} has been verified. "
-            f"Transaction: {contribution.mpesa_transaction_code}. "
-            f"Thank you!"
-        )
-        return self.send_sms(contribution.member, message)
+        if wants_sms(contribution.member, 'contributions'):
+            return self.send_sms(contribution.member, contribution_verified_message(contribution))
     
     def send_contribution_rejected_sms(self, contribution):
         """Send SMS notification when contribution is rejected"""
-        message = (
-            f"Dear {contribution.member.first_name}, "
-            f"your contribution of KES {contribution.amount} "
-            f"for {contribution.contribution_type.name} has been rejected. "
-            f"Reason: {contribution.rejection_reason}. "
-            f"Please contact admin for more details."
-        )
-        return self.send_sms(contribution.member, message)
+        if wants_sms(contribution.member, 'contributions'):
+            return self.send_sms(contribution.member, contribution_rejected_message(contribution))
+    
+    def send_bulk_messages(self, items, concurrency=None):
+        """
+        Send many messages at once
+        
+        Notification rows are bulk-inserted, recipients of identical text share
+        multi-recipient provider requests, and those requests run in parallel.
+        Retryable failures stay queued for the sms_dispatcher command.
+        
+        Args:
+            items: Iterable of (User, message) pairs
+            concurrency: Provider requests in flight at once
+        
+        Returns:
+            List of SMSNotification objects
+        """
+        notifications = create_leased(items)
+        workers = concurrency or settings.SMS_BULK_CONCURRENCY
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sms-bulk') as executor:
+            deliver(notifications, self.backend, executor)
+        return notifications
     
     def send_bulk_sms(self, recipients, message):
         """
@@ -97,8 +154,17 @@ class SMSService:
         Returns:
             List of SMSNotification objects
         """
-        notifications = []
-        for recipient in recipients:
-            notification = self.send_sms(recipient, message)
-            notifications.append(notification)
-        return notifications
\ No newline at end of file
+        return self.send_bulk_messages((recipient, message) for recipient in recipients)
+    
+    def send_templated_bulk(self, recipients, template_name, category, context=None, recipient_context=None):
+        """
+        Render a template for each recipient and send it, skipping members who opted out
+        
+        See build_messages for the arguments.
+        
+        Returns:
+            List of SMSNotification objects
+        """
+        return self.send_bulk_messages(
+            build_messages(recipients, template_name, category, context, recipient_context)
+        )
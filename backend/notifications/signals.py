@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import NotificationTemplate
+from .templating import invalidate_templates
+
+
+@receiver(post_save, sender=NotificationTemplate)
+@receiver(post_delete, sender=NotificationTemplate)
+def template_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_templates)
@@ -0,0 +1,137 @@
+"""
+Compiled notification templates.
+
+NotificationTemplate.template_text uses str.format placeholders such as
+{first_name}. Each template is parsed once into literal and field parts, and
+the compiled form is kept in process memory. Saving or deleting a template
+swaps a generation token in the shared cache, so every process recompiles
+it on next use. Templates that have no active row fall back to the built-in
+texts in DEFAULT_TEMPLATES.
+"""
+
+import string
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .models import NotificationTemplate
+
+
+GENERATION_KEY = 'notifications:templates:generation'
+
+DEFAULT_TEMPLATES = {
+    'contribution_verified': (
+        'Dear {first_name}, your contribution of KES {amount} for {contribution_type} has been verified. '
+        'Transaction: {transaction_code}. Thank you!'
+    ),
+    'contribution_rejected': (
+        'Dear {first_name}, your contribution of KES {amount} for {contribution_type} has been rejected. '
+        'Reason: {rejection_reason}. Please contact admin for more details.'
+    ),
+    'contribution_digest': 'Dear {first_name}, {summary}. Log in to see the details.',
+}
+
+
+class TemplateError(ValueError):
+    """A template is missing, malformed or lacks a value for one of its placeholders"""
+
+
+class CompiledTemplate:
+    """A template parsed into (literal, field, conversion, format spec) parts"""
+
+    _formatter = string.Formatter()
+
+    def __init__(self, name, text):
+        self.name = name
+        try:
+            self.parts = [
+                (literal, field, conversion, spec)
+                for literal, field, spec, conversion in self._formatter.parse(text)
+            ]
+        except ValueError as e:
+            raise TemplateError(f"Template '{name}' is malformed: {e}")
+        # Plain names only: attribute and index lookups would expose object internals
+        if any(field is not None and not field.isidentifier() for _, field, _, _ in self.parts):
+            raise TemplateError(f"Template '{name}' must use plain named placeholders such as {{first_name}}")
+        self.fields = {field for _, field, _, _ in self.parts if field}
+
+    def render(self, context):
+        formatter = self._formatter
+        pieces = []
+        try:
+            for literal, field, conversion, spec in self.parts:
+                pieces.append(literal)
+                if field is None:
+                    continue
+                value = formatter.convert_field(context[field], conversion)
+                pieces.append(formatter.format_field(value, spec or ''))
+        except KeyError as e:
+            raise TemplateError(f"Template '{self.name}' has no value for {e}")
+        except ValueError as e:
+            raise TemplateError(f"Template '{self.name}' could not be rendered: {e}")
+        return ''.join(pieces)
+
+
+_compiled = {}
+_compiled_generation = None
+_lock = threading.Lock()
+
+
+def _current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(GENERATION_KEY, generation, timeout=None):
+            generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_templates():
+    """Make every process recompile templates on next use"""
+    global _compiled_generation
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+    with _lock:
+        _compiled.clear()
+        _compiled_generation = None
+
+
+def get_template(name):
+    """The compiled active template called `name`, or its built-in default"""
+    global _compiled_generation
+    generation = _current_generation()
+    with _lock:
+        if _compiled_generation != generation:
+            _compiled.clear()
+            _compiled_generation = generation
+        template = _compiled.get(name)
+    if template is not None:
+        return template
+
+    text = NotificationTemplate.objects.filter(name=name, is_active=True).values_list(
+        'template_text', flat=True
+    ).first()
+    if text is None:
+        text = DEFAULT_TEMPLATES.get(name)
+        if text is None:
+            raise TemplateError(f"No active notification template named '{name}'")
+
+    template = CompiledTemplate(name, text)
+    with _lock:
+        if _compiled_generation == generation:
+            _compiled[name] = template
+    return template
+
+
+def render_template(name, context):
+    return get_template(name).render(context)
+
+
+def member_context(user):
+    """Placeholders available in every template"""
+    return {
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'full_name': user.full_name,
+        'phone_number': user.phone_number,
+    }
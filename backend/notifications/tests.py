@@ -1,3 +1,636 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from contributions.models import Contribution, ContributionType
+from sacco_project.exports import export_stream
+from settings.models import UserSettings
+from . import archive
+from .archive import archive_cutoff, archive_notifications, notification_history, read_archived
+from .backends import AfricasTalkingBackend, FakeSMSBackend, get_sms_backend, reset_sms_backend
+from .delivery import ORPHAN_TTL, apply_delivery_reports, record_delivery_report
+from .digests import flush_digests, queue_contribution_notifications
+from .metrics import LatencyStats
+from .models import (
+    DigestItem, NotificationTemplate, SMSArchive, SMSDeliveryReport, SMSNotification, SMSRateLimitBucket
+)
+from .outbox import claim_due, dispatch_due, queue_sms, send_now
+from .preferences import sms_opted_out
+from .ratelimit import get_rate_limiter
+from .services import SMSService, build_messages
+from .templating import CompiledTemplate, TemplateError, get_template, invalidate_templates, render_template
+
+User = get_user_model()
+
+
+class SMSFixtures:
+    def make_fixtures(self):
+        self.backend = FakeSMSBackend()
+        self.backend.outbox = []
+        self.backend.fail_numbers = set()
+        self.backend.flaky_numbers = set()
+        self.members = [
+            User.objects.create_user(
+                phone_number=f'+25471100000{index}', password='pass12345', first_name='M', last_name=str(index)
+            )
+            for index in range(3)
+        ]
+        self.member = self.members[0]
+
+    def make_due(self):
+        SMSNotification.objects.filter(status='PENDING').update(next_attempt_at=timezone.now())
+
+
+@override_settings(SMS_RATE_LIMIT_PER_SECOND=0, SMS_RETRY_BASE_SECONDS=30)
+class OutboxTests(SMSFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+
+    def test_queued_message_is_sent_once(self):
+        notification = queue_sms(self.member, 'Welcome')
+
+        self.assertEqual(dispatch_due(self.backend), (1, 1))
+        self.assertEqual(dispatch_due(self.backend), (0, 0))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'SENT')
+        self.assertEqual(notification.attempts, 1)
+        self.assertTrue(notification.external_id)
+        self.assertEqual(len(self.backend.outbox), 1)
+
+    def test_claimed_rows_are_leased(self):
+        queue_sms(self.member, 'Welcome')
+
+        self.assertEqual(len(claim_due(10)), 1)
+        # A second dispatcher sees nothing until the lease runs out
+        self.assertEqual(claim_due(10), [])
+
+    def test_retryable_failure_is_rescheduled_then_sent(self):
+        self.backend.flaky_numbers = {self.member.phone_number}
+        notification = queue_sms(self.member, 'Welcome')
+
+        dispatch_due(self.backend)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'PENDING')
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(claim_due(10), [])
+
+        self.backend.flaky_numbers = set()
+        self.make_due()
+        dispatch_due(self.backend)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'SENT')
+        self.assertEqual(notification.attempts, 2)
+        self.assertIsNone(notification.error_message)
+
+    def test_retries_stop_at_max_attempts(self):
+        self.backend.flaky_numbers = {self.member.phone_number}
+        notification = queue_sms(self.member, 'Welcome')
+
+        for _ in range(2):
+            self.make_due()
+            dispatch_due(self.backend, max_attempts=2)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'FAILED')
+        self.assertEqual(notification.attempts, 2)
+
+    def test_permanent_failure_is_not_retried(self):
+        self.backend.fail_numbers = {self.member.phone_number}
+        notification = queue_sms(self.member, 'Welcome')
+
+        dispatch_due(self.backend)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'FAILED')
+        self.assertEqual(notification.error_message, 'InvalidPhoneNumber')
+
+
+class CountingBackend(FakeSMSBackend):
+    """Fake backend that records the recipients of every provider request"""
+
+    max_batch_size = 2
+
+    def __init__(self):
+        self.outbox = []
+        self.fail_numbers = set()
+        self.flaky_numbers = set()
+        self.requests = []
+
+    def send_batch(self, phone_numbers, message):
+        self.requests.append(list(phone_numbers))
+        return super().send_batch(phone_numbers, message)
+
+
+@override_settings(SMS_RATE_LIMIT_PER_SECOND=0)
+class BatchedSendTests(SMSFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        self.backend = CountingBackend()
+
+    def test_identical_texts_share_requests_up_to_the_batch_size(self):
+        notifications = SMSService(self.backend).send_bulk_sms(self.members, 'Meeting on Friday')
+
+        self.assertEqual(sorted(len(request) for request in self.backend.requests), [1, 2])
+        self.assertEqual({notification.status for notification in notifications}, {'SENT'})
+        self.assertEqual(SMSNotification.objects.filter(status='SENT', attempts=1).count(), 3)
+
+    def test_each_recipient_gets_its_own_outcome(self):
+        self.backend.fail_numbers = {self.members[1].phone_number}
+
+        SMSService(self.backend).send_bulk_messages((member, 'Hello') for member in self.members)
+
+        self.assertEqual(
+            list(SMSNotification.objects.order_by('recipient_id').values_list('status', flat=True)),
+            ['SENT', 'FAILED', 'SENT']
+        )
+
+    def test_dispatcher_groups_queued_messages_by_text(self):
+        for member in self.members:
+            queue_sms(member, 'Hello')
+        queue_sms(self.member, 'Reminder')
+
+        self.assertEqual(dispatch_due(self.backend), (4, 4))
+        self.assertEqual(sorted(len(request) for request in self.backend.requests), [1, 1, 2])
+
+
+@override_settings(SMS_BACKEND='notifications.backends.FakeSMSBackend')
+class ProviderClientTests(SMSFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        reset_sms_backend()
+        self.addCleanup(reset_sms_backend)
+
+    def test_backend_is_shared_until_reset(self):
+        backend = get_sms_backend()
+
+        self.assertIs(get_sms_backend(), backend)
+        reset_sms_backend()
+        self.assertIsNot(get_sms_backend(), backend)
+
+    def test_latency_percentiles_cover_the_recent_window(self):
+        stats = LatencyStats(window=100)
+        for millisecond in range(1, 201):
+            stats.record(millisecond / 1000, ok=millisecond % 10 != 0)
+
+        snapshot = stats.snapshot()
+
+        self.assertEqual((snapshot['calls'], snapshot['errors'], snapshot['window']), (200, 20, 100))
+        self.assertEqual((snapshot['p50_ms'], snapshot['p95_ms'], snapshot['max_ms']), (151.0, 196.0, 200.0))
+        stats.reset()
+        self.assertEqual(stats.snapshot(), {'calls': 0, 'errors': 0, 'window': 0})
+
+    def test_metrics_are_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(self.member)
+
+        self.assertEqual(client.get('/api/notifications/sms/metrics/').status_code, 403)
+
+
+@override_settings(AT_USERNAME='sandbox', AT_API_KEY='key', AT_SENDER_ID='SACCO', SMS_BATCH_SIZE=100)
+class AfricasTalkingBackendTests(TestCase):
+    def backend(self, status_code=201, payload=None, headers=None):
+        backend = AfricasTalkingBackend()
+        response = mock.Mock(status_code=status_code, text='error', headers=headers or {})
+        response.json.return_value = payload or {}
+        backend.session.post = mock.Mock(return_value=response)
+        self.addCleanup(backend.close)
+        return backend
+
+    def test_results_follow_each_recipient_status(self):
+        backend = self.backend(payload={'SMSMessageData': {'Recipients': [
+            {'number': '+254711000001', 'status': 'Success', 'messageId': 'ATX-1'},
+            {'number': '+254711000002', 'status': 'UserInBlacklist'},
+            {'number': '+254711000003', 'status': 'InsufficientBalance'},
+        ]}})
+
+        results = backend.send_batch(
+            ['+254711000001', '+254711000002', '+254711000003', '0711', '+254711000004'], 'Hello'
+        )
+
+        self.assertEqual(backend.session.post.call_count, 1)
+        self.assertEqual(
+            backend.session.post.call_args.kwargs['data']['to'],
+            '+254711000001,+254711000002,+254711000003,+254711000004'
+        )
+        self.assertEqual(
+            [(result.success, result.retryable) for result in results],
+            [(True, True), (False, False), (False, True), (False, False), (False, False)]
+        )
+        self.assertEqual(results[0].external_id, 'ATX-1')
+        self.assertEqual(results[3].error, 'InvalidPhoneNumber')
+
+    def test_server_error_fails_every_recipient_for_retry(self):
+        backend = self.backend(status_code=500)
+
+        results = backend.send_batch(['+254711000001', '+254711000002'], 'Hello')
+
+        self.assertEqual([(result.success, result.retryable) for result in results], [(False, True), (False, True)])
+
+    def test_provider_throttling_is_deferred_not_failed(self):
+        backend = self.backend(status_code=429, headers={'Retry-After': '7'})
+
+        result = backend.send('+254711000001', 'Hello')
+
+        self.assertEqual((result.success, result.throttled, result.retry_in), (False, True, 7))
+
+    def test_connection_errors_are_retryable(self):
+        backend = self.backend()
+        backend.session.post.side_effect = requests.ConnectionError('reset')
+
+        result = backend.send('+254711000001', 'Hello')
+
+        self.assertEqual((result.success, result.retryable), (False, True))
+
+
+class TemplateTests(SMSFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        invalidate_templates()
+        self.addCleanup(invalidate_templates)
+        self.context = {'first_name': 'Mo', 'amount': Decimal('10.00'), 'contribution_type': 'Shares',
+                        'transaction_code': 'QAB0000001', 'rejection_reason': ''}
+
+    def test_built_in_text_is_used_without_a_template_row(self):
+        self.assertEqual(
+            render_template('contribution_verified', self.context),
+            'Dear Mo, your contribution of KES 10.00 for Shares has been verified. Transaction: QAB0000001. Thank you!'
+        )
+
+    def test_saving_a_template_replaces_the_compiled_one(self):
+        render_template('contribution_verified', self.context)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            template = NotificationTemplate.objects.create(
+                name='contribution_verified', template_text='Hi {first_name}, KES {amount:,.2f} received'
+            )
+        self.assertEqual(render_template('contribution_verified', self.context), 'Hi Mo, KES 10.00 received')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            template.is_active = False
+            template.save()
+        self.assertTrue(render_template('contribution_verified', self.context).startswith('Dear Mo'))
+
+    def test_compiled_template_is_reused(self):
+        template = get_template('contribution_verified')
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_template('contribution_verified'), template)
+
+    def test_bad_templates_raise_template_error(self):
+        with self.assertRaises(TemplateError):
+            CompiledTemplate('unsafe', 'Hi {member.password}')
+        with self.assertRaises(TemplateError):
+            CompiledTemplate('broken', 'Hi {first_name')
+        with self.assertRaises(TemplateError):
+            CompiledTemplate('greeting', 'Hi {first_name}').render({})
+        with self.assertRaises(TemplateError):
+            get_template('no_such_template')
+
+    def test_opted_out_members_are_skipped(self):
+        UserSettings.objects.update_or_create(user=self.members[1], defaults={'sms_notifications': False})
+        UserSettings.objects.update_or_create(user=self.members[2], defaults={'notify_reports': False})
+        member_ids = [member.pk for member in self.members]
+
+        self.assertEqual(sms_opted_out('contributions', member_ids), {self.members[1].pk})
+        self.assertEqual(sms_opted_out('reports', member_ids), {self.members[1].pk, self.members[2].pk})
+
+        NotificationTemplate.objects.create(name='report_ready', template_text='Dear {first_name}, {summary}')
+        messages = build_messages(self.members, 'report_ready', 'reports', {'summary': 'your report is ready'})
+        self.assertEqual(messages, [(self.member, 'Dear M, your report is ready')])
+
+
+class DeliveryReportTests(SMSFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+
+    def sent(self, external_id):
+        notification = queue_sms(self.member, 'Welcome')
+        SMSNotification.objects.filter(pk=notification.pk).update(
+            status='SENT', external_id=external_id, sent_at=timezone.now()
+        )
+        return notification
+
+    def test_final_status_beats_later_intermediate_status(self):
+        notification = self.sent('ATX-1')
+        record_delivery_report('ATX-1', 'Success')
+        record_delivery_report('ATX-1', 'Buffered')
+
+        self.assertEqual(apply_delivery_reports(), (2, 1))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'DELIVERED')
+        self.assertEqual(notification.delivery_status, 'Success')
+        self.assertIsNotNone(notification.delivered_at)
+        self.assertFalse(SMSDeliveryReport.objects.exists())
+
+    def test_final_state_is_not_overwritten_by_a_later_batch(self):
+        notification = self.sent('ATX-2')
+        record_delivery_report('ATX-2', 'Failed', 'DeliveryFailure')
+        apply_delivery_reports()
+        record_delivery_report('ATX-2', 'Success')
+        apply_delivery_reports()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'FAILED')
+        self.assertEqual(notification.error_message, 'DeliveryFailure')
+        self.assertIsNone(notification.delivered_at)
+
+    def test_intermediate_status_does_not_end_the_message(self):
+        notification = self.sent('ATX-3')
+        record_delivery_report('ATX-3', 'Sent')
+        apply_delivery_reports()
+        record_delivery_report('ATX-3', 'Success')
+        apply_delivery_reports()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'DELIVERED')
+
+    def test_report_arriving_before_the_send_is_recorded_waits_then_expires(self):
+        record_delivery_report('ATX-4', 'Success')
+        self.assertEqual(apply_delivery_reports(), (1, 0))
+        report = SMSDeliveryReport.objects.get()
+        self.assertGreater(report.retry_after, timezone.now())
+
+        notification = self.sent('ATX-4')
+        SMSDeliveryReport.objects.update(retry_after=timezone.now())
+        self.assertEqual(apply_delivery_reports(), (1, 1))
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'DELIVERED')
+
+        record_delivery_report('ATX-unknown', 'Success')
+        SMSDeliveryReport.objects.update(received_at=timezone.now() - ORPHAN_TTL - timedelta(seconds=1))
+        apply_delivery_reports()
+        self.assertFalse(SMSDeliveryReport.objects.exists())
+
+    @override_settings(SMS_CALLBACK_TOKEN='secret')
+    def test_webhook_requires_the_callback_token(self):
+        client = APIClient()
+        url = '/api/notifications/sms/delivery-reports/'
+        payload = {'id': 'ATX-5', 'status': 'Success'}
+
+        self.assertEqual(client.post(f'{url}?token=wrong', payload).status_code, 403)
+        self.assertFalse(SMSDeliveryReport.objects.exists())
+
+        response = client.post(f'{url}?token=secret', payload)
+        self.assertLess(response.status_code, 300)
+        self.assertTrue(SMSDeliveryReport.objects.filter(external_id='ATX-5').exists())
+
+
+@override_settings(SMS_DIGEST_WINDOW_SECONDS=600, SMS_DIGEST_MAX_ITEMS=10)
+class DigestTests(SMSFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        invalidate_templates()
+        self.contribution_type = ContributionType.objects.create(name='Shares')
+        self.codes = iter(range(10 ** 6))
+
+    def contribution(self, amount, status='VERIFIED', member=None):
+        member = member or self.member
+        return Contribution.objects.create(
+            member=member,
+            contribution_type=self.contribution_type,
+            amount=Decimal(amount),
+            mpesa_transaction_code=f'QDG{next(self.codes):07d}',
+            mpesa_phone_number=member.phone_number,
+            status=status,
+            rejection_reason='Wrong amount' if status == 'REJECTED' else None
+        )
+
+    def age_held_notices(self):
+        DigestItem.objects.update(created_at=timezone.now() - timedelta(minutes=11))
+
+    def test_notices_are_held_then_sent_as_one_digest(self):
+        queue_contribution_notifications([
+            self.contribution('100.00'), self.contribution('250.00'), self.contribution('50.00', status='REJECTED')
+        ])
+        self.assertEqual(flush_digests(), (0, 0))
+
+        self.age_held_notices()
+
+        self.assertEqual(flush_digests(), (1, 3))
+        self.assertEqual(SMSNotification.objects.get().message, (
+            'Dear M, 2 contributions totalling KES 350.00 have been verified and '
+            '1 contribution of KES 50.00 has been rejected. Log in to see the details.'
+        ))
+        self.assertFalse(DigestItem.objects.exists())
+
+    def test_single_notice_uses_the_usual_message(self):
+        contribution = self.contribution('100.00')
+        queue_contribution_notifications([contribution])
+        self.age_held_notices()
+
+        flush_digests()
+
+        self.assertIn(f'Transaction: {contribution.mpesa_transaction_code}', SMSNotification.objects.get().message)
+
+    @override_settings(SMS_DIGEST_MAX_ITEMS=2)
+    def test_full_digest_is_sent_without_waiting(self):
+        queue_contribution_notifications([self.contribution('10.00'), self.contribution('20.00')])
+        queue_contribution_notifications([self.contribution('30.00', member=self.members[1])])
+
+        self.assertEqual(flush_digests(), (1, 2))
+        self.assertEqual(SMSNotification.objects.get().recipient, self.member)
+
+    @override_settings(SMS_DIGEST_WINDOW_SECONDS=0)
+    def test_zero_window_queues_each_notice_directly(self):
+        queue_contribution_notifications([self.contribution('10.00'), self.contribution('20.00')])
+
+        self.assertEqual(SMSNotification.objects.filter(status='PENDING').count(), 2)
+        self.assertFalse(DigestItem.objects.exists())
+
+    def test_opted_out_members_get_no_notices(self):
+        UserSettings.objects.update_or_create(user=self.member, defaults={'notify_contributions': False})
+
+        queue_contribution_notifications([
+            self.contribution('10.00'), self.contribution('5.00', member=self.members[1])
+        ])
+
+        self.assertEqual(list(DigestItem.objects.values_list('recipient_id', flat=True)), [self.members[1].pk])
+
+
+@override_settings(SMS_RETENTION_MONTHS=1)
+class ArchiveTests(SMSFixtures, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root, ignore_errors=True)
+        settings_override = override_settings(SMS_ARCHIVE_ROOT=archive_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Mid-month, well before the retention window
+        self.old = archive_cutoff() - timedelta(days=15)
+
+    def sms(self, member, message, status='SENT', created_at=None):
+        notification = queue_sms(member, message)
+        SMSNotification.objects.filter(pk=notification.pk).update(status=status, created_at=created_at or self.old)
+        return notification
+
+    def test_old_months_move_to_an_archive_file(self):
+        for index, member in enumerate(self.members):
+            self.sms(member, f'Old {index}')
+        pending = self.sms(self.member, 'Still sending', status='PENDING')
+        recent = self.sms(self.member, 'Recent', created_at=timezone.now())
+
+        self.assertEqual(archive_notifications(), 3)
+
+        self.assertEqual(set(SMSNotification.objects.values_list('pk', flat=True)), {pending.pk, recent.pk})
+        archive = SMSArchive.objects.get()
+        self.assertEqual(archive.row_count, 3)
+        self.assertEqual([record['message'] for record in read_archived(archive, self.members[1].pk)], ['Old 1'])
+        self.assertEqual(archive_notifications(), 0)
+
+    def test_history_merges_hot_and_archived_messages_newest_first(self):
+        self.sms(self.member, 'Old')
+        self.sms(self.member, 'Recent', created_at=timezone.now())
+        self.sms(self.members[1], 'Someone else')
+        archive_notifications()
+
+        history = notification_history(self.member.pk)
+
+        self.assertEqual([record['message'] for record in history], ['Recent', 'Old'])
+        client = APIClient()
+        client.force_authenticate(self.member)
+        response = client.get('/api/notifications/sms/history/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([record['message'] for record in response.data['results']], ['Recent', 'Old'])
+
+    def test_messages_settling_after_the_archive_go_into_a_new_part(self):
+        self.sms(self.member, 'Old')
+        late = self.sms(self.member, 'Late', status='PENDING')
+        archive_notifications()
+
+        SMSNotification.objects.filter(pk=late.pk).update(status='SENT')
+        self.assertEqual(archive_notifications(), 1)
+
+        self.assertEqual(list(SMSArchive.objects.order_by('part').values_list('part', 'row_count', 'purged')), [
+            (0, 1, True), (1, 1, True)
+        ])
+        self.assertEqual([record['message'] for record in notification_history(self.member.pk)], ['Late', 'Old'])
+
+    def test_delivery_report_between_write_and_purge_is_not_lost(self):
+        sent = self.sms(self.member, 'Old')
+        write_archive = archive._write_archive
+
+        def write_then_deliver(*args):
+            written = write_archive(*args)
+            SMSNotification.objects.filter(pk=sent.pk).update(delivery_status='Success', delivered_at=timezone.now())
+            return written
+
+        with mock.patch('notifications.archive._write_archive', side_effect=write_then_deliver):
+            self.assertEqual(archive_notifications(), 0)
+        self.assertEqual(SMSNotification.objects.get(pk=sent.pk).delivery_status, 'Success')
+
+        self.assertEqual(archive_notifications(), 1)
+        self.assertEqual(list(SMSArchive.objects.order_by('part').values_list('part', 'row_count', 'purged')), [
+            (0, 1, True), (1, 1, True)
+        ])
+        self.assertEqual(
+            [record['delivery_status'] for record in notification_history(self.member.pk)], ['Success']
+        )
+        lines = list(export_stream('sms-notifications', 'csv', compress=False))
+        self.assertEqual([line.split(',', 1)[0] for line in lines[1:]], [str(sent.pk)])
+
+    def test_history_is_paged_by_cursor_across_hot_and_archived_rows(self):
+        for index in range(3):
+            self.sms(self.member, f'Old {index}', created_at=self.old + timedelta(hours=index))
+        archive_notifications()
+        now = timezone.now()
+        for index in range(2):
+            self.sms(self.member, f'Recent {index}', created_at=now - timedelta(hours=2 - index))
+        client = APIClient()
+        client.force_authenticate(self.member)
+
+        pages = []
+        url = '/api/notifications/sms/history/?page_size=2'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([record['message'] for record in response.data['results']])
+            url = response.data['next']
+
+        self.assertEqual(pages, [['Recent 1', 'Recent 0'], ['Old 2', 'Old 1'], ['Old 0']])
+
+    def test_export_includes_archived_messages(self):
+        archived = self.sms(self.member, 'Old')
+        recent = self.sms(self.member, 'Recent', created_at=timezone.now())
+        archive_notifications()
+
+        lines = list(export_stream('sms-notifications', 'csv', compress=False))
+
+        self.assertEqual([line.split(',', 1)[0] for line in lines[1:]], [str(archived.pk), str(recent.pk)])
+
+
+@override_settings(SMS_RATE_LIMIT_PER_SECOND=1, SMS_RATE_LIMIT_BURST=1, SMS_RATE_LIMIT_MAX_WAIT=0, AT_SENDER_ID='TEST')
+class RateLimitTests(SMSFixtures, TransactionTestCase):
+    def setUp(self):
+        self.make_fixtures()
+
+    def test_throttled_messages_stay_queued_without_using_an_attempt(self):
+        # Different texts, so each message is its own provider request
+        for index, member in enumerate(self.members):
+            queue_sms(member, f'Message {index}')
+
+        self.assertEqual(dispatch_due(self.backend), (3, 1))
+
+        deferred = SMSNotification.objects.filter(status='PENDING')
+        self.assertEqual(deferred.count(), 2)
+        for notification in deferred:
+            self.assertEqual(notification.attempts, 0)
+            self.assertEqual(notification.error_message, 'Rate limited')
+            self.assertGreater(notification.next_attempt_at, timezone.now())
+        bucket = SMSRateLimitBucket.objects.get(key='TEST')
+        self.assertEqual((bucket.granted, bucket.deferred), (1, 2))
+        self.assertEqual(len(self.backend.outbox), 1)
+
+    def test_throttling_never_fails_a_message(self):
+        for index, member in enumerate(self.members):
+            queue_sms(member, f'Message {index}')
+
+        for _ in range(5):
+            self.make_due()
+            dispatch_due(self.backend, max_attempts=1)
+
+        self.assertFalse(SMSNotification.objects.filter(status='FAILED').exists())
+
+    @override_settings(SMS_RATE_LIMIT_MAX_WAIT=30)
+    def test_send_now_inside_a_transaction_defers_instead_of_sleeping(self):
+        self.assertEqual(get_rate_limiter().take(1), 0)
+
+        with mock.patch('notifications.ratelimit.time.sleep') as sleep, transaction.atomic():
+            notification = send_now(queue_sms(self.member, 'Hello'), self.backend)
+
+        sleep.assert_not_called()
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.error_message), ('PENDING', 'Rate limited'))
+        self.assertEqual(self.backend.outbox, [])
+        bucket = SMSRateLimitBucket.objects.get(key='TEST')
+        self.assertEqual((bucket.granted, bucket.deferred), (1, 1))
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_bucket_is_not_locked_until_the_callers_transaction_commits(self):
+        def bucket_is_free():
+            try:
+                with transaction.atomic():
+                    SMSRateLimitBucket.objects.select_for_update(nowait=True).get(key='TEST')
+                return True
+            except DatabaseError:
+                return False
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            self.assertEqual(get_rate_limiter().take(1), 0)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                self.assertTrue(executor.submit(bucket_is_free).result())
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import SMSProviderMetricsView, SMSDeliveryReportView, SMSHistoryView
+
+urlpatterns = [
+    path('sms/metrics/', SMSProviderMetricsView.as_view(), name='sms-provider-metrics'),
+    path('sms/history/', SMSHistoryView.as_view(), name='sms-history'),
+    path('sms/delivery-reports/', SMSDeliveryReportView.as_view(), name='sms-delivery-reports'),
+]
@@ -1,3 +1,103 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from django.contrib.auth import get_user_model
+from rest_framework import permissions, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+from accounts.permissions import IsAdmin
+from sacco_project.pagination import KeysetPagination
+from .archive import notification_history
+from .delivery import record_delivery_report
+from .metrics import provider_latency
+from .models import SMSNotification
+from .ratelimit import rate_limit_stats
+from .serializers import DeliveryReportSerializer, SMSHistoryQuerySerializer
+
+
+class SMSProviderMetricsView(APIView):
+    """
+    SMS provider call latency as seen by the process serving the request, and
+    the shared rate limiter's totals (admin only)
+    """
+    
+    permission_classes = [IsAdmin]
+    
+    def get(self, request):
+        return Response({'pid': os.getpid(), **provider_latency.snapshot(), 'rate_limit': rate_limit_stats()})
+
+
+class SMSDeliveryReportView(APIView):
+    """
+    Delivery report callback for the SMS provider
+    
+    Register the URL with ?token=<SMS_CALLBACK_TOKEN>. Reports are buffered
+    and applied in batches by the sms_dispatcher command.
+    """
+    
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def post(self, request):
+        token = settings.SMS_CALLBACK_TOKEN
+        if not token or not constant_time_compare(request.query_params.get('token', ''), token):
+            return Response({'error': 'Invalid callback token'}, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = DeliveryReportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        record_delivery_report(
+            serializer.validated_data['id'],
+            serializer.validated_data['status'],
+            serializer.validated_data.get('failureReason', '')
+        )
+        return Response(status=status.HTTP_200_OK)
+
+
+class SMSHistoryView(APIView):
+    """
+    A member's SMS notifications, newest first, including archived months
+    
+    Members see only their own; admins may pass ?recipient=. Results are
+    paged by cursor: follow `next` (page size set with ?page_size=).
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        serializer = SMSHistoryQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        recipient_id = request.user.pk
+        if request.user.role == 'ADMIN' and params.get('recipient'):
+            recipient_id = params['recipient']
+            if not get_user_model().objects.filter(pk=recipient_id).exists():
+                return Response({'error': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        paginator = KeysetPagination()
+        paginator.ordering = ('-created_at', '-id')
+        paginator.model = SMSNotification
+        before, _ = paginator.decode_cursor(request)
+        page_size = paginator.get_page_size(request)
+        
+        records = notification_history(
+            recipient_id,
+            since=params.get('since'),
+            until=params.get('until'),
+            before=before,
+            limit=page_size + 1
+        )
+        next_link = None
+        if len(records) > page_size:
+            records = records[:page_size]
+            last = records[-1]
+            next_link = replace_query_param(
+                request.build_absolute_uri(),
+                paginator.cursor_query_param,
+                paginator.encode_cursor([last['created_at'].isoformat(), str(last['id'])], False)
+            )
+        return Response({'recipient': recipient_id, 'next': next_link, 'results': records})
@@ -0,0 +1,180 @@
+"""
+Keyset (cursor) pagination for large list endpoints.
+
+Page-number pagination runs COUNT(*) and OFFSET scans, both of which slow down
+as tables grow. Keyset pagination instead filters on the ordering columns of
+the last row seen, so every page is a bounded index range read no matter how
+deep the client goes. Views opt in with CursorPaginationMixin, and clients
+switch per request with ?pagination=cursor.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite, unique ordering such as ('-submitted_at', '-id')
+
+    The last ordering field must be unique (normally the primary key) so that
+    rows sharing the same timestamp are still ordered deterministically. All
+    ordering fields must be non-nullable model fields.
+    """
+
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, 'cursor_ordering', self.ordering))
+        self.model = queryset.model
+        page_size = self.get_page_size(request)
+
+        values, reverse = self.decode_cursor(request)
+        ordering = self._invert(self.ordering) if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._position_filter(ordering, values))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.first_values = self._row_values(rows[0]) if rows else None
+        self.last_values = self._row_values(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next or self.last_values is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.last_values, False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_values is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.first_values, True))
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            raw_values = payload['v']
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.model._meta.get_field(self._field_name(field)).to_python(value)
+                for field, value in zip(self.ordering, raw_values)
+            ]
+            return values, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _row_values(self, row):
+        values = []
+        for field in self.ordering:
+            value = getattr(row, self._field_name(field))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return values
+
+    @staticmethod
+    def _field_name(field):
+        return field.lstrip('-')
+
+    @staticmethod
+    def _invert(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    def _position_filter(self, ordering, values):
+        """Rows strictly after `values` in `ordering`, as (a < x) OR (a = x AND b < y) ..."""
+        position = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = self._field_name(field)
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            position |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        # Bound the scan on the leading column so the index range is used directly
+        leading = ordering[0]
+        bound = 'lte' if leading.startswith('-') else 'gte'
+        return Q(**{f'{self._field_name(leading)}__{bound}': values[0]}) & position
+
+
+class CursorPaginationMixin:
+    """
+    Let list views switch to keyset pagination with ?pagination=cursor
+
+    Views declare `cursor_ordering`, which should match an index on the
+    underlying table and end in a unique field.
+    """
+
+    cursor_ordering = ('-id',)
+    cursor_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            if request is not None and (
+                request.query_params.get('pagination') == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params
+            ):
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
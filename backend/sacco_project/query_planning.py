@@ -0,0 +1,106 @@
+"""
+Derive select_related / prefetch_related plans from serializer definitions.
+
+Nested serializers and dotted `source` paths (e.g. 'contribution_type.name')
+tell us exactly which relations a serializer will touch. Walking them once per
+serializer class lets every list and detail view load those relations up
+front, so the number of queries no longer grows with the page size.
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """Relations to join (select_related) and to batch-load (prefetch_related)"""
+
+    def __init__(self, select_related=(), prefetch_related=()):
+        self.select_related = tuple(sorted(set(select_related)))
+        self.prefetch_related = tuple(sorted(set(prefetch_related)))
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def __repr__(self):
+        return f'QueryPlan(select_related={self.select_related}, prefetch_related={self.prefetch_related})'
+
+
+def _relation(model, name):
+    """Return the relation field called `name` on `model`, or None if it is not a relation"""
+    if model is None:
+        return None
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _walk(serializer, model, prefix, through_many, select, prefetch):
+    """Collect relation paths used by `serializer`, whose instances are `model` rows at `prefix`"""
+    meta = getattr(serializer, 'Meta', None)
+    for hint in getattr(meta, 'select_related_hints', ()):
+        path = prefix + [hint]
+        (prefetch if through_many else select).add('__'.join(path))
+    for hint in getattr(meta, 'prefetch_related_hints', ()):
+        prefetch.add('__'.join(prefix + [hint]))
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        path = list(prefix)
+        current_model = model
+        many = through_many
+        for attr in field.source_attrs:
+            relation = _relation(current_model, attr)
+            if relation is None:
+                break
+            path.append(attr)
+            if relation.one_to_many or relation.many_to_many:
+                many = True
+            current_model = relation.related_model
+
+        if len(path) == len(prefix):
+            continue
+
+        target = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(target, serializers.ManyRelatedField):
+            prefetch.add('__'.join(path))
+            continue
+        if isinstance(target, serializers.PrimaryKeyRelatedField) and len(path) == len(prefix) + 1:
+            # Served from the local foreign key column, no join needed
+            continue
+
+        (prefetch if many else select).add('__'.join(path))
+        if isinstance(target, serializers.BaseSerializer):
+            _walk(target, current_model, path, many, select, prefetch)
+
+
+@lru_cache(maxsize=None)
+def build_query_plan(serializer_class):
+    """
+    Build the QueryPlan for a ModelSerializer class
+
+    Relations reached only through SerializerMethodFields cannot be seen; list
+    those in the serializer's Meta as `select_related_hints` or
+    `prefetch_related_hints`.
+    """
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    select, prefetch = set(), set()
+    _walk(serializer_class(), model, [], False, select, prefetch)
+    return QueryPlan(select, prefetch)
+
+
+class QueryPlanMixin:
+    """Apply the serializer's QueryPlan to the queryset of a generic view"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return build_query_plan(self.get_serializer_class()).apply(queryset)
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     'notifications',
     'documents',
     'applications',
+    'settings',
 ]
 
 MIDDLEWARE = [
@@ -79,6 +80,16 @@ DATABASES = {
     }
 }
 
+# Cache Configuration
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) when running several workers
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='sacco-default'),
+    }
+}
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -119,7 +130,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -134,11 +145,15 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # A last_login write on every token grant; LoginView issues its own tokens anyway
+    'UPDATE_LAST_LOGIN': False,
     'ALGORITHM': 'HS256',
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
 }
+# Seconds a process trusts its cached copy of a user's token version; role,
+# active flag and password changes reach other processes within this window
+AUTH_USER_STATE_TTL = config('AUTH_USER_STATE_TTL', default=60, cast=int)
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:4200', cast=Csv())
@@ -149,5 +164,40 @@ AT_USERNAME = config('AT_USERNAME', default='sandbox')
 AT_API_KEY = config('AT_API_KEY', default='')
 AT_SENDER_ID = config('AT_SENDER_ID', default='SACCO')
 
+# SMS outbox: provider backend used by the sms_dispatcher command, and its retry policy
+SMS_BACKEND = config('SMS_BACKEND', default='notifications.backends.AfricasTalkingBackend')
+SMS_MAX_ATTEMPTS = config('SMS_MAX_ATTEMPTS', default=5, cast=int)
+SMS_RETRY_BASE_SECONDS = config('SMS_RETRY_BASE_SECONDS', default=30, cast=int)
+# Recipients per provider request for bulk sends
+SMS_BATCH_SIZE = config('SMS_BATCH_SIZE', default=1000, cast=int)
+SMS_BULK_CONCURRENCY = config('SMS_BULK_CONCURRENCY', default=4, cast=int)
+# Shared per-sender rate limit (messages/second, bucket size); senders wait up to MAX_WAIT
+# seconds for capacity, then leave messages queued. A rate of 0 turns limiting off.
+SMS_RATE_LIMIT_PER_SECOND = config('SMS_RATE_LIMIT_PER_SECOND', default=50, cast=float)
+SMS_RATE_LIMIT_BURST = config('SMS_RATE_LIMIT_BURST', default=1000, cast=int)
+SMS_RATE_LIMIT_MAX_WAIT = config('SMS_RATE_LIMIT_MAX_WAIT', default=2, cast=float)
+# Provider HTTP client, shared per process: keep-alive pool size and timeouts in seconds
+SMS_HTTP_POOL_SIZE = config('SMS_HTTP_POOL_SIZE', default=10, cast=int)
+SMS_HTTP_CONNECT_TIMEOUT = config('SMS_HTTP_CONNECT_TIMEOUT', default=3.05, cast=float)
+SMS_HTTP_READ_TIMEOUT = config('SMS_HTTP_READ_TIMEOUT', default=15, cast=float)
+# Contribution notices per member are merged into one SMS sent this long after the first
+# (0 disables), or as soon as SMS_DIGEST_MAX_ITEMS are waiting
+SMS_DIGEST_WINDOW_SECONDS = config('SMS_DIGEST_WINDOW_SECONDS', default=120, cast=int)
+SMS_DIGEST_MAX_ITEMS = config('SMS_DIGEST_MAX_ITEMS', default=10, cast=int)
+# SMS log rollover: whole months older than this are moved to compressed NDJSON archives
+SMS_RETENTION_MONTHS = config('SMS_RETENTION_MONTHS', default=6, cast=int)
+SMS_ARCHIVE_ROOT = config('SMS_ARCHIVE_ROOT', default=str(BASE_DIR / 'archives' / 'sms'))
+# Shared secret the provider passes as ?token= on delivery report callbacks; callbacks are refused while unset
+SMS_CALLBACK_TOKEN = config('SMS_CALLBACK_TOKEN', default='')
+
+# Idempotent submissions: how long a replayed Idempotency-Key returns the original response
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=3600, cast=int)
+
+# Keep per-member daily/monthly rollups alongside the per-type ones
+CONTRIBUTION_ROLLUPS_PER_MEMBER = config('CONTRIBUTION_ROLLUPS_PER_MEMBER', default=True, cast=bool)
+
+# Admin dashboard stats are recomputed at most this often (seconds), and sooner on changes
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=300, cast=int)
+
 # SACCO Business Rules
 MAX_ADMIN_USERS = 2
\ No newline at end of file
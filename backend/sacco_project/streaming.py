@@ -0,0 +1,71 @@
+"""
+Helpers for streaming large result sets as CSV or NDJSON.
+
+Rows are encoded one at a time so responses and files can be produced in
+constant memory from a database iterator, optionally gzip-compressed.
+"""
+
+import csv
+import json
+import zlib
+from decimal import Decimal
+
+
+class _Echo:
+    """File-like object whose write() hands the line straight back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_lines(columns, rows):
+    """Yield CSV-encoded lines: a header, then one line per row tuple"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_default(value) if value is not None else '' for value in row])
+
+
+def ndjson_lines(columns, rows):
+    """Yield one JSON object per row tuple, newline-delimited"""
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=_default, separators=(',', ':')) + '\n'
+
+
+STREAM_FORMATS = {
+    'csv': (csv_lines, 'text/csv', 'csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson', 'ndjson'),
+}
+
+
+def gzip_stream(lines, level=6, buffer_size=256 * 1024):
+    """
+    Gzip-compress an iterable of text lines into a stream of byte chunks
+
+    Lines are buffered up to `buffer_size` bytes before each compress call so
+    the compressor works on large blocks instead of one row at a time.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    buffer = []
+    buffered = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= buffer_size:
+            chunk = compressor.compress(b''.join(buffer))
+            buffer, buffered = [], 0
+            if chunk:
+                yield chunk
+    chunk = compressor.compress(b''.join(buffer))
+    if chunk:
+        yield chunk
+    yield compressor.flush()
@@ -19,12 +19,16 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .views import BulkExportView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
     path('api/contributions/', include('contributions.urls')),
     path('api/documents/', include('documents.urls')),
     path('api/applications/', include('applications.urls')),
+    path('api/notifications/', include('notifications.urls')),
+    path('api/exports/<str:dataset>/', BulkExportView.as_view(), name='bulk-export'),
 ]
 
 # Serve media files in development
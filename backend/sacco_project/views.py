@@ -0,0 +1,47 @@
+from django.http import StreamingHttpResponse
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsAdmin
+from .exports import EXPORT_DATASETS, export_filename, export_stream
+from .streaming import STREAM_FORMATS
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """Query parameters for bulk exports"""
+    
+    export = serializers.ChoiceField(choices=list(STREAM_FORMATS), default='csv')
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    compress = serializers.BooleanField(default=True)
+
+
+class BulkExportView(APIView):
+    """Stream a full dataset as gzip-compressed CSV or NDJSON (admin only)"""
+    
+    permission_classes = [IsAdmin]
+    
+    def get(self, request, dataset):
+        if dataset not in EXPORT_DATASETS:
+            return Response(
+                {'error': f'Unknown dataset. Choose one of: {", ".join(EXPORT_DATASETS)}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        serializer = ExportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        stream = export_stream(
+            dataset,
+            params['export'],
+            since=params.get('since'),
+            until=params.get('until'),
+            compress=params['compress']
+        )
+        content_type = 'application/gzip' if params['compress'] else STREAM_FORMATS[params['export']][1]
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export_filename(dataset, params["export"], params["compress"])}"'
+        )
+        return response
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntegratedFirm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('api_endpoint', models.URLField(blank=True, null=True)),
+                ('api_key', models.CharField(blank=True, max_length=200, null=True)),
+                ('logo', models.ImageField(blank=True, null=True, upload_to='firm_logos/')),
+                ('website', models.URLField(blank=True, null=True)),
+                ('contact_email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('contact_phone', models.CharField(blank=True, max_length=17, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('integration_type', models.CharField(choices=[('BANK', 'Bank'), ('INVESTMENT', 'Investment Firm'), ('INSURANCE', 'Insurance'), ('OTHER', 'Other')], default='OTHER', max_length=50)),
+                ('shares_financial_data', models.BooleanField(default=False)),
+                ('shares_member_data', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Integrated Firm',
+                'verbose_name_plural': 'Integrated Firms',
+                'db_table': 'integrated_firms',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email_notifications', models.BooleanField(default=True)),
+                ('sms_notifications', models.BooleanField(default=True)),
+                ('push_notifications', models.BooleanField(default=True)),
+                ('notify_contributions', models.BooleanField(default=True)),
+                ('notify_approvals', models.BooleanField(default=True)),
+                ('notify_reports', models.BooleanField(default=True)),
+                ('notify_updates', models.BooleanField(default=True)),
+                ('language', models.CharField(default='en', max_length=10)),
+                ('theme', models.CharField(choices=[('LIGHT', 'Light'), ('DARK', 'Dark'), ('AUTO', 'Auto')], default='AUTO', max_length=10)),
+                ('currency', models.CharField(default='KES', max_length=3)),
+                ('profile_visibility', models.CharField(choices=[('PUBLIC', 'Public'), ('MEMBERS', 'Members Only'), ('PRIVATE', 'Private')], default='MEMBERS', max_length=10)),
+                ('two_factor_enabled', models.BooleanField(default=False)),
+                ('biometric_enabled', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='settings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Settings',
+                'verbose_name_plural': 'User Settings',
+                'db_table': 'user_settings',
+            },
+        ),
+    ]